@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+# benchArchive.py
+
+# How much archiver.py saves and what it costs the readers, on a year of
+# data files: every compression (gzip, xz, zstd when the zstandard module is
+# there), a file a day and a zip file a month, against the text files as they
+# are. For each it shows
+#
+#   size       the bytes on disk, and how many times smaller than the text
+#   archive    the time archiver.py takes for the year
+#   read all   reading every day once (dataFiles.readBytes)
+#   2 days     the two days a plot of three hours reads (createTempHum.py),
+#              the first time and from the cache
+#
+# The days of the data directory are copied to a temporary directory; when
+# there are fewer than --days of them they are used again (with new MJDs) to
+# make up the year, which is said. All of it is archived, also the last
+# month (as if it was a month later). The data directory is not touched.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+import dataFiles
+import archiver
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+def dirSize(path):
+	return(sum([os.path.getsize(os.path.join(path,f)) for f in os.listdir(path)]))
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Measure the compression and the "+
+																 "read times of archived data files.")
+parser.add_argument("-D","--data",nargs=1,default=['data'],
+										help="The data directory (default ~/data).")
+parser.add_argument("-n","--days",nargs=1,type=int,default=[365],
+										help="Days of data (default 365).")
+parser.add_argument("-r","--repeat",nargs=1,type=int,default=[3],
+										help="Times each read is timed, the best is shown "+
+										"(default 3).")
+args = parser.parse_args()
+
+HOME = os.path.expanduser('~')
+if not(HOME.endswith('/')):
+	HOME += '/'
+
+datapath = makeFilename(HOME,args.data[0])
+if not os.path.isdir(datapath):
+	print(f"ERROR: {datapath} does not exist.")
+	sys.exit(1)
+
+source = dataFiles.listDays(datapath)
+if len(source) == 0:
+	print(f"ERROR: no data files in {datapath}")
+	sys.exit(1)
+ndays = args.days[0]
+if len(source) < ndays:
+	print(f"{len(source)} days in {datapath}, used again to make up {ndays} days")
+source = source[-ndays:]
+firstMJD = source[-1] - ndays + 1
+today = firstMJD + ndays + 31   # all the days and months are over
+
+schemes = [('text',None,None)]
+for method in ['gzip','xz','zstd']:
+	if method == 'zstd' and dataFiles.zstandard is None:
+		print("zstd left out, there is no zstandard module")
+		continue
+	schemes.append((f"{method} a day",method,'day'))
+	schemes.append((f"{method} a month",method,'month'))
+
+print(f"{'':16s} {'size (MB)':>10s} {'ratio':>6s} {'archive (s)':>11s} "+
+	f"{'read all (s)':>12s} {'2 days (ms)':>11s} {'cached (ms)':>11s}")
+with tempfile.TemporaryDirectory() as tmpdir:
+	year = os.path.join(tmpdir,'year')
+	os.mkdir(year)
+	for i in range(0,ndays):
+		data = dataFiles.readBytes(datapath,source[i % len(source)])
+		with open(os.path.join(year,f"{firstMJD + i}.dat"),'wb') as f:
+			f.write(data)
+			f.close()
+	textSize = dirSize(year)
+	for (name,method,pack) in schemes:
+		path = os.path.join(tmpdir,name.replace(' ','_'))
+		shutil.copytree(year,path)
+		startT = time.perf_counter()
+		if method is not None:
+			archiver.archive(path,method,pack,2,today)
+		archiveT = time.perf_counter() - startT
+		size = dirSize(path)
+		best = None
+		for r in range(0,args.repeat[0]):
+			startT = time.perf_counter()
+			for mjd in range(firstMJD,firstMJD + ndays):
+				dataFiles.readBytes(path,mjd)
+			dt = time.perf_counter() - startT
+			best = dt if best is None else min(best,dt)
+		# A plot over midnight: the last two days
+		plot = None
+		cached = None
+		for r in range(0,args.repeat[0]):
+			cache = dataFiles.DayCache()
+			startT = time.perf_counter()
+			for mjd in [firstMJD + ndays - 2,firstMJD + ndays - 1]:
+				cache.lines(path,mjd)
+			dt = time.perf_counter() - startT
+			plot = dt if plot is None else min(plot,dt)
+			startT = time.perf_counter()
+			for mjd in [firstMJD + ndays - 2,firstMJD + ndays - 1]:
+				cache.lines(path,mjd)
+			dt = time.perf_counter() - startT
+			cached = dt if cached is None else min(cached,dt)
+		print(f"{name:16s} {size/1e6:10.2f} {textSize/size:6.1f} {archiveT:11.2f} "+
+			f"{best:12.2f} {plot*1000:11.2f} {cached*1000:11.3f}")
+		shutil.rmtree(path)
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+# benchClassSchedule.py
+
+# Compare the time it takes to create the temphum.settings file:
+#
+#   1. the old way, running classSchedule.py as a new process (this is what
+#      checkSchedule.py used to do),
+#   2. in this process, parsing the schedule and date time configuration
+#      every time,
+#   3. in this process, with the parsed files kept in memory (this is what
+#      checkSchedule.py does now).
+#
+# The settings are written to a temporary file, the real settings file is not
+# touched.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+import configparser
+import statistics
+import subprocess
+import tempfile
+
+BINPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','bin')
+sys.path.insert(0,BINPATH)
+
+import classSchedule
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+def report(name,tms):
+	print(f"{name:32s} n = {len(tms):4d}  mean = {statistics.mean(tms)*1000:8.2f} ms"+
+		f"  min = {min(tms)*1000:8.2f} ms  max = {max(tms)*1000:8.2f} ms")
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Measure how long it takes to "+
+																 "create the settings file, in process and by "+
+																 "running classSchedule.py")
+parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+										"configuration file. The default is "+
+										"~/etc/classSchedule.conf.")
+parser.add_argument("-n","--number",nargs=1,type=int,default=[20],
+										help="Number of repeats (default 20).")
+args = parser.parse_args()
+
+HOME = os.path.expanduser('~')
+if not(HOME.endswith('/')):
+	HOME += '/'
+
+configfile = f"{HOME}etc/classSchedule.conf"
+if args.config:
+	configfile = makeFilename(HOME,args.config[0])
+
+if not os.path.isfile(configfile):
+	print(f"ERROR: {configfile} does not exist.")
+	sys.exit(1)
+
+conf = configparser.ConfigParser()
+conf.read(configfile)
+
+schflnm = makeFilename(HOME,conf['schedule']['file'])
+dtflnm = makeFilename(HOME,conf['main']['datetime settings'])
+binfile = os.path.join(BINPATH,'classSchedule.py')
+if conf.has_option('checker','bin file'):
+	binfile = makeFilename(HOME,conf['checker']['bin file'])
+
+n = args.number[0]
+dt = classSchedule.getCurrentDate()
+
+with tempfile.TemporaryDirectory() as tmpdir:
+	settingsfile = os.path.join(tmpdir,'temphum.settings')
+	# A copy of the configuration that writes the settings to the temporary
+	# directory, with absolute paths for everything else.
+	conf['main']['settings file'] = settingsfile
+	conf['main']['datetime settings'] = dtflnm
+	conf['schedule']['file'] = schflnm
+	tmpconf = os.path.join(tmpdir,'classSchedule.conf')
+	with open(tmpconf,'w') as f:
+		conf.write(f)
+		f.close()
+
+	tms = []
+	for i in range(0,n):
+		startT = time.perf_counter()
+		retval = subprocess.run([sys.executable,binfile,'-c',tmpconf],
+			capture_output = True)
+		tms.append(time.perf_counter() - startT)
+		if not retval.returncode == 0:
+			print(retval.stdout.decode('ascii'))
+			print(retval.stderr.decode('ascii'))
+			print("ERROR: classSchedule.py failed.")
+			sys.exit(1)
+	report("subprocess (classSchedule.py)",tms)
+
+	tms = []
+	for i in range(0,n):
+		startT = time.perf_counter()
+		schedule = classSchedule.loadSchedule(schflnm)
+		phases = classSchedule.readDateTimeConf(dtflnm)
+		classSchedule.makeSettings(schedule,phases,dt,settingsfile,dtflnm)
+		tms.append(time.perf_counter() - startT)
+	report("in process, parse every time",tms)
+
+	schedule = classSchedule.loadSchedule(schflnm)
+	phases = classSchedule.readDateTimeConf(dtflnm)
+	tms = []
+	for i in range(0,n):
+		startT = time.perf_counter()
+		classSchedule.makeSettings(schedule,phases,dt,settingsfile,dtflnm)
+		tms.append(time.perf_counter() - startT)
+	report("in process, parsed files cached",tms)
@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+# benchIntake.py
+
+# Throughput and latency of the serial intake of the loggers, against the
+# fake devices (fakeDevices.py) on a pty:
+#
+#   controller  lines read with SerialTransport and parsed with getSensorData
+#               (temphumlog.py), and the round trip of a command (sendcmd,
+#               SP ... until its echo comes back) every 'interval' seconds
+#   sgp30       the handshake (findSerialNumber, sgp30log.py) and the eCO2
+#               lines
+#
+# For every rate (lines per second) it prints the lines parsed per second,
+# lines that did not parse, lines the device lost because the reader was too
+# slow (overruns), and the command round trips (median and max). Faults
+# (garbage, dropped echoes, stalls) can be added to see what they cost.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. An SGP30 line is only counted as parsed when sgp30log.getEco2() gives a
+#    value, as in sgp30log.py.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+from serialComms import SerialTransport
+from fakeDevices import FakeController, FakeSGP30
+import temphumlog
+import sgp30log
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+def quiet(msg):
+	return
+
+# -----------------------------------------------------------------------------
+def benchController(link,rate,seconds,interval,faults):
+	dev = FakeController(link,rate,faults['garbage'],faults['stall'],
+		dropEcho=faults['drop echo'])
+	dev.start()
+	ser = SerialTransport(link,115200,0.2,5.0,log=quiet)
+	temphumlog.ser = ser
+	parsed = 0
+	failed = 0
+	trips = []
+	lost = 0
+	startT = time.monotonic()
+	nextCmd = startT + interval
+	sp = 20.0
+	while time.monotonic() - startT < seconds:
+		for s in ser.read():
+			s = s.strip()
+			if s == "":
+				continue
+			if s[0] in temphumlog.numbers and temphumlog.getSensorData(s)[0] != 9999.9:
+				parsed += 1
+			else:
+				failed += 1
+		if ser.ready and time.monotonic() >= nextCmd:
+			sp = 40.0 if sp == 20.0 else 20.0
+			t = time.monotonic()
+			# sendcmd sends again until the echo comes back: a dropped echo costs
+			# another try
+			if temphumlog.sendcmd(f"SP {sp:4.1f} 50.0"):
+				trips.append(time.monotonic() - t)
+			else:
+				lost += 1
+			nextCmd = time.monotonic() + interval
+	dt = time.monotonic() - startT
+	ser.close()
+	dev.unplug()
+	return(parsed/dt,failed,dev.overruns,trips,lost,dev)
+
+# -----------------------------------------------------------------------------
+def benchSGP30(link,rate,seconds,faults):
+	dev = FakeSGP30(link,rate,faults['garbage'],faults['stall'])
+	dev.start()
+	ser = SerialTransport(link,115200,0.2,5.0,handshake=sgp30log.findSerialNumber,
+		handshakeTime=10.0,log=quiet)
+	parsed = 0
+	failed = 0
+	startT = time.monotonic()
+	handshakeT = None
+	while time.monotonic() - startT < seconds:
+		for s in ser.read():
+			if not sgp30log.getEco2(s) is None:
+				parsed += 1
+			else:
+				failed += 1
+		if handshakeT is None and ser.ready:
+			handshakeT = time.monotonic() - startT
+	dt = time.monotonic() - startT
+	ser.close()
+	dev.unplug()
+	return(parsed/dt,failed,dev.overruns,handshakeT,dev)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Serial intake throughput and "+
+																 "command latency against the fake devices.")
+parser.add_argument("device",choices=['controller','sgp30'],nargs='?',
+										default='controller',help="Device (default controller).")
+parser.add_argument("-r","--rates",nargs=1,default=['1,100,1000,5000'],
+										help="Lines per second to try (default 1,100,1000,5000).")
+parser.add_argument("-t","--time",nargs=1,type=float,default=[5.0],
+										help="Seconds per rate (default 5).")
+parser.add_argument("-i","--interval",nargs=1,type=float,default=[0.5],
+										help="Seconds between commands (default 0.5).")
+parser.add_argument("-g","--garbage",nargs=1,type=float,default=[0.0],
+										help="Fraction of the lines followed by garbage.")
+parser.add_argument("-e","--drop-echo",nargs=1,type=float,default=[0.0],
+										help="Fraction of the commands not echoed.")
+parser.add_argument("-s","--stall",nargs=2,type=float,metavar=('EVERY','SECONDS'),
+										help="The device stops sending for SECONDS every EVERY "+
+										"seconds.")
+args = parser.parse_args()
+
+faults = {'garbage': args.garbage[0],'drop echo': args.drop_echo[0],
+	'stall': tuple(args.stall) if args.stall else None}
+
+with tempfile.TemporaryDirectory() as tmpdir:
+	link = os.path.join(tmpdir,'ttyFAKE')
+	for rate in [float(r) for r in args.rates[0].split(',')]:
+		if args.device == 'controller':
+			(lps,failed,overruns,trips,lost,dev) = benchController(link,rate,
+				args.time[0],args.interval[0],faults)
+			s = f"{rate:8.0f} lines/s: {lps:8.1f} parsed/s, {failed} not parsed, "
+			s += f"{overruns} overruns; "
+			if len(trips) > 0:
+				s += (f"{len(trips)} commands, round trip median "+
+					f"{statistics.median(trips)*1000:0.1f} ms, max {max(trips)*1000:0.1f} ms")
+			else:
+				s += "no commands echoed"
+			if lost > 0:
+				s += f", {lost} not echoed"
+		else:
+			(lps,failed,overruns,handshakeT,dev) = benchSGP30(link,rate,args.time[0],
+				faults)
+			s = f"{rate:8.0f} lines/s: {lps:8.1f} parsed/s, {failed} not parsed, "
+			s += f"{overruns} overruns; handshake "
+			s += f"{handshakeT:0.2f} s" if handshakeT is not None else "not done"
+		print(s)
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+# benchSerialLines.py
+
+# Compare the old way sgp30log.py read the serial port (one byte at a time,
+# string concatenation, regular expressions compiled for every line) with
+# LineReader (serialComms.py).
+#
+# A recorded SGP30 stream (a text file with the lines as received from the
+# Arduino) is replayed from memory through a stand-in for the serial port.
+# Without a recording a stream is made up: the greeting, eCO2 values and now
+# and then a line of garbage.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The new method matches the whole line, as sgp30log.py does now.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import re
+import time
+import random
+import argparse
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+from serialComms import LineReader
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+# Just enough of serial.Serial: the data arrives in chunks of random size,
+# like it does when the program only gets round to reading every now and then.
+class ReplaySerial:
+
+	def __init__(self,data,maxchunk):
+		self.data = data
+		self.pos = 0
+		self.avail = 0
+		self.maxchunk = maxchunk
+		self.rnd = random.Random(1)
+
+	@property
+	def in_waiting(self):
+		if self.avail == 0 and self.pos < len(self.data):
+			self.avail = min(self.rnd.randint(1,self.maxchunk),
+				len(self.data) - self.pos)
+		return(self.avail)
+
+	def read(self,n=1):
+		n = min(n,self.in_waiting)
+		b = self.data[self.pos:self.pos+n]
+		self.pos += n
+		self.avail -= n
+		return(b)
+
+	def done(self):
+		return(self.pos >= len(self.data))
+
+# -----------------------------------------------------------------------------
+def makeStream(n):
+	rnd = random.Random(2)
+	s = "SGP30 sensor\r\nFound SGP30 serial #017E3A8B\r\n"
+	for i in range(0,n):
+		if rnd.random() < 0.001:
+			s += "?\x07garbage\r\n"
+		s += f"{rnd.randint(400,1500)}\r\n"
+	return(s.encode('ascii'))
+
+# -----------------------------------------------------------------------------
+# The way sgp30log.py version 0.1 did it (without the sleeps)
+def oldMethod(ser):
+	s = ""
+	n = 0
+	while not ser.done():
+		while ser.in_waiting > 0:
+			c = ser.read(1)
+			if c[0] >= 32:
+				s += c.decode('utf-8')
+			if c[0] == 10:
+				p = re.compile(r'(\d+)')
+				if re.match(p,s):
+					float(s)
+					n += 1
+				else:
+					p = re.compile(r'Found SGP30 serial #(.*)')
+					m = re.match(p,s)
+				s = ""
+	return(n)
+
+# -----------------------------------------------------------------------------
+def newMethod(ser):
+	eco2Pattern = re.compile(r'([0-9]+)')
+	snPattern = re.compile(r'Found SGP30 serial #(.*)')
+	reader = LineReader()
+	n = 0
+	while not ser.done():
+		for s in reader.readWaiting(ser):
+			if eco2Pattern.fullmatch(s.strip()):
+				float(s)
+				n += 1
+			else:
+				m = snPattern.match(s)
+	return(n)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Replay an SGP30 stream through "+
+																 "the old and the new serial line reading code")
+parser.add_argument("-f","--file",nargs=1,help="Recorded stream (text, as "+
+										"received from the sensor). Default is a made up stream.")
+parser.add_argument("-n","--number",nargs=1,type=int,default=[100000],
+										help="Number of eCO2 lines in the made up stream "+
+										"(default 100000).")
+parser.add_argument("-m","--maxchunk",nargs=1,type=int,default=[64],
+										help="Largest number of bytes waiting at a time "+
+										"(default 64).")
+args = parser.parse_args()
+
+if args.file:
+	with open(args.file[0],'rb') as f:
+		data = f.read()
+		f.close()
+else:
+	data = makeStream(args.number[0])
+
+print(f"Stream: {len(data)} bytes")
+
+for name,method in [('byte at a time (old)',oldMethod),
+										('LineReader (new)',newMethod)]:
+	ser = ReplaySerial(data,args.maxchunk[0])
+	startT = time.perf_counter()
+	n = method(ser)
+	dt = time.perf_counter() - startT
+	print(f"{name:24s} {n:8d} lines in {dt:7.3f} s, {n/dt:10.0f} lines/s")
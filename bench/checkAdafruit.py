@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+# checkAdafruit.py
+
+# Checks the Adafruit IO sink of upload.py (AdafruitSink, AdafruitClient in
+# uploadSinks.py) against the local stand-in (fakeAdafruit.py):
+#
+#   group     one set of readings of all the feeds in the [feeds] section of
+#             upload.conf must go in ONE request (group data), with the time
+#             they were read
+#   backlog   readings queued during an outage go per feed (feed data batch);
+#             every point must arrive with its own time (created_at), not the
+#             time it was sent
+#
+# The exit code is 1 if anything failed.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+import configparser
+
+benchdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(benchdir,'..','bin'))
+
+from uploadSinks import makeSinks, isoTime
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+def startServer(cmd):
+	p = subprocess.Popen([sys.executable]+cmd,stdout=subprocess.PIPE,text=True)
+	p.stdout.readline() # "listening on ..."
+	p.lines = []
+	t = threading.Thread(target=lambda: p.lines.extend(iter(p.stdout.readline,
+		'')),daemon=True)
+	t.start()
+	return(p)
+
+# -----------------------------------------------------------------------------
+# The feed names, as upload.py reads them
+def readFeeds(flnm):
+	feeds = {'temperature': 'studio-temp','humidity': 'studio-hum',
+		'dewpoint': 'studio-dewpoint','eco2': 'studio-eco2'}
+	conf = configparser.ConfigParser()
+	conf.read(flnm)
+	if conf.has_section('feeds'):
+		for k in feeds:
+			feeds[k] = conf['feeds'].get(k,feeds[k])
+	return(list(feeds.values()))
+
+# -----------------------------------------------------------------------------
+# What the stand-in received since line 'start': (path, feed, value, created)
+def received(aio,start,n):
+	deadline = time.monotonic() + 5.0
+	while len(aio.lines) < start + n and time.monotonic() < deadline:
+		time.sleep(0.05)
+	points = []
+	for l in aio.lines[start:]:
+		w = l.split()
+		points.append((w[2],w[3],w[5],w[6] if len(w) > 6 else ''))
+	return(points)
+
+# -----------------------------------------------------------------------------
+def check(title,ok):
+	global failed
+	print(f"  {title:60s} {'ok' if ok else 'FAILED'}")
+	if not ok:
+		failed += 1
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Check the Adafruit IO group "+
+																 "and batch requests against the local "+
+																 "stand-in.")
+parser.add_argument("-c","--config",nargs=1,
+										default=[os.path.join(benchdir,'..','etc',
+										'upload.conf')],
+										help="upload.conf with the [feeds] (default the "+
+										"one in etc).")
+parser.add_argument("-p","--port",nargs=1,type=int,default=[18095],
+										help="Port for the stand-in (default 18095).")
+parser.add_argument("-n","--readings",nargs=1,type=int,default=[20],
+										help="Minutes of readings in the backlog (default "+
+										"20).")
+args = parser.parse_args()
+
+failed = 0
+feeds = readFeeds(args.config[0])
+user = 'bench'
+group = 'bench'
+
+aio = startServer([os.path.join(benchdir,'fakeAdafruit.py'),'-p',
+	str(args.port[0]),'-k','benchkey'])
+try:
+	conf = configparser.ConfigParser()
+	conf.read_dict({'adafruit': {'user': user,'key': 'benchkey',
+		'url': f"http://127.0.0.1:{args.port[0]}",'group': group,
+		'timeout': '2','retries': '0'}})
+	sink = makeSinks(conf,['adafruit'],'/tmp/')[0]
+	responses = []
+	observe = sink.client.observe
+	sink.client.observe = lambda r: (responses.append(r),observe(r))
+
+	print(f"Group send of {len(feeds)} feeds ({', '.join(feeds)}):")
+	created = int(time.time()) - 30
+	rows = [(i,feeds[i],20.0 + i,created) for i in range(0,len(feeds))]
+	sink.send(rows)
+	points = received(aio,0,len(feeds))
+	check(f"{len(responses)} request(s)",len(responses) == 1)
+	check("request to the group",len(responses) == 1 and
+		responses[0].request.url.endswith(f"/{user}/groups/{group}/data") and
+		responses[0].status_code == 200)
+	check(f"{len(points)} of {len(feeds)} feeds received",
+		sorted([p[1] for p in points]) == sorted(feeds))
+	check("read time kept",all([p[3] == isoTime(created) for p in points]))
+
+	print(f"Backlog of {args.readings[0]} minutes of {len(feeds)} feeds:")
+	start = len(aio.lines)
+	responses.clear()
+	created = int(time.time()) - 3600
+	rows = []
+	for i in range(0,args.readings[0]):
+		for f in feeds:
+			rows.append((len(rows),f,float(i),created + 60*i))
+	sink.send(rows)
+	points = received(aio,start,len(rows))
+	check(f"{len(responses)} request(s), one per feed",
+		len(responses) == len(feeds))
+	check("requests to the feed batches",sorted([r.request.url for r in
+		responses]) == sorted([f"http://127.0.0.1:{args.port[0]}/api/v2/{user}/"+
+		f"feeds/{f}/data/batch" for f in feeds]))
+	check(f"{len(points)} of {len(rows)} points received",
+		len(points) == len(rows))
+	sent = sorted([(f,isoTime(c)) for (i,f,v,c) in rows])
+	check("every point has its own time",sorted([(p[1],p[3]) for p in points])
+		== sent)
+	sink.shutdown()
+finally:
+	aio.terminate()
+	aio.wait()
+
+if failed > 0:
+	print(f"{failed} check(s) failed")
+	sys.exit(1)
+print("All checks passed")
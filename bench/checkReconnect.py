@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+# checkReconnect.py
+
+# Checks that SerialTransport (serialComms.py) gets the data flowing again
+# after the sensor goes away, with a pseudo terminal (pty) standing in for
+# the SGP30 Arduino:
+#
+#   unplug   the device disappears (the pty is closed and the link to it
+#            removed) for a few seconds and comes back as a new pty, like a
+#            USB serial adapter that drops out
+#   silence  the device stays but sends nothing for a while, and then
+#            restarts (sends its serial number again)
+#
+# The handshake is the one sgp30log.py uses (findSerialNumber). For each
+# case the connections, the gaps in the data and the lines received are
+# printed, and if the data did not come back.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The fake SGP30 is the one in fakeDevices.py.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+from serialComms import SerialTransport
+from fakeDevices import FakeSGP30
+import sgp30log
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def log(msg):
+	if args.verbose:
+		print(ts(),msg)
+	return
+
+# -----------------------------------------------------------------------------
+# Reads for 'seconds', doing the actions (time, function) on the way.
+# Returns the lines received before and after the last action.
+def run(ser,seconds,actions):
+	startT = time.monotonic()
+	before = 0
+	after = 0
+	while time.monotonic() - startT < seconds:
+		if len(actions) > 0 and time.monotonic() - startT >= actions[0][0]:
+			actions.pop(0)[1]()
+		lines = ser.read()
+		if len(actions) > 0:
+			before += len(lines)
+		else:
+			after += len(lines)
+	return(before,after)
+
+# -----------------------------------------------------------------------------
+def check(name,ser,before,after,expectGap):
+	ok = ser.ready and after > 0 and len(ser.gaps) == 1
+	ok = ok and ser.gaps[0] >= expectGap
+	print(f"  {name:8s} {'ok' if ok else 'FAILED'}: {ser.stats()}; {before} lines "+
+		f"before, {after} after")
+	return(ok)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Check that SerialTransport "+
+																 "reconnects, against a pty stand-in for the "+
+																 "SGP30.")
+parser.add_argument("-g","--gap",nargs=1,type=float,default=[3.0],
+										help="Seconds the device is away (default 3).")
+parser.add_argument("-v","--verbose",action="store_true",
+										help="Show what the transport logs.")
+args = parser.parse_args()
+
+gap = args.gap[0]
+failed = 0
+
+with tempfile.TemporaryDirectory() as tmpdir:
+	link = os.path.join(tmpdir,'ttyFAKE')
+
+	# The device disappears and comes back as another pty
+	dev = [FakeSGP30(link,10.0)]
+	dev[0].start()
+	ser = SerialTransport(link,115200,0.2,2.0,
+		handshake=sgp30log.findSerialNumber,handshakeTime=10.0,
+		backoff=(0.25,1.0),log=log)
+	def plug():
+		dev[0] = FakeSGP30(link,10.0)
+		dev[0].start()
+		return
+	(before,after) = run(ser,3.0 + gap + 3.0,[(2.0,lambda: dev[0].unplug()),
+		(2.0 + gap,plug)])
+	if not check('unplug',ser,before,after,gap):
+		failed += 1
+	ser.close()
+	dev[0].unplug()
+
+	# The device is still there but quiet, then restarts
+	dev = FakeSGP30(link,10.0)
+	dev.start()
+	ser = SerialTransport(link,115200,0.2,1.0,
+		handshake=sgp30log.findSerialNumber,handshakeTime=10.0,
+		backoff=(0.25,1.0),log=log)
+	def quiet():
+		dev.quiet = True
+		return
+	(before,after) = run(ser,3.0 + gap + 3.0,[(2.0,quiet),(2.0 + gap,dev.restart)])
+	if not check('silence',ser,before,after,gap):
+		failed += 1
+	ser.close()
+	dev.unplug()
+
+sys.exit(1 if failed > 0 else 0)
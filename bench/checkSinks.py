@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+# checkSinks.py
+
+# Runs all the upload sinks (uploadSinks.py) against the local stand-in
+# servers (fakeAdafruit.py and fakeSinks.py) and checks that every queued data
+# point arrived at every sink.
+#
+# Then the stand-ins for MQTT, InfluxDB and HTTP are made slow (--delay) to
+# show that Adafruit and the file sink are not held up by them: the time each
+# sink took is printed.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import configparser
+
+benchdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(benchdir,'..','bin'))
+
+from uploadQueue import UploadQueue
+from uploadSinks import makeSinks, drainSink
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+FEEDS = ['studio-temp','studio-hum','studio-dewpoint','studio-eco2']
+
+# -----------------------------------------------------------------------------
+def startServer(cmd):
+	p = subprocess.Popen([sys.executable]+cmd,stdout=subprocess.PIPE,text=True)
+	p.stdout.readline() # "listening on ..."
+	p.lines = []
+	t = threading.Thread(target=lambda: p.lines.extend(iter(p.stdout.readline,
+		'')),daemon=True)
+	t.start()
+	return(p)
+
+# -----------------------------------------------------------------------------
+def config(tmpdir):
+	conf = configparser.ConfigParser()
+	conf.read_dict({
+		'adafruit': {'user': 'bench','key': 'benchkey',
+			'url': f"http://127.0.0.1:{args.port[0]}",'rate': '100000',
+			'timeout': '2','retries': '0'},
+		'mqtt': {'host': '127.0.0.1','port': str(args.port[0]+2),
+			'timeout': '2','retries': '0'},
+		'influxdb': {'url': f"http://127.0.0.1:{args.port[0]+1}",'org': 'bench',
+			'bucket': 'bench','timeout': '2','retries': '0'},
+		'http': {'url': f"http://127.0.0.1:{args.port[0]+1}/ingest",
+			'timeout': '2','retries': '0'},
+		'file': {'file': os.path.join(tmpdir,'upload.csv')}})
+	return(conf)
+
+# -----------------------------------------------------------------------------
+async def timed(sink,queue,deadline,stopping):
+	startT = time.perf_counter()
+	n = await drainSink(sink,queue,deadline,stopping)
+	return(n,time.perf_counter() - startT)
+
+# -----------------------------------------------------------------------------
+async def cycle(sinks,queue,deadline):
+	stopping = threading.Event()
+	res = await asyncio.gather(*[timed(sink,queue,deadline,stopping)
+		for sink in sinks])
+	return(dict(zip([sink.name for sink in sinks],res)))
+
+# -----------------------------------------------------------------------------
+def run(title,delay):
+	print(f"{title}:")
+	with tempfile.TemporaryDirectory() as tmpdir:
+		aio = startServer([os.path.join(benchdir,'fakeAdafruit.py'),'-p',
+			str(args.port[0]),'-k','benchkey'])
+		fake = startServer([os.path.join(benchdir,'fakeSinks.py'),'--http-port',
+			str(args.port[0]+1),'--mqtt-port',str(args.port[0]+2),'--delay',
+			str(delay)])
+		try:
+			conf = config(tmpdir)
+			names = conf.sections()
+			sinks = makeSinks(conf,names,tmpdir+'/')
+			queue = UploadQueue(os.path.join(tmpdir,'upload.db'),100000,names)
+			for i in range(args.readings[0]):
+				queue.put([(f,20.0+i) for f in FEEDS],time.time() - 60*i)
+			res = asyncio.run(cycle(sinks,queue,time.monotonic() + 30.0))
+			time.sleep(0.5) # let the servers print what they received
+			for sink in sinks:
+				(n,t) = res[sink.name]
+				print(f"  {sink.name:9s} {n:5d} points in {t:6.2f} s, "+
+					f"{queue.depth(sink.name):5d} waiting, {sink.stats()}")
+			for sink in sinks:
+				sink.shutdown()
+			queue.close()
+			total = args.readings[0]*len(FEEDS)
+			got = {'adafruit': len(aio.lines),
+				'file': sum(1 for l in open(os.path.join(tmpdir,'upload.csv'))),
+				'influxdb': len([l for l in fake.lines if ' influxdb ' in l]),
+				'http': len([l for l in fake.lines if ' http ' in l]),
+				'mqtt': len([l for l in fake.lines if ' mqtt ' in l])}
+			for name in names:
+				print(f"  {name:9s} {got[name]:5d} of {total} points received"+
+					("" if got[name] == total else "  <<<"))
+		finally:
+			aio.terminate()
+			fake.terminate()
+			aio.wait()
+			fake.wait()
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Check all upload sinks against "+
+																 "the local stand-in servers.")
+parser.add_argument("-p","--port",nargs=1,type=int,default=[18090],
+										help="First of three ports to use (default 18090).")
+parser.add_argument("-n","--readings",nargs=1,type=int,default=[50],
+										help="Sets of readings queued (default 50).")
+parser.add_argument("--delay",nargs=1,type=float,default=[3.0],
+										help="Delay of the slow stand-ins (default 3 s).")
+args = parser.parse_args()
+
+run("All sinks",0.0)
+run(f"MQTT, InfluxDB and HTTP stand-ins answering after {args.delay[0]} s",
+	args.delay[0])
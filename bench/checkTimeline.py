@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+# checkTimeline.py
+
+# Checks the settings that classSchedule.py makes (createTHsettings and
+# checkTHsettings) on random class schedules. The schedules come from a
+# seeded random generator, so a failure can be repeated with the same seed.
+# Every class gets its own preheat time (as the lead times of
+# preheatPlanner.py do). For every schedule:
+#
+#   - the times are sorted, unique and in the week (0 .. WEEK - 1)
+#   - the first line is at Monday 00:00
+#   - the heat and humidity are never off inside a class or its preheat
+#   - when no classes overlap, the settings are exactly the lines createClass
+#     makes for the classes, in time order, with the week wrapped around and
+#     the setting carried over to Monday 00:00
+#
+# A few fixed schedules check classes that cross Sunday to Monday. The exit
+# code is 1 if anything failed.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import bisect
+import random
+import argparse
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+import classSchedule
+from classSchedule import Event, OFF, WEEK
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+TEMPS = [28.0 + 0.5*i for i in range(0,25)]
+HUMS = [35.0 + 5.0*i for i in range(0,6)]
+
+# -----------------------------------------------------------------------------
+# A random schedule of up to 'n' classes, and a preheat time for every class
+def randomSchedule(rnd,n):
+	schedule = []
+	leads = {}
+	for i in range(0,n):
+		dy = rnd.choice(classSchedule.weekdays)
+		tm = f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}"
+		if (dy,tm) in leads:
+			continue
+		schedule.append([dy,tm,rnd.choice(TEMPS),rnd.choice(HUMS)])
+		leads[(dy,tm)] = rnd.randrange(30,361)
+	return(schedule,leads)
+
+# -----------------------------------------------------------------------------
+# The temp / hum set at minute 'm' of the week
+def stateAt(ths,minutes,m):
+	e = ths[bisect.bisect_right(minutes,m % WEEK) - 1]
+	return(e.temp,e.hum)
+
+# -----------------------------------------------------------------------------
+# True if no class (preheat to switch off) touches another one, on the week
+# that wraps around
+def noOverlap(classes):
+	windows = sorted([(c[0].minute % WEEK,c[-1].minute - c[0].minute)
+		for c in classes])
+	for i in range(0,len(windows)):
+		(start,length) = windows[i]
+		nxt = windows[(i + 1) % len(windows)][0]
+		if i == len(windows) - 1:
+			nxt += WEEK
+		if start + length >= nxt:
+			return(False)
+	return(True)
+
+# -----------------------------------------------------------------------------
+# Classes without overlaps: the lines of createClass wrapped to the week and
+# sorted, what was set last in the week is set at Monday 00:00
+def baseline(classes):
+	events = sorted([Event(e.minute % WEEK,e.temp,e.hum)
+		for c in classes for e in c])
+	if events[0].minute != 0:
+		events.insert(0,Event(0,events[-1].temp,events[-1].hum))
+	return(events)
+
+# -----------------------------------------------------------------------------
+# The problems with the settings 'ths' made from 'classes'
+def check(classes,ths):
+	errors = []
+	if len(ths) == 0 or ths[0].minute != 0:
+		errors.append("does not start at Monday 00:00")
+		return(errors)
+	minutes = [e.minute for e in ths]
+	for i in range(0,len(ths)):
+		if minutes[i] < 0 or minutes[i] >= WEEK:
+			errors.append(f"time out of the week: {minutes[i]}")
+		if i > 0 and minutes[i] <= minutes[i-1]:
+			errors.append(f"not sorted or not unique at {minutes[i]}")
+	if errors:
+		return(errors)
+	# The settings only change at their times, so the start of a class and the
+	# times inside it are all that need to be looked at
+	for c in classes:
+		start = c[0].minute % WEEK
+		length = c[-1].minute - c[0].minute
+		for m in [start] + [m for m in minutes if (m - start) % WEEK < length]:
+			if stateAt(ths,minutes,m) == (OFF.temp,OFF.hum):
+				errors.append(f"off at {m} during the class at {formatEvent(c)}")
+				break
+	if noOverlap(classes) and ths != baseline(classes):
+		errors.append("classes without overlaps are not as createClass made them")
+	return(errors)
+
+# -----------------------------------------------------------------------------
+def formatEvent(c):
+	return(classSchedule.formatEvent(Event(c[0].minute % WEEK,c[0].temp,
+		c[0].hum)))
+
+# -----------------------------------------------------------------------------
+# Settings for a schedule, the lead times are used for all classes
+def settings(schedule,leads):
+	classes = classSchedule.createTHsettings(schedule,[24],[120],leads)
+	try:
+		ths = classSchedule.checkTHsettings(classes)
+	except SystemExit:
+		ths = []   # checkTimeline() did not like it
+	return(classes,ths)
+
+# -----------------------------------------------------------------------------
+def report(name,errors):
+	global failed
+	if errors:
+		failed += 1
+		if failed <= args.show[0]:
+			print(f"FAIL {name}:")
+			for e in errors:
+				print(f"  {e}")
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Check the settings made from "+
+																 "random class schedules.")
+parser.add_argument("-n","--number",nargs=1,type=int,default=[5000],
+										help="Number of random schedules (default 5000).")
+parser.add_argument("-s","--seed",nargs=1,type=int,default=[1],
+										help="Seed of the random schedules (default 1).")
+parser.add_argument("-m","--max-classes",dest="maxclasses",nargs=1,type=int,
+										default=[20],help="Most classes in a schedule "+
+										"(default 20).")
+parser.add_argument("--show",nargs=1,type=int,default=[10],
+										help="Failures shown (default 10).")
+args = parser.parse_args()
+
+failed = 0
+
+# Across Sunday to Monday: (schedule, preheat times, the settings expected or
+# None if only the checks are done)
+sunday = [['SUNDAY','23:30',32.0,45.0]]
+monday = [['MONDAY','00:10',30.0,40.0]]
+fixed = [
+	(sunday,{('SUNDAY','23:30'): 60},[Event(0,32.0,45.0),Event(65,OFF.temp,
+		OFF.hum),Event(WEEK-90,25.0,55.0),Event(WEEK-60,27.0,50.0),
+		Event(WEEK-45,32.0,45.0)]),
+	(monday,{('MONDAY','00:10'): 120},[Event(0,30.0,40.0),Event(105,OFF.temp,
+		OFF.hum),Event(WEEK-110,25.0,55.0),Event(WEEK-80,25.0,50.0),
+		Event(WEEK-65,30.0,40.0)]),
+	(monday,{('MONDAY','00:10'): 10},[Event(0,25.0,55.0),Event(30,25.0,50.0),
+		Event(45,30.0,40.0),Event(105,OFF.temp,OFF.hum)]),
+	(sunday + [['MONDAY','00:30',30.0,40.0]],{('SUNDAY','23:30'): 60,
+		('MONDAY','00:30'): 60},None),
+	(sunday + [['MONDAY','06:00',30.0,40.0]],{('SUNDAY','23:30'): 60,
+		('MONDAY','06:00'): 400},None)]
+for (schedule,leads,expected) in fixed:
+	(classes,ths) = settings(schedule,leads)
+	errors = check(classes,ths)
+	if expected is not None and ths != expected:
+		errors.append(f"expected {expected}, got {ths}")
+	report(f"{schedule} {leads}",errors)
+
+rnd = random.Random(args.seed[0])
+separate = 0
+for i in range(0,args.number[0]):
+	(schedule,leads) = randomSchedule(rnd,rnd.randint(1,args.maxclasses[0]))
+	(classes,ths) = settings(schedule,leads)
+	if noOverlap(classes):
+		separate += 1
+	report(f"schedule {i} (seed {args.seed[0]})",check(classes,ths))
+
+print(f"{len(fixed)} fixed and {args.number[0]} random schedules, {separate} "+
+	f"without overlaps: {failed} failed")
+if separate == 0:
+	print("No random schedule without overlaps, use fewer classes (-m)")
+	sys.exit(1)
+if failed > 0:
+	sys.exit(1)
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+# fakeAdafruit.py
+
+# A local stand-in for the Adafruit IO REST API, to run upload.py against
+# without using (or waiting for) the real service. Set 'url' in the [adafruit]
+# section of upload.conf to http://localhost:<port>.
+#
+# Endpoints:
+#   POST /api/v2/<user>/groups/<group>/data        {"feeds": [{key, value}]}
+#   POST /api/v2/<user>/feeds/<feed>/data          {"value": ...}
+#   POST /api/v2/<user>/feeds/<feed>/data/batch    [{"value": ...}, ...]
+#
+# Every data point received is printed. The server can be made slow or to
+# fail some of the requests to see what upload.py does. With --limit it
+# allows only so many data points a minute: the rate limit headers
+# (X-AIO-RateLimit-Limit, X-AIO-RateLimit-Remaining) are sent with every
+# answer, and 429 with Retry-After when there are too many.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Rate limit (--limit)
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+groupPattern = re.compile(r'/api/v2/([^/]+)/groups/([^/]+)/data$')
+feedPattern = re.compile(r'/api/v2/([^/]+)/feeds/([^/]+)/data(/batch)?$')
+
+lock = threading.Lock()
+window = collections.deque() # (time, points) accepted in the last minute
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+class Handler(BaseHTTPRequestHandler):
+
+	protocol_version = 'HTTP/1.1'  # keep-alive, like the real thing
+
+	def reply(self,code,body,headers={}):
+		data = json.dumps(body).encode()
+		self.send_response(code)
+		self.send_header('Content-Type','application/json')
+		self.send_header('Content-Length',str(len(data)))
+		for (k,v) in headers.items():
+			self.send_header(k,v)
+		self.end_headers()
+		self.wfile.write(data)
+		return
+
+	def do_POST(self):
+		n = int(self.headers.get('Content-Length',0))
+		body = self.rfile.read(n)
+		if args.delay[0] > 0:
+			time.sleep(args.delay[0])
+		if not self.headers.get('X-AIO-Key') == args.key[0]:
+			self.reply(401,{'error': 'invalid key'})
+			return
+		if random.random() < args.fail[0]:
+			self.reply(503,{'error': 'service unavailable'})
+			return
+		try:
+			payload = json.loads(body)
+		except ValueError:
+			self.reply(400,{'error': 'invalid JSON'})
+			return
+		points = []
+		m = groupPattern.match(self.path)
+		if m:
+			for f in payload.get('feeds',[]):
+				points.append((f['key'],f['value'],payload.get('created_at','')))
+		else:
+			m = feedPattern.match(self.path)
+			if not m:
+				self.reply(404,{'error': 'not found'})
+				return
+			if m.group(3):
+				for d in payload:
+					points.append((m.group(2),d['value'],d.get('created_at','')))
+			else:
+				points.append((m.group(2),payload['value'],
+					payload.get('created_at','')))
+		headers = {}
+		if args.limit[0] > 0:
+			with lock:
+				now = time.monotonic()
+				while len(window) > 0 and now - window[0][0] >= 60.0:
+					window.popleft()
+				used = sum([n for (t,n) in window])
+				headers['X-AIO-RateLimit-Limit'] = str(args.limit[0])
+				if used + len(points) > args.limit[0]:
+					headers['X-AIO-RateLimit-Remaining'] = str(args.limit[0] - used)
+					headers['Retry-After'] = str(int(60.0 - (now - window[0][0])) + 1)
+					print(f"{ts()}{self.path} throttled, {used} points this minute")
+					sys.stdout.flush()
+					self.reply(429,{'error': 'request limit reached'},headers)
+					return
+				window.append((now,len(points)))
+				headers['X-AIO-RateLimit-Remaining'] = str(args.limit[0] - used -
+					len(points))
+		for (k,v,c) in points:
+			print(f"{ts()}{self.path} {k} = {v} {c}")
+		sys.stdout.flush()
+		self.reply(200,[{'feed_key': k, 'value': v} for (k,v,c) in points],
+			headers)
+		return
+
+	def log_message(self,format,*a):
+		return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Local stand-in for the "+
+																 "Adafruit IO REST API")
+parser.add_argument("-p","--port",nargs=1,type=int,default=[8080],
+										help="Port to listen on (default 8080).")
+parser.add_argument("-k","--key",nargs=1,default=['{Your_key_here}'],
+										help="The key upload.py must send.")
+parser.add_argument("--delay",nargs=1,type=float,default=[0.0],
+										help="Wait this many seconds before answering.")
+parser.add_argument("--fail",nargs=1,type=float,default=[0.0],
+										help="Fraction of requests that fail (0 .. 1).")
+parser.add_argument("--limit",nargs=1,type=int,default=[0],
+										help="Data points allowed per minute (default no "+
+										"limit).")
+args = parser.parse_args()
+
+server = ThreadingHTTPServer(('127.0.0.1',args.port[0]),Handler)
+print(f"{ts()}{script} listening on http://127.0.0.1:{args.port[0]}")
+sys.stdout.flush()
+try:
+	server.serve_forever()
+except KeyboardInterrupt:
+	pass
+server.server_close()
@@ -0,0 +1,369 @@
+#!/usr/bin/python3
+# fakeDevices.py
+
+# Stand-ins for the two Arduinos, on a pseudo terminal (pty), so that
+# temphumlog.py and sgp30log.py (and the benchmarks) can be run without the
+# real hardware. 'link' is made a symbolic link to the pty: point 'port' in
+# the configuration file at it.
+#
+#   FakeController  the temperature / humidity controller: sends a line like
+#                     21.53 degC, 55.20 %RH, dp 12.21 degC, 22.0 degC, 50.0 %RH,
+#                     11.1 degC, AUTO, AUTO, OFF, OFF
+#                   (what getSensorData reads), and echoes the SP and BOOST
+#                   commands it receives, the way sendcmd expects
+#   FakeSGP30       the eCO2 sensor: sends its serial number until it gets OK,
+#                   then an eCO2 value every line; takes the compensation
+#                   values ('temp, hum') sgp30log.py sends
+#
+# Both send 'rate' lines per second (1 like the real ones, up to thousands
+# for benchmarks) and can be made to misbehave:
+#
+#   garbage   fraction of the lines that are followed by random bytes
+#             (control characters, bytes above 127, sometimes no line feed)
+#   dropEcho  fraction of the commands that are not echoed (controller)
+#   echoDelay seconds before a command is echoed (controller)
+#   stall     (every, seconds): stop sending for 'seconds' every 'every'
+#             seconds; stall(seconds) does it once
+#
+# The pty is not blocking: when the program does not read fast enough and
+# the pty is full, the lines are lost (counted in 'overruns', a line cut off
+# half way arrives as garbage), like a UART that overflows.
+#
+# Run on its own it makes one device until Ctrl-C, e.g.
+#
+#   fakeDevices.py controller /tmp/ttyCTRL --rate 1000 --garbage 0.01
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import pty
+import tty
+import math
+import time
+import random
+import select
+import signal
+import argparse
+import threading
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+# Dew point (degC) from temperature (degC) and relative humidity (%), Magnus
+def dewPoint(t,h):
+	g = math.log(max(h,0.1)/100.0) + 17.62*t/(243.12 + t)
+	return(243.12*g/(17.62 - g))
+
+# -----------------------------------------------------------------------------
+# What both devices have in common: the pty, the rate, the faults. A device
+# provides greeting() (lines to send before the data, [] for none), line()
+# (the next line of data) and command(s) (a line received).
+class FakeDevice(threading.Thread):
+
+	def __init__(self,link,rate=1.0,garbage=0.0,stall=None,seed=1):
+		super().__init__(daemon=True)
+		self.link = link
+		self.rate = rate          # lines per second
+		self.garbage = garbage
+		self.stallEvery = None
+		if stall is not None:
+			(self.stallEvery,self.stallTime) = stall
+		self.rnd = random.Random(seed)
+		(self.master,self.slave) = pty.openpty()
+		tty.setraw(self.slave)    # no echo, no line editing
+		os.set_blocking(self.master,False)
+		if os.path.islink(link):
+			os.unlink(link)
+		os.symlink(os.ttyname(self.slave),link)
+		self.rxBuf = bytearray()
+		self.quiet = False        # sends nothing while set
+		self.stalledUntil = 0.0
+		self.stopping = threading.Event()
+		self.lines = 0            # Statistics
+		self.bytes = 0
+		self.garbageSent = 0
+		self.stalls = 0
+		self.overruns = 0
+		self.received = 0
+
+	# Returns False if the pty is full (what did not fit is lost; 'lines' is
+	# the number of lines in s, for the overruns)
+	def send(self,s,lines=1):
+		data = s.encode('ascii','replace') if isinstance(s,str) else s
+		try:
+			n = os.write(self.master,data)
+		except BlockingIOError:
+			n = 0
+		except OSError:
+			return(False)
+		self.bytes += n
+		if n < len(data):
+			self.overruns += lines
+			return(False)
+		return(True)
+
+	def makeGarbage(self):
+		n = self.rnd.randint(1,40)
+		b = bytes([self.rnd.choice([self.rnd.randint(0,31),self.rnd.randint(32,126),
+			self.rnd.randint(128,255)]) for i in range(0,n)])
+		if self.rnd.random() < 0.7:
+			b += b'\r\n'
+		return(b)
+
+	# Stop sending for 'seconds' (as if the device hangs)
+	def stall(self,seconds):
+		self.stalledUntil = time.monotonic() + seconds
+		self.stalls += 1
+		return
+
+	def receive(self):
+		try:
+			r,w,x = select.select([self.master],[],[],0)
+			if len(r) == 0:
+				return
+			data = os.read(self.master,4096)
+		except (BlockingIOError,OSError):
+			return
+		self.rxBuf += data
+		while b'\n' in self.rxBuf:
+			(l,rest) = self.rxBuf.split(b'\n',1)
+			self.rxBuf = bytearray(rest)
+			s = l.decode('ascii','replace').strip()
+			if s != "":
+				self.received += 1
+				self.command(s)
+		return
+
+	def greeting(self):
+		return([])
+
+	def line(self):
+		raise NotImplementedError
+
+	def command(self,s):
+		return
+
+	# Lines that are due, sent together so that high rates are possible
+	def run(self):
+		startT = time.monotonic()
+		due = 0
+		nextStall = startT + self.stallEvery if self.stallEvery else None
+		while not self.stopping.is_set():
+			self.receive()
+			now = time.monotonic()
+			if nextStall is not None and now >= nextStall:
+				self.stall(self.stallTime)
+				nextStall = now + self.stallEvery
+			n = int((now - startT)*self.rate) - due
+			if n > 0:
+				due += n
+				if self.quiet or now < self.stalledUntil:
+					pass
+				else:
+					hello = self.greeting()
+					if len(hello) > 0:
+						self.send(''.join(hello))
+					else:
+						chunk = []
+						for i in range(0,n):
+							chunk.append(self.line().encode('ascii'))
+							if self.garbage > 0 and self.rnd.random() < self.garbage:
+								chunk.append(self.makeGarbage())
+								self.garbageSent += 1
+						if self.send(b''.join(chunk),n):
+							self.lines += n
+			self.stopping.wait(min(1.0/self.rate,0.01))
+		return
+
+	# The device goes away: the pty is closed and the link removed
+	def unplug(self):
+		self.stopping.set()
+		if self.is_alive():
+			self.join()
+		if os.path.islink(self.link):
+			os.unlink(self.link)
+		os.close(self.master)
+		os.close(self.slave)
+		return
+
+	def stats(self):
+		return(f"{self.lines} lines ({self.bytes} bytes) sent, {self.garbageSent} "+
+			f"garbage, {self.stalls} stalls, {self.overruns} overruns, "+
+			f"{self.received} lines received")
+
+# -----------------------------------------------------------------------------
+class FakeController(FakeDevice):
+
+	def __init__(self,link,rate=1.0,garbage=0.0,stall=None,seed=1,dropEcho=0.0,
+		echoDelay=0.0):
+		super().__init__(link,rate,garbage,stall,seed)
+		self.dropEcho = dropEcho
+		self.echoDelay = echoDelay
+		self.temp = 20.0
+		self.hum = 50.0
+		self.tset = 20.0
+		self.hset = 50.0
+		self.boost = False
+		self.commands = []        # (time, command) received
+		self.echoes = 0
+		self.dropped = 0
+
+	# The room warms up to the setpoint (faster with BOOST) and cools down
+	def line(self):
+		dt = 1.0/self.rate
+		heat = 0.01*(2.0 if self.boost else 1.0) if self.temp < self.tset else 0.0
+		self.temp += (heat - 0.002*(self.temp - 15.0))*dt*60
+		self.hum += (self.hset - self.hum)*0.005*dt*60
+		t = self.temp + self.rnd.gauss(0,0.02)
+		h = self.hum + self.rnd.gauss(0,0.1)
+		return(f"{t:0.2f} degC, {h:0.2f} %RH, dp {dewPoint(t,h):0.2f} degC, "+
+			f"{self.tset:0.1f} degC, {self.hset:0.1f} %RH, "+
+			f"{dewPoint(self.tset,self.hset):0.1f} degC, AUTO, AUTO, OFF, "+
+			f"{'ON' if self.boost else 'OFF'}\r\n")
+
+	def command(self,s):
+		self.commands.append((time.monotonic(),s))
+		d = s.split()
+		try:
+			if d[0] == 'SP' and len(d) == 3:
+				self.tset = float(d[1])
+				self.hset = float(d[2])
+			elif d[0] == 'BOOST' and len(d) == 2 and d[1] in ['ON','OFF']:
+				self.boost = d[1] == 'ON'
+			else:
+				self.send(f"Unknown command: {s}\r\n")
+				return
+		except ValueError:
+			self.send(f"Invalid command: {s}\r\n")
+			return
+		if self.rnd.random() < self.dropEcho:
+			self.dropped += 1
+			return
+		if self.echoDelay > 0:
+			time.sleep(self.echoDelay)
+		if self.send(s+'\r\n'):
+			self.echoes += 1
+		return
+
+	def stats(self):
+		return(super().stats()+f", {self.echoes} echoes, {self.dropped} echoes "+
+			"dropped")
+
+# -----------------------------------------------------------------------------
+class FakeSGP30(FakeDevice):
+
+	SERIAL = "017E3A8B"
+
+	def __init__(self,link,rate=1.0,garbage=0.0,stall=None,seed=1):
+		super().__init__(link,rate,garbage,stall,seed)
+		self.acked = False
+		self.eco2 = 450.0
+		self.compensation = None  # (temp, hum) last received
+
+	def greeting(self):
+		if self.acked:
+			return([])
+		return(["SGP30 sensor\r\n",f"Found SGP30 serial #{self.SERIAL}\r\n"])
+
+	def line(self):
+		self.eco2 = min(max(self.eco2 + self.rnd.gauss(0,5),400.0),2000.0)
+		return(f"{self.eco2:0.0f}\r\n")
+
+	def command(self,s):
+		if s == 'OK':
+			self.acked = True
+			return
+		d = s.split(',')
+		try:
+			self.compensation = (float(d[0]),float(d[1]))
+		except (ValueError,IndexError):
+			pass
+		return
+
+	# As if the Arduino was reset: the handshake starts again
+	def restart(self):
+		self.quiet = False
+		self.acked = False
+		return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="A fake temperature / humidity "+
+																	 "controller or SGP30 sensor on a pty.")
+	parser.add_argument("device",choices=['controller','sgp30'],
+											help="The device to make.")
+	parser.add_argument("link",help="Symbolic link to the pty (the port to "+
+											"configure in the logger).")
+	parser.add_argument("-r","--rate",nargs=1,type=float,default=[1.0],
+											help="Lines per second (default 1).")
+	parser.add_argument("-g","--garbage",nargs=1,type=float,default=[0.0],
+											help="Fraction of the lines followed by garbage.")
+	parser.add_argument("-e","--drop-echo",nargs=1,type=float,default=[0.0],
+											help="Fraction of the commands not echoed "+
+											"(controller).")
+	parser.add_argument("-s","--stall",nargs=2,type=float,
+											metavar=('EVERY','SECONDS'),help="Stop sending "+
+											"for SECONDS every EVERY seconds.")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	args = parser.parse_args()
+
+	if args.version:
+		print(f"{script} version {VERSION} written by {AUTHORS}")
+		sys.exit(0)
+
+	stall = tuple(args.stall) if args.stall else None
+	if args.device == 'controller':
+		dev = FakeController(args.link,args.rate[0],args.garbage[0],stall,
+			dropEcho=args.drop_echo[0])
+	else:
+		dev = FakeSGP30(args.link,args.rate[0],args.garbage[0],stall)
+
+	running = True
+	def signalHandler(signal,frame):
+		global running
+		running = False
+		return
+	signal.signal(signal.SIGINT,signalHandler)
+	signal.signal(signal.SIGTERM,signalHandler)
+
+	print(ts(),f"{args.device} on {args.link} -> {os.ttyname(dev.slave)}")
+	dev.start()
+	lastT = time.monotonic()
+	while running:
+		time.sleep(0.2)
+		if time.monotonic() - lastT >= 10.0:
+			print(ts(),dev.stats())
+			lastT = time.monotonic()
+	dev.unplug()
+	print(ts(),dev.stats())
@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+# fakeSinks.py
+
+# Local stand-ins for the upload sinks other than Adafruit IO (see
+# bench/fakeAdafruit.py for that one), to run upload.py or checkSinks.py
+# against:
+#
+#   HTTP (--http-port)
+#     POST /api/v2/write?org=&bucket=&precision=s   InfluxDB line protocol
+#     POST /ingest                                  JSON list (http sink)
+#   MQTT (--mqtt-port)
+#     A minimal MQTT 3.1.1 broker: accepts connections and PUBLISH (QoS 0
+#     and 1), does not pass messages on to anybody.
+#
+# Every data point received is printed. The servers can be made slow or to
+# fail some of the requests, like fakeAdafruit.py.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import socketserver
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+lock = threading.Lock()
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def show(src,points):
+	with lock:
+		for (k,v,c) in points:
+			print(f"{ts()}{src} {k} = {v} {c}")
+		sys.stdout.flush()
+	return
+
+# -----------------------------------------------------------------------------
+class HttpHandler(BaseHTTPRequestHandler):
+
+	protocol_version = 'HTTP/1.1'
+
+	def reply(self,code,body=None):
+		data = b'' if body is None else json.dumps(body).encode()
+		self.send_response(code)
+		self.send_header('Content-Type','application/json')
+		self.send_header('Content-Length',str(len(data)))
+		self.end_headers()
+		try:
+			self.wfile.write(data)
+		except (BrokenPipeError,ConnectionResetError):
+			pass    # the client gave up waiting
+		return
+
+	def do_POST(self):
+		n = int(self.headers.get('Content-Length',0))
+		body = self.rfile.read(n)
+		if args.delay[0] > 0:
+			time.sleep(args.delay[0])
+		if random.random() < args.fail[0]:
+			self.reply(503,{'error': 'service unavailable'})
+			return
+		url = urlparse(self.path)
+		points = []
+		try:
+			if url.path == '/api/v2/write':
+				q = parse_qs(url.query)
+				if not 'org' in q or not 'bucket' in q:
+					self.reply(400,{'code': 'invalid', 'message': 'no org or bucket'})
+					return
+				# <measurement>,feed=<feed> value=<value> <time>
+				for line in body.decode().splitlines():
+					(series,field,t) = line.split(' ')
+					feed = series.split(',feed=')[1].replace('\\','')
+					points.append((feed,float(field.split('=')[1]),t))
+				show('influxdb',points)
+				self.reply(204)
+			elif url.path == '/ingest':
+				for d in json.loads(body):
+					points.append((d['feed'],d['value'],d['created_at']))
+				show('http',points)
+				self.reply(200,{'received': len(points)})
+			else:
+				self.reply(404,{'error': 'not found'})
+		except (ValueError,KeyError,IndexError):
+			self.reply(400,{'error': 'bad request'})
+		return
+
+	def log_message(self,format,*a):
+		return
+
+# -----------------------------------------------------------------------------
+class MQTTHandler(socketserver.BaseRequestHandler):
+
+	def read(self,n):
+		data = b''
+		while len(data) < n:
+			b = self.request.recv(n - len(data))
+			if not b:
+				raise EOFError
+			data += b
+		return(data)
+
+	def packet(self):
+		head = self.read(1)[0]
+		(n,mult) = (0,1)
+		while True:
+			b = self.read(1)[0]
+			n += (b & 0x7F)*mult
+			mult *= 128
+			if b < 0x80:
+				break
+		return(head,self.read(n))
+
+	def handle(self):
+		try:
+			while True:
+				(head,body) = self.packet()
+				kind = head >> 4
+				if kind == 1:    # CONNECT -> CONNACK, accepted
+					self.request.sendall(bytes([0x20,2,0,0]))
+				elif kind == 3:  # PUBLISH
+					qos = (head >> 1) & 3
+					n = int.from_bytes(body[0:2],'big')
+					topic = body[2:2+n].decode()
+					p = 2 + n
+					if qos > 0:
+						pid = body[p:p+2]
+						p += 2
+					if args.delay[0] > 0:
+						time.sleep(args.delay[0])
+					if random.random() < args.fail[0]:
+						continue     # no PUBACK, the client times out
+					msg = json.loads(body[p:])
+					show(f"mqtt {topic}",[(topic,msg['value'],msg['created_at'])])
+					if qos > 0:
+						self.request.sendall(bytes([0x40,2])+pid)
+				elif kind == 12: # PINGREQ -> PINGRESP
+					self.request.sendall(bytes([0xD0,0]))
+				elif kind == 14: # DISCONNECT
+					break
+		except (EOFError,ConnectionError,OSError):
+			pass
+		return
+
+class MQTTServer(socketserver.ThreadingTCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Local stand-ins for the "+
+																 "InfluxDB, HTTP and MQTT upload sinks")
+parser.add_argument("--http-port",nargs=1,type=int,default=[8000],
+										help="HTTP (InfluxDB and JSON) port (default 8000).")
+parser.add_argument("--mqtt-port",nargs=1,type=int,default=[1883],
+										help="MQTT port (default 1883).")
+parser.add_argument("--delay",nargs=1,type=float,default=[0.0],
+										help="Wait this many seconds before answering.")
+parser.add_argument("--fail",nargs=1,type=float,default=[0.0],
+										help="Fraction of requests that fail (0 .. 1).")
+args = parser.parse_args()
+
+broker = MQTTServer(('127.0.0.1',args.mqtt_port[0]),MQTTHandler)
+threading.Thread(target=broker.serve_forever,daemon=True).start()
+server = ThreadingHTTPServer(('127.0.0.1',args.http_port[0]),HttpHandler)
+print(f"{ts()}{script} listening on http://127.0.0.1:{args.http_port[0]} "+
+	f"and mqtt://127.0.0.1:{args.mqtt_port[0]}")
+sys.stdout.flush()
+try:
+	server.serve_forever()
+except KeyboardInterrupt:
+	pass
+server.server_close()
+broker.shutdown()
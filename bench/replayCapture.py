@@ -0,0 +1,314 @@
+#!/usr/bin/python3
+# replayCapture.py
+
+# Replays the serial traffic captured by temphumlog.py or sgp30log.py
+# (--capture, see Capture in serialComms.py) through a pseudo terminal (pty),
+# so that what happened on site can be reproduced, and benchmarked, off site.
+#
+# What the device sent (R records) is sent again on the pty, at the times it
+# was received (--speed 1, or faster), or as fast as the reader takes it
+# (--fast). What the program writes to the pty is compared with what it
+# wrote on site (W records). With --sync the replay waits, at every W record,
+# until the program wrote as much again (up to --timeout seconds), so that
+# answers (the echo of a command, the data after the OK of the SGP30) come
+# after the question like they did, however fast the replay runs.
+#
+#   replayCapture.py CAPTURE --info              what is in the capture
+#   replayCapture.py CAPTURE LINK [--sync] ...   replay on LINK (point 'port'
+#                                                in the logger's configuration
+#                                                at it)
+#   replayCapture.py CAPTURE --bench controller|sgp30
+#                                                replay into the serial
+#                                                intake of the logger, in
+#                                                this process, and time it
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. An SGP30 line parses when sgp30log.getEco2() gives a value.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import select
+import signal
+import argparse
+import tempfile
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+from serialComms import SerialTransport, readCapture
+from fakeDevices import FakeDevice
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def quiet(msg):
+	return
+
+# -----------------------------------------------------------------------------
+# A device that sends what is in the capture. speed 0 is as fast as possible.
+class Replayer(FakeDevice):
+
+	def __init__(self,records,link,speed,sync,timeout,delay):
+		super().__init__(link)
+		self.records = records
+		self.speed = speed
+		self.sync = sync
+		self.timeout = timeout
+		self.delay = delay        # seconds before the replay starts
+		self.rx = bytearray()     # what the program wrote
+		self.expected = bytearray()
+		self.timeouts = 0         # --sync: W records the program did not write
+		self.done = False
+
+	def receive(self):
+		try:
+			r,w,x = select.select([self.master],[],[],0)
+			if len(r) > 0:
+				self.rx += os.read(self.master,4096)
+		except OSError:
+			pass
+		return
+
+	# Everything, waiting for the reader when the pty is full
+	def sendAll(self,data):
+		view = memoryview(data)
+		while len(view) > 0 and not self.stopping.is_set():
+			try:
+				n = os.write(self.master,view)
+				self.bytes += n
+				view = view[n:]
+			except BlockingIOError:
+				select.select([],[self.master],[],0.1)
+				self.receive()
+		return
+
+	def waitFor(self,t):
+		while not self.stopping.is_set():
+			self.receive()
+			wait = t - time.monotonic()
+			if wait <= 0:
+				break
+			self.stopping.wait(min(wait,0.01))
+		return
+
+	def run(self):
+		self.waitFor(time.monotonic() + self.delay)
+		startT = time.monotonic()
+		t0 = None
+		for (kind,t,data) in self.records:
+			if self.stopping.is_set():
+				break
+			if t0 is None and kind in ['R','W']:
+				t0 = t
+			if kind == 'R':
+				if self.speed > 0:
+					self.waitFor(startT + (t - t0)/self.speed)
+				self.sendAll(data)
+				self.lines += data.count(b'\n')
+			elif kind == 'W':
+				self.expected += data
+				if self.sync:
+					endT = time.monotonic() + self.timeout
+					while len(self.rx) < len(self.expected) and time.monotonic() < endT:
+						self.waitFor(time.monotonic() + 0.005)
+					if len(self.rx) < len(self.expected):
+						self.timeouts += 1
+			self.receive()
+		self.waitFor(time.monotonic() + 0.2)  # the last answers
+		self.done = True
+		return
+
+	# Where what the program wrote differs from the capture: (same, position
+	# of the first difference or None)
+	def compare(self):
+		n = min(len(self.rx),len(self.expected))
+		for i in range(0,n):
+			if self.rx[i] != self.expected[i]:
+				return(False,i)
+		return(len(self.rx) == len(self.expected),None)
+
+# -----------------------------------------------------------------------------
+def info(flnm,records):
+	kinds = {}
+	nbytes = {}
+	header = {}
+	for (kind,t,data) in records:
+		if kind == 'H':
+			header = data
+			continue
+		kinds[kind] = kinds.get(kind,0) + 1
+		nbytes[kind] = nbytes.get(kind,0) + len(data)
+	print(f"{flnm}: {header.get('program','?')}, started "+
+		time.strftime('%Y-%m-%d %H:%M:%S UTC',time.gmtime(header.get('time',0))))
+	if len(records) > 0:
+		print(f"  {records[-1][1]:0.1f} s, {len(records)} records")
+	print(f"  received {nbytes.get('R',0)} bytes ({kinds.get('R',0)} reads), "+
+		f"written {nbytes.get('W',0)} bytes ({kinds.get('W',0)} writes), "+
+		f"{kinds.get('O',0)} opens, {kinds.get('L',0)} losses")
+	for (kind,t,data) in records:
+		if kind == 'L':
+			print(f"  {t:10.1f} s  lost: {data.decode('utf-8','replace')}")
+	return
+
+# -----------------------------------------------------------------------------
+# The serial intake of temphumlog.py or sgp30log.py, in this process. The
+# handshake of the SGP30 is waited for (--sync), the commands temphumlog.py
+# sent are not (nothing sends them here). The time is from the end of the
+# handshake.
+def bench(records,link,device,speed,verbose):
+	if device == 'controller':
+		import temphumlog
+		ser = SerialTransport(link,115200,0.2,3600.0,log=quiet)
+		def parses(s):
+			return(len(s) > 0 and s[0] in temphumlog.numbers and
+				temphumlog.getSensorData(s)[0] != 9999.9)
+	else:
+		import sgp30log
+		ser = SerialTransport(link,115200,0.2,3600.0,
+			handshake=sgp30log.findSerialNumber,handshakeTime=3600.0,log=quiet)
+		def parses(s):
+			return(sgp30log.getEco2(s) is not None)
+	dev = Replayer(records,link,speed,device == 'sgp30',5.0,0.0)
+	# The port is open before the replay starts (opening it flushes the pty)
+	ser.read()
+	dev.start()
+	parsed = 0
+	failed = 0
+	startT = None
+	idleT = time.monotonic()
+	while not dev.done or time.monotonic() - idleT < 0.5:
+		lines = ser.read()
+		if startT is None and ser.ready:
+			startT = time.monotonic()
+		if len(lines) > 0:
+			idleT = time.monotonic()
+		for s in lines:
+			s = s.strip()
+			if s == "":
+				continue
+			if parses(s):
+				parsed += 1
+			else:
+				failed += 1
+				if verbose:
+					print(f"  not parsed: {s!r}")
+	dt = idleT - startT if startT is not None else 0.0
+	ser.close()
+	dev.unplug()
+	print(f"{dev.bytes} bytes, {parsed} lines parsed, {failed} not parsed in "+
+		f"{dt:0.3f} s: {parsed/max(dt,1e-6):0.0f} lines/s")
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Replay a serial capture through "+
+																 "a pty.")
+parser.add_argument("capture",help="The capture (--capture of the logger).")
+parser.add_argument("link",nargs='?',help="Symbolic link to the pty to make.")
+parser.add_argument("-i","--info",action="store_true",help="Show what is in "+
+										"the capture and exit.")
+parser.add_argument("-b","--bench",choices=['controller','sgp30'],
+										help="Replay (as fast as possible) into the serial "+
+										"intake of temphumlog.py or sgp30log.py in this process.")
+parser.add_argument("-s","--speed",nargs=1,type=float,default=[1.0],
+										help="1 is real time (default), 10 ten times faster.")
+parser.add_argument("-f","--fast",action="store_true",help="As fast as the "+
+										"program reads.")
+parser.add_argument("--sync",action="store_true",help="Wait for the program "+
+										"to write what it wrote on site before going on.")
+parser.add_argument("-t","--timeout",nargs=1,type=float,default=[10.0],
+										help="Seconds --sync waits (default 10).")
+parser.add_argument("-w","--wait",nargs=1,type=float,default=[2.0],
+										help="Seconds to wait for the program to open the "+
+										"port before the replay starts (default 2).")
+parser.add_argument("-v","--verbose",action="store_true",help="Show the "+
+										"lines that were not parsed (--bench).")
+args = parser.parse_args()
+
+try:
+	records = list(readCapture(args.capture))
+except (OSError,ValueError) as e:
+	print(f"ERROR: {e}")
+	sys.exit(1)
+
+if args.info:
+	info(args.capture,records)
+	sys.exit(0)
+
+speed = 0.0 if args.fast else args.speed[0]
+
+if args.bench:
+	with tempfile.TemporaryDirectory() as tmpdir:
+		bench(records,os.path.join(tmpdir,'ttyREPLAY'),args.bench,0.0,args.verbose)
+	sys.exit(0)
+
+if not args.link:
+	print("ERROR: a link for the pty is needed (or --info / --bench)")
+	sys.exit(1)
+
+running = True
+def signalHandler(signal,frame):
+	global running
+	running = False
+	return
+signal.signal(signal.SIGINT,signalHandler)
+signal.signal(signal.SIGTERM,signalHandler)
+
+dev = Replayer(records,args.link,speed,args.sync,args.timeout[0],args.wait[0])
+print(ts(),f"Replaying {args.capture} on {args.link} -> {os.ttyname(dev.slave)}")
+startT = time.monotonic()
+dev.start()
+while running and not dev.done:
+	time.sleep(0.1)
+dev.unplug()
+(same,pos) = dev.compare()
+s = (f"{dev.bytes} bytes sent in {time.monotonic() - startT:0.1f} s; the "+
+	f"program wrote {len(dev.rx)} bytes, {len(dev.expected)} on site: ")
+if same:
+	s += "the same"
+elif pos is None:
+	s += "the same as far as it went"
+else:
+	s += (f"different from byte {pos} ({bytes(dev.rx[pos:pos+20])!r} instead of "+
+		f"{bytes(dev.expected[pos:pos+20])!r})")
+if args.sync:
+	s += f"; {dev.timeouts} writes did not come"
+print(ts(),s)
@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+# simRateLimit.py
+
+# Simulates upload.py sending the data of a number of rooms (four feeds each:
+# temperature, humidity, dew point and eCO2) to a service that allows 30 (or
+# another number of) data points a minute, to see how fresh and how accurate
+# the data at the service is with:
+#
+#   fifo       every point, oldest first (upload.py before the scheduler)
+#   deadband   points within the deadband left out, oldest first
+#   scheduled  deadband, and the fastest changing feeds first (FeedScheduler)
+#
+# Time is simulated, a day takes a few seconds. The sink keeps the newest
+# point it got for each feed; every minute the age of that point (freshness)
+# and how far its value is from the true value (in deadbands) are noted.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import math
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import configparser
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+from uploadQueue import UploadQueue
+from uploadSinks import Sink, drainSink
+from uploadSchedule import FeedScheduler
+
+script = os.path.basename(__file__)
+VERSION = "0.1"
+AUTHORS = "Louis Marais"
+
+BANDS = {'temp': 0.05, 'hum': 0.3, 'dewpoint': 0.1, 'eco2': 5.0}
+START = 1790000000.0 # a Monday, 2026-09-21
+
+# -----------------------------------------------------------------------------
+# Keeps the newest point of every feed, instead of sending it anywhere
+class RecordSink(Sink):
+
+	def open(self):
+		self.got = {}
+		return
+
+	def send(self,rows):
+		for (i,feed,value,created) in rows:
+			if not feed in self.got or created > self.got[feed][1]:
+				self.got[feed] = (value,created)
+		return
+
+# -----------------------------------------------------------------------------
+class FifoScheduler(FeedScheduler):
+
+	def order(self,rows):
+		return(list(rows))
+
+# -----------------------------------------------------------------------------
+# A room: slow daily swing, noise, and classes (an hour at a time, at random)
+# that heat the room and raise the humidity and eCO2.
+class Room:
+
+	def __init__(self,n,rnd):
+		self.n = n
+		self.rnd = rnd
+		self.heat = 0.0
+		self.inClass = 0
+
+	def read(self,t):
+		if self.inClass > 0:
+			self.inClass -= 1
+			self.heat = min(self.heat + 0.1,4.0)
+		else:
+			self.heat = max(self.heat - 0.03,0.0)
+			if self.rnd.random() < 1/300:
+				self.inClass = 60
+		day = math.sin(2*math.pi*(t - START)/86400.0)
+		temp = 21.0 + 1.0*day + self.heat + self.rnd.gauss(0,0.02)
+		hum = 50.0 + 3.0*self.heat + self.rnd.gauss(0,0.1)
+		dew = temp - (100.0 - hum)/5.0
+		eco2 = 420.0 + 150.0*self.heat + self.rnd.gauss(0,2.0)
+		return([(f"room{self.n}-temp",round(temp,2)),
+			(f"room{self.n}-hum",round(hum,1)),
+			(f"room{self.n}-dewpoint",round(dew,2)),
+			(f"room{self.n}-eco2",round(eco2,0))])
+
+# -----------------------------------------------------------------------------
+def simulate(strategy,limit,tmpdir):
+	conf = configparser.ConfigParser()
+	conf.read_dict({'sim': {'rate': str(limit),'retries': '0',
+		'heartbeat': '600'}})
+	if strategy != 'fifo':
+		conf['sim']['deadband'] = ', '.join([f"room{r}-{k}:{v}"
+			for r in range(args.rooms[0]) for (k,v) in BANDS.items()])
+	sink = RecordSink('sim',conf['sim'],tmpdir)
+	now = [START]
+	clock = lambda: now[0]
+	if strategy == 'scheduled':
+		sink.schedule = FeedScheduler(sink.rate,conf['sim'].get('deadband',''),
+			600.0,clock)
+	else:
+		sink.schedule = FifoScheduler(sink.rate,conf['sim'].get('deadband',''),
+			600.0,clock)
+	flnm = os.path.join(tmpdir,f"{strategy}{limit}.db")
+	queue = UploadQueue(flnm,500000,['sim'])
+	rnd = random.Random(1)
+	rooms = [Room(r,rnd) for r in range(args.rooms[0])]
+	stopping = threading.Event()
+	age = {}
+	err = {}
+	for m in range(args.minutes[0]):
+		now[0] = START + 60.0*m
+		truth = []
+		for room in rooms:
+			truth += room.read(now[0])
+		queue.put(truth,now[0])
+		asyncio.run(drainSink(sink,queue,float('inf'),stopping))
+		for (feed,value) in truth:
+			kind = feed.split('-')[1]
+			(v,c) = sink.got.get(feed,(None,START - 60.0))
+			age.setdefault(kind,[]).append(now[0] - c)
+			if v is not None:
+				err.setdefault(kind,[]).append(abs(value - v)/BANDS[kind])
+	print(f"  {strategy:9s} {sink.sent:7d} sent, "+
+		f"{sum([f.coalesced for f in sink.schedule.feeds.values()]):7d} "+
+		f"coalesced, {queue.depth('sim'):7d} waiting at the end")
+	for kind in BANDS:
+		a = sorted(age[kind])
+		e = sorted(err.get(kind,[0.0]))
+		print(f"    {kind:9s} age mean {sum(a)/len(a)/60:7.1f} min, 95% "+
+			f"{a[int(0.95*len(a))]/60:7.1f} min; error mean "+
+			f"{sum(e)/len(e):6.2f}, 95% {e[int(0.95*len(e))]:6.2f} deadbands")
+	sink.shutdown()
+	queue.close()
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Simulate uploads to a rate "+
+																 "limited service.")
+parser.add_argument("-r","--rooms",nargs=1,type=int,default=[10],
+										help="Rooms, four feeds each (default 10).")
+parser.add_argument("-m","--minutes",nargs=1,type=int,default=[1440],
+										help="Minutes to simulate (default 1440).")
+parser.add_argument("-l","--limit",nargs='+',type=int,default=[30,8],
+										help="Data points allowed per minute, one simulation "+
+										"for each (default 30 8).")
+args = parser.parse_args()
+
+with tempfile.TemporaryDirectory() as tmpdir:
+	for limit in args.limit:
+		print(f"{args.rooms[0]} rooms, {4*args.rooms[0]} points a minute, "+
+			f"{limit} allowed, {args.minutes[0]} minutes:")
+		for strategy in ['fifo','deadband','scheduled']:
+			simulate(strategy,limit,tmpdir+'/')
@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+# simWeek.py
+
+# Runs the control decisions of a week (or more) in seconds: the class
+# schedule and datetime.conf are turned into settings like checkSchedule.py
+# does (also when the phase changes), and every minute the setpoint from the
+# settings file, the next class and the booster are worked out like
+# temphumlog.py does, with a VirtualClock (see clock.py) instead of the real
+# time. The controller and the room are simulated with a simple model: the
+# room loses heat to the outside, the heater works towards the setpoint and
+# the booster adds to it.
+#
+# It prints the commands that would have been sent, and for every class the
+# temperature at the start. As a regression test, --record writes the
+# decisions to a file and --compare runs again and shows where they differ
+# (after changing the schedule code, the booster, or the model).
+#
+# The real settings file is not touched, everything is written to a temporary
+# directory.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. --boost rule|predictive|both: the booster of temphumlog.py with the
+#    45/30/15/2 minute checks, the predictive one, or both one after the
+#    other with the classes side by side. The room is stepped SAMPLES times a
+#    minute; the predictive booster is checked with every sample, the rule
+#    once a minute.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import datetime
+import argparse
+import configparser
+import tempfile
+import difflib
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),
+	'..','bin'))
+
+from clock import VirtualClock, parseTime
+import classSchedule
+import checkSchedule
+import temphumlog
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+# The room: it loses (T - outside)/TAU degC per minute, the heater adds HEAT
+# degC per minute while the room is below the setpoint, the booster BOOST
+# more.
+TAU = 240.0
+HEAT = 0.12
+BOOST = 0.10
+
+SAMPLES = 4  # per minute
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+class Room:
+
+	def __init__(self,temp,outside):
+		self.temp = temp
+		self.outside = outside
+		self.tset = classSchedule.OFF.temp
+		self.boost = False
+
+	def step(self,minutes=1.0):
+		dT = (self.outside - self.temp)/TAU
+		if self.temp < self.tset:
+			dT += HEAT
+		if self.boost:
+			dT += BOOST
+		self.temp += dT*minutes
+		return
+
+# -----------------------------------------------------------------------------
+# The week, one minute at a time. Returns the decisions (one line each), the
+# classes: [start (datetime), setpoint, temperature at the start] and the
+# minutes the booster was on.
+def simulate(clk,schedule,phases,schflnm,dtflnm,settingsfile,minutes,outside,
+	verbose,boost='rule'):
+	room = Room(outside,outside)
+	slope = temphumlog.SlopeTracker(temphumlog.BOOST['tau'])
+	decisions = []
+	classes = []
+	def record(s):
+		line = f"{clk.now().strftime('%Y-%m-%d %a %H:%M')} {s}"
+		decisions.append(line)
+		if verbose:
+			print(line)
+		return
+	# checkSchedule.py: the settings for today, again when the phase changes
+	updatedDate = classSchedule.getCurrentDate()
+	classSchedule.makeSettings(schedule,phases,updatedDate,settingsfile,dtflnm)
+	(updateDate,updateTime) = checkSchedule.readTDconf(phases,updatedDate)
+	record(f"SETTINGS phase {classSchedule.findPhase(phases,updatedDate)}")
+	# temphumlog.py
+	sched = temphumlog.loadSchedule(schflnm)
+	starts = set([(weekdays.index(c[0]),c[1]) for c in sched])
+	setpoints = {(weekdays.index(c[0]),c[1]): c[2] for c in sched}
+	oldcmd = ""
+	boostMinutes = 0
+	for i in range(0,minutes):
+		currentDate = checkSchedule.getCurrentDate()
+		if updateDate <= currentDate:
+			classSchedule.makeSettings(schedule,phases,currentDate,settingsfile,dtflnm)
+			updatedDate = currentDate
+			(updateDate,updateTime) = checkSchedule.readTDconf(phases,updatedDate)
+			record(f"SETTINGS phase {classSchedule.findPhase(phases,currentDate)}")
+		newcmd = temphumlog.checkControlFile(settingsfile)
+		if newcmd != "" and newcmd != oldcmd:
+			room.tset = float(newcmd.split()[1])
+			record(f"{newcmd} (room {room.temp:0.2f} degC)")
+			oldcmd = newcmd
+		classStart = temphumlog.readSchedule(sched)
+		now = clk.now()
+		tm = now.hour*60+now.minute
+		if boost == 'rule':
+			(room.boost,cmds) = temphumlog.checkBoost(tm,classStart,room.tset,
+				room.temp,room.boost)
+			for cmd in cmds:
+				record(f"{cmd} (room {room.temp:0.2f} degC, setpoint {room.tset:0.1f} "+
+					"degC)")
+		key = (now.weekday(),now.strftime('%H:%M'))
+		if key in starts:
+			classes.append([now,setpoints[key],room.temp])
+			record(f"CLASS {setpoints[key]:0.1f} degC, room {room.temp:0.2f} degC")
+		for j in range(0,SAMPLES):
+			if boost == 'predictive':
+				slope.add(clk.monotonic(),room.temp)
+				(room.boost,cmds) = temphumlog.checkBoostPredictive(tm + j/SAMPLES,
+					classStart,room.tset,slope.value(),slope.slope(),room.boost)
+				for cmd in cmds:
+					record(f"{cmd} (room {room.temp:0.2f} degC, setpoint "+
+						f"{room.tset:0.1f} degC)")
+			if room.boost:
+				boostMinutes += 1/SAMPLES
+			room.step(1/SAMPLES)
+			clk.sleep(60/SAMPLES)
+	return(decisions,classes,boostMinutes)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Simulate the control decisions "+
+																 "of a week with a simulated room.")
+parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+										"configuration file. The default is "+
+										"~/etc/classSchedule.conf.")
+parser.add_argument("-s","--start",nargs=1,help="Start of the simulation, "+
+										"'YYYY-MM-DD [HH:MM]' local time (default: Monday of "+
+										"this week, 00:00).")
+parser.add_argument("-n","--days",nargs=1,type=int,default=[7],
+										help="Days to simulate (default 7).")
+parser.add_argument("-o","--outside",nargs=1,type=float,default=[15.0],
+										help="Outside temperature (default 15 degC).")
+parser.add_argument("-r","--record",nargs=1,help="Write the decisions to "+
+										"this file.")
+parser.add_argument("-C","--compare",nargs=1,help="Compare the decisions with "+
+										"this file (written with --record); exit status 1 if "+
+										"they differ.")
+parser.add_argument("-b","--boost",choices=['rule','predictive','both'],
+										default='rule',help="The booster (default rule).")
+parser.add_argument("-v","--verbose",action="store_true",help="Print every "+
+										"decision.")
+args = parser.parse_args()
+
+HOME = os.path.expanduser('~')
+if not(HOME.endswith('/')):
+	HOME += '/'
+
+configfile = f"{HOME}etc/classSchedule.conf"
+if args.config:
+	configfile = makeFilename(HOME,args.config[0])
+
+if not os.path.isfile(configfile):
+	print(f"ERROR: {configfile} does not exist.")
+	sys.exit(1)
+
+conf = configparser.ConfigParser()
+conf.read(configfile)
+
+schflnm = makeFilename(HOME,conf['schedule']['file'])
+dtflnm = makeFilename(HOME,conf['main']['datetime settings'])
+
+if args.start:
+	try:
+		startT = parseTime(args.start[0])
+	except ValueError as e:
+		print(f"ERROR: {e}")
+		sys.exit(1)
+else:
+	today = datetime.date.today()
+	monday = today - datetime.timedelta(days=today.weekday())
+	startT = time.mktime(monday.timetuple())
+
+weekdays = temphumlog.weekdays
+
+clk = VirtualClock(startT)
+classSchedule.clock = clk
+checkSchedule.clock = clk
+temphumlog.clock = clk
+
+schedule = classSchedule.loadSchedule(schflnm)
+phases = classSchedule.readDateTimeConf(dtflnm)
+
+# The predictive booster knows how fast the booster of the model heats
+temphumlog.BOOST['rate'] = BOOST
+
+modes = ['rule','predictive'] if args.boost == 'both' else [args.boost]
+runs = {}
+with tempfile.TemporaryDirectory() as tmpdir:
+	settingsfile = os.path.join(tmpdir,'temphum.settings')
+	for mode in modes:
+		clk.set(startT)
+		t0 = time.perf_counter()
+		(decisions,classes,boostMinutes) = simulate(clk,schedule,phases,schflnm,
+			dtflnm,settingsfile,args.days[0]*1440,args.outside[0],args.verbose,mode)
+		runs[mode] = (decisions,classes,boostMinutes,time.perf_counter() - t0)
+
+for mode in modes:
+	(decisions,classes,boostMinutes,dt) = runs[mode]
+	print(f"{mode}: {args.days[0]} days from "+
+		time.strftime('%Y-%m-%d %H:%M',time.localtime(startT))+
+		f" in {dt:0.2f} s ({args.days[0]*86400/dt:0.0f} times faster than real time)")
+	short = [c[1] - c[2] for c in classes if c[2] < c[1] - 0.5]
+	print(f"  {len([d for d in decisions if ' SP ' in d])} setpoint commands, "+
+		f"{len([d for d in decisions if ' BOOST ON' in d])} boosts, "+
+		f"booster on for {boostMinutes:0.0f} minutes, {len(short)} classes more "+
+		"than 0.5 degC short"+(f" (worst {max(short):0.1f} degC)" if short else ""))
+
+if len(modes) == 1:
+	for (start,tset,temp) in classes:
+		s = f"  {start.strftime('%a %Y-%m-%d %H:%M')}  setpoint {tset:4.1f} degC, "
+		s += f"room {temp:5.2f} degC"
+		if temp < tset - 0.5:
+			s += f"  {tset - temp:0.1f} degC short"
+		print(s)
+else:
+	print(f"  {'class':20s} {'setpoint':>8s} {'rule':>6s} {'predictive':>10s}")
+	for (a,b) in zip(runs['rule'][1],runs['predictive'][1]):
+		print(f"  {a[0].strftime('%a %Y-%m-%d %H:%M'):20s} {a[1]:8.1f} {a[2]:6.2f} "+
+			f"{b[2]:10.2f}")
+	decisions = [f"{m} {d}" for m in modes for d in runs[m][0]]
+if args.record:
+	with open(args.record[0],'w') as f:
+		f.write('\n'.join(decisions)+'\n')
+		f.close()
+	print(f"Decisions written to {args.record[0]}")
+
+if args.compare:
+	with open(args.compare[0],'r') as f:
+		old = f.read().splitlines()
+		f.close()
+	diff = list(difflib.unified_diff(old,decisions,args.compare[0],'this run',
+		lineterm=''))
+	if len(diff) > 0:
+		print('\n'.join(diff))
+		sys.exit(1)
+	print(f"Same decisions as {args.compare[0]}")
@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+# archiver.py
+
+# Compresses the day files of the loggers (MJD.dat, one per day and stream)
+# once the day is over, so the data directories stop growing by a text file
+# a day forever. Every day is compressed on its own (MJD.dat.gz, .xz or
+# .zst), or all the days of a month (UTC) go into one zip file (YYYY-MM.zip).
+# The readers (dataFiles.py) find a day wherever it is.
+#
+# The last 'keep' days are left as they are (today is still written, the
+# preheat planner and the plots read the last days often). A month is only
+# packed when all its days are older than that. The compressed file is read
+# back and compared before the day file is removed, and it keeps the time of
+# the day file. Run it once a day (etc/crontab).
+#
+#   archiver.py             archive what is due, as set in etc/archive.conf
+#   archiver.py -n          only show what would be done
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling (-p / --profile, see profiling.py): the dumps are written
+#    when the program ends, or at SIGUSR1.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import zipfile
+import argparse
+import configparser
+import dataFiles
+import profiling
+
+script = os.path.basename(__file__)
+VERSION = "0.2"
+AUTHORS = "Louis Marais"
+
+DEBUG = False
+
+MIN_KEEP = 2   # today and yesterday are never archived
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def debug(msg):
+	if DEBUG:
+		print(ts(),msg)
+	return
+
+# -----------------------------------------------------------------------------
+def errorExit(s):
+	print(f'ERROR: {s}')
+	sys.exit(1)
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+# Written next to it first and then renamed, so a reader never sees half a
+# file
+def writeFile(flnm,data,mtime):
+	with open(flnm+'.new','wb') as f:
+		f.write(data)
+		f.flush()
+		os.fsync(f.fileno())
+		f.close()
+	os.utime(flnm+'.new',(mtime,mtime))
+	os.replace(flnm+'.new',flnm)
+	return
+
+# -----------------------------------------------------------------------------
+# One day file compressed on its own. Returns the bytes before and after.
+def archiveDay(path,mjd,method,ext='dat'):
+	flnm = os.path.join(path,f"{mjd}.{ext}")
+	st = os.stat(flnm)
+	with open(flnm,'rb') as f:
+		data = f.read()
+		f.close()
+	packed = dataFiles.compress(data,method)
+	if dataFiles.decompress(packed,dataFiles.SUFFIX[method]) != data:
+		raise ValueError(f"{flnm}: the {method} file is not the same")
+	writeFile(flnm+dataFiles.SUFFIX[method],packed,st.st_mtime)
+	os.unlink(flnm)
+	return(len(data),len(packed))
+
+# -----------------------------------------------------------------------------
+# The days of a month, however they are stored now, in YYYY-MM.zip (what is
+# in it already stays). Returns the bytes before and after.
+def packMonth(path,month,mjds,method,ext='dat'):
+	zflnm = os.path.join(path,month+'.zip')
+	days = {}    # MJD: bytes
+	files = []   # the day files to remove afterwards
+	mtime = 0.0
+	for mjd in mjds:
+		where = dataFiles.findDay(path,mjd,ext)
+		if where is None:
+			continue
+		data = dataFiles.readBytes(path,mjd,ext)
+		if data is None:
+			continue
+		days[mjd] = data
+		if where[1] is None:
+			files.append(where[0])
+		mtime = max(mtime,os.path.getmtime(where[0]))
+	if len(files) == 0:
+		return(0,0)
+	before = sum([os.path.getsize(f) for f in files])
+	if os.path.isfile(zflnm):
+		before += os.path.getsize(zflnm)
+	with zipfile.ZipFile(zflnm+'.new','w') as z:
+		for mjd in sorted(days):
+			if method == 'zstd':
+				# zip has no zstd, the member is compressed already
+				z.writestr(f"{mjd}.{ext}.zst",dataFiles.compress(days[mjd],'zstd'),
+					zipfile.ZIP_STORED)
+			elif method == 'xz':
+				z.writestr(f"{mjd}.{ext}",days[mjd],zipfile.ZIP_LZMA)
+			else:
+				z.writestr(f"{mjd}.{ext}",days[mjd],zipfile.ZIP_DEFLATED,9)
+		z.close()
+	# Read back before anything is removed
+	with zipfile.ZipFile(zflnm+'.new','r') as z:
+		for mjd in days:
+			member = f"{mjd}.{ext}.zst" if method == 'zstd' else f"{mjd}.{ext}"
+			if dataFiles.decompress(z.read(member),os.path.splitext(member)[1]) != \
+				days[mjd]:
+				raise ValueError(f"{zflnm}: day {mjd} is not the same")
+	with open(zflnm+'.new','rb') as f:
+		os.fsync(f.fileno())
+		f.close()
+	os.utime(zflnm+'.new',(mtime,mtime))
+	os.replace(zflnm+'.new',zflnm)
+	for flnm in files:
+		os.unlink(flnm)
+	return(before,os.path.getsize(zflnm))
+
+# -----------------------------------------------------------------------------
+# Archives the days of a directory that are due. Returns (files archived,
+# bytes before, bytes after).
+def archive(path,method,pack,keep,today=None,ext='dat',dryrun=False):
+	if today is None:
+		today = int(time.time()/86400) + 40587
+	last = today - max(keep,MIN_KEEP)  # the last day that may be archived
+	done = 0
+	before = 0
+	after = 0
+	if pack == 'day':
+		for mjd in dataFiles.listDays(path,ext):
+			flnm = os.path.join(path,f"{mjd}.{ext}")
+			if mjd > last or not os.path.isfile(flnm):
+				continue
+			if dryrun:
+				print(f"{flnm} -> {flnm}{dataFiles.SUFFIX[method]}")
+				continue
+			(b,a) = archiveDay(path,mjd,method,ext)
+			debug(f"{flnm}: {b} -> {a} bytes")
+			done += 1
+			before += b
+			after += a
+		return(done,before,after)
+	# Whole months only: the month of the first day that is kept is not done
+	months = {}
+	for mjd in dataFiles.listDays(path,ext):
+		if dataFiles.monthOf(mjd) < dataFiles.monthOf(last + 1):
+			months.setdefault(dataFiles.monthOf(mjd),[]).append(mjd)
+	for (month,mjds) in sorted(months.items()):
+		if dryrun:
+			print(f"{len(mjds)} days -> {os.path.join(path,month+'.zip')}")
+			continue
+		(b,a) = packMonth(path,month,mjds,method,ext)
+		if b == 0:
+			continue
+		debug(f"{month}: {b} -> {a} bytes")
+		done += 1
+		before += b
+		after += a
+	return(done,before,after)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+def main(argv=None):
+	global DEBUG
+
+	parser = argparse.ArgumentParser(description="Compresses the data files of "+
+																	 "the days that are over.")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/archive.conf.")
+	parser.add_argument("-n","--dry-run",dest="dryrun",action="store_true",
+											help="Only show what would be done.")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when it "+
+											"ends or SIGUSR1 is received (see profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	prof = profiling.fromArgs(args,HOME,script)
+	try:
+		configfile = makeFilename(HOME,"etc/archive.conf")
+		if args.config:
+			configfile = makeFilename(HOME,args.config[0])
+		if not os.path.isfile(configfile):
+			errorExit(f"{configfile} does not exist.")
+		conf = configparser.ConfigParser()
+		conf.read(configfile)
+
+		if not conf.has_section('archive'):
+			errorExit(f"No [archive] section in {configfile}")
+		method = conf['archive'].get('compression','xz').strip().lower()
+		if not method in dataFiles.SUFFIX:
+			errorExit(f"Unknown compression (gzip, xz or zstd): {method}")
+		if method == 'zstd' and dataFiles.zstandard is None:
+			errorExit("zstd needs the zstandard module")
+		pack = conf['archive'].get('pack','day').strip().lower()
+		if not pack in ['day','month']:
+			errorExit(f"Unknown pack (day or month): {pack}")
+		try:
+			keep = conf['archive'].getint('keep',fallback=7)
+		except ValueError:
+			errorExit("'keep' in the [archive] section is not a number")
+		ext = conf['archive'].get('extension','dat')
+
+		for d in conf['archive'].get('directories','data').split(','):
+			path = makeFilename(HOME,d.strip())
+			if not os.path.isdir(path):
+				print(ts(),f"{path} does not exist, skipped")
+				continue
+			startT = time.monotonic()
+			try:
+				(done,before,after) = archive(path,method,pack,keep,ext=ext,
+					dryrun=args.dryrun)
+			except (OSError,ValueError) as e:
+				errorExit(f"{path}: {e}")
+			if done > 0:
+				print(ts(),f"{path}: {done} {pack}(s) "+
+					f"archived, {before/1e6:0.2f} MB -> {after/1e6:0.2f} MB in "+
+					f"{time.monotonic() - startT:0.1f} s")
+	finally:
+		prof.close()
+	return
+
+if __name__ == "__main__":
+	main()
@@ -3,7 +3,7 @@
 
 # This will regularly check the file specified in the settings file
 # (classSchedule.conf) and if its modification time changed will
-# run the classSchedule.py script to create a new settings file
+# create a new settings file (using the routines in classSchedule.py)
 # for the control of temperature and humidity in the studio.
 
 # -----------------------------------------------------------------------------
@@ -32,6 +32,122 @@
 #    changed.
 #
 # -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The settings file is now created in this process by importing
+#    classSchedule.py instead of running it with subprocess.run. The class
+#    schedule and the date time configuration are parsed only when they change
+#    (or when the year changes) and kept in memory.
+# 2. The time it takes to create the settings file is measured and shown
+#    with the debug messages. See bench/benchClassSchedule.py for a comparison
+#    with the old (subprocess) way of doing it.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.4
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. No more checking the modification times every 0.5 s. The program now
+#    sleeps (using inotify) until the schedule or datetime.conf file changes,
+#    or until the next date when the program has to change. Polling is still
+#    used if inotify is not available.
+# 2. Bug fix: after the last date in datetime.conf (30 November) readTDconf
+#    returned 0 and the settings file was created every 0.5 s until the end
+#    of the year. The next date is now 'defaults' in the next year.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.5
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. If a cache directory is set in the configuration file, the settings for
+#    all dates are compiled when the schedule or datetime.conf changes, and
+#    a change of date only copies the right file from the calendar.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.6
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The main program is in main(), with stop() to end it, so that
+#    supervisor.py can run it in a thread. Signal handlers are only set when
+#    running in the main thread. The lock file is always removed when the
+#    program ends.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.7
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Heartbeat (-b / --heartbeat, see heartbeat.py), updated every time
+#    through the main loop so supervisor.py can restart the program when it
+#    gets stuck.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.8
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Counters and timings (-m / --metrics, see metrics.py): the time to make
+#    the settings file and the changes seen.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.9
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling while the program runs (-p / --profile, see profiling.py):
+#    SIGUSR1 stops it and writes the dumps, and starts it again.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.10
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The time and date come from 'clock' (see clock.py), which is also given
+#    to classSchedule.py, so that the phase changes can be simulated
+#    (bench/simWeek.py).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.11
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Preheat times learned from the data files (see preheatPlanner.py) when
+#    'adaptive' is set in the [preheat] section of the configuration file.
+#    The settings are then made again every day (after midnight), with the
+#    lead times planned for every class.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author:
 # Start date:
@@ -50,16 +166,43 @@ import sys
 import argparse
 import configparser
 import signal
-import subprocess
+import select
+import ctypes
+import struct
+import threading
+import classSchedule
+import preheatPlanner
+from heartbeat import Heartbeat
+from metrics import Metrics
+from profiling import Profiler
+from clock import Clock
 
 script = os.path.basename(__file__)
-VERSION = "0.1"
+VERSION = "0.11"
 AUTHORS = "Louis Marais"
 
-months = ['January','February','March','April','May','June','July','August',
-					'September','October','November','December']
-
 DEBUG = False
+metrics = Metrics(None)  # see metrics.py, set up in main()
+clock = Clock()          # the time and day, see clock.py
+running = True
+wakeW = -1  # stop() wakes up main() through this pipe
+
+# From /usr/include/linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# The clock on the Pi is set by NTP after boot, so never trust a wait for a
+# date change for longer than this (seconds).
+MAX_WAIT = 3600
+
+# With a heartbeat (supervisor.py) the program wakes up at least this often
+# (seconds) to update it.
+HEARTBEAT_WAIT = 10
 
 # -----------------------------------------------------------------------------
 def ts():
@@ -122,6 +265,17 @@ def signalHandler(signal,frame):
 	debug("User / system request for program termination.")
 	return
 
+# -----------------------------------------------------------------------------
+# Asks main() to finish; used by supervisor.py, which runs main() in a thread
+def stop():
+	global running
+	running = False
+	try:
+		os.write(wakeW,b'\0')
+	except OSError:
+		pass  # not running (yet), or the pipe is full
+	return
+
 # -----------------------------------------------------------------------------
 def makeFilename(hm,fl):
 	if not fl.startswith('/'):
@@ -129,44 +283,97 @@ def makeFilename(hm,fl):
 	return(fl)
 
 # -----------------------------------------------------------------------------
-def makedate(day,mnth):
-	yr = time.localtime().tm_year
-	dy = int(day)
-	mn = months.index(mnth)+1
-	tmst = time.mktime(datetime.datetime(year=yr,month=mn,day=dy).timetuple())
-	dt = int(tmst/86400) + 40587 # MJD 'like' date
-	return(dt)
+def phaseTime(day,mnth,yr):  # Local midnight at the start of a phase
+	mn = classSchedule.months.index(mnth)+1
+	tmst = time.mktime(datetime.datetime(year=yr,month=mn,day=int(day)).timetuple())
+	return(tmst)
 
 # -----------------------------------------------------------------------------
-def readTDconf(fl,oldt):  # oldt is the date when the program was last changed
-	cnf = configparser.ConfigParser()
-	cnf.read(fl)
-	req = ['main,dates','defaults,startday','defaults,startmonth',
-				'defaults,times','defaults,preheat']
-	dtcnf = checkConfig(cnf, req)
-	chks = [s.strip() for s in list(cnf['main']['dates'].split(','))]
-	newdates = [makedate(cnf['defaults']['startday'],cnf['defaults']['startmonth'])]
-	for itm in chks:
-		reqs = ['startday','startmonth','times','preheat']
-		for r in reqs:
-			if not r in cnf[itm]:
-				errorExit(f"{r} not in {itm}")
-		newdates.append(makedate(cnf[itm]['startday'],cnf[itm]['startmonth']))
+# oldt is the date when the program was last changed. Returns the next date
+# when the program has to change, and the time (seconds since the epoch) when
+# that happens.
+def readTDconf(phases,oldt):
+	newdates = [p[2] for p in phases]
 	debug(f"Dates in time date config: {newdates}")
-	# Return next date that program has to change
+	yr = clock.localtime().tm_year
 	dt = 0
-	for d in newdates:
-		if oldt < d:
-			dt = d
+	for p in phases:
+		if oldt < p[2]:
+			dt = p[2]
+			tm = phaseTime(p[0],p[1],yr)
 			break
-	debug(f"Program to be updated on {dt}")
-	return(dt)
+	if dt == 0:  # No more changes this year, next is 'defaults' next year.
+		tm = phaseTime(phases[0][0],phases[0][1],yr+1)
+		dt = int(tm/86400) + 40587
+	debug(f"Program to be updated on {dt} "+
+		f"({time.strftime('%Y-%m-%d %H:%M:%S',clock.localtime(tm))})")
+	return(dt,tm)
+
+# -----------------------------------------------------------------------------
+# Watch the directories that hold the files we are interested in. The
+# directories are watched (not the files) because a file that is replaced
+# (scp, editors) gets a new inode. Returns -1 if inotify is not available, in
+# which case waitForChange falls back to polling.
+def initInotify(flnms):
+	try:
+		libc = ctypes.CDLL(None,use_errno=True)
+		fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+	except (OSError, AttributeError):
+		debug("inotify is not available, polling for changes.")
+		return(-1)
+	if fd < 0:
+		debug("inotify_init1 failed, polling for changes.")
+		return(-1)
+	mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ATTRIB | IN_MODIFY
+	for d in set([os.path.dirname(f) for f in flnms]):
+		wd = libc.inotify_add_watch(fd,d.encode(),mask)
+		if wd < 0:
+			debug(f"Could not watch {d}, polling for changes.")
+			os.close(fd)
+			return(-1)
+		debug(f"Watching {d} for changes.")
+	return(fd)
+
+# -----------------------------------------------------------------------------
+# Block until one of the files changes, a signal arrives or 'timeout' seconds
+# have passed. Returns True if one of the files changed.
+def waitForChange(fd,wakefd,flnms,timeout):
+	if fd < 0:
+		time.sleep(min(timeout,0.5))
+		return(False)  # the caller checks the modification times anyway
+	names = [os.path.basename(f).encode() for f in flnms]
+	r,w,x = select.select([fd,wakefd],[],[],timeout)
+	if wakefd in r:
+		try:
+			os.read(wakefd,512)
+		except BlockingIOError:
+			pass
+	changed = False
+	if fd in r:
+		try:
+			buf = os.read(fd,4096)
+		except BlockingIOError:
+			buf = b''
+		i = 0
+		while i + 16 <= len(buf):
+			wd,mask,cookie,ln = struct.unpack_from('iIII',buf,i)
+			name = buf[i+16:i+16+ln].rstrip(b'\0')
+			if name in names:
+				changed = True
+			i += 16 + ln
+	return(changed)
+
+# -----------------------------------------------------------------------------
+def nextMidnight():  # Local midnight after now (seconds since the epoch)
+	tomorrow = clock.now().date() + datetime.timedelta(days=1)
+	return(time.mktime(tomorrow.timetuple()))
 
 # -----------------------------------------------------------------------------
 def getCurrentDate(): # Something like MJD, but not quite (uses localtime, not gmtime)
-	yr = time.localtime().tm_year
-	mn = time.localtime().tm_mon
-	dy = time.localtime().tm_mday
+	now = clock.localtime()
+	yr = now.tm_year
+	mn = now.tm_mon
+	dy = now.tm_mday
 	tmst = time.mktime(datetime.datetime(year=yr,month=mn,day=dy).timetuple())
 	dt = int(tmst/86400) + 40587
 	#debug(f"Current date {dt}")
@@ -176,142 +383,277 @@ def getCurrentDate(): # Something like MJD, but not quite (uses localtime, not g
 # Main
 # -----------------------------------------------------------------------------
 
-parser = argparse.ArgumentParser(description="Checks class schedule, and if "+
-																 "it has been modified runs the script that "+
-																 "creates the temp hum settings file for "+
-																 "control of the hot room")
-parser.add_argument("-v","--version",action="store_true",help="Show version "+
-										"and exit.")
-parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
-										"configuration file. The default is "+
-										"~/etc/classSchedule.conf.")
-parser.add_argument("-d","--debug",action="store_true",
-										help="Turn debugging on")
 
-args = parser.parse_args()
+def main(argv=None):
+	global DEBUG, running, wakeW, metrics
 
-if args.debug:
-	DEBUG = True
+	running = True
 
-versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+	parser = argparse.ArgumentParser(description="Checks class schedule, and if "+
+																	 "it has been modified runs the script that "+
+																	 "creates the temp hum settings file for "+
+																	 "control of the hot room")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/classSchedule.conf.")
+	parser.add_argument("-b","--heartbeat",nargs=1,help="Heartbeat file, "+
+											"updated every time through the main loop (set by "+
+											"supervisor.py).")
+	parser.add_argument("-m","--metrics",nargs=1,help="Write counters and "+
+											"timings to this file (see metrics.py).")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when "+
+											"SIGUSR1 is received or the program ends (see "+
+											"profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
 
-if args.version:
-	print(versionStr)
-	sys.exit(0)
+	args = parser.parse_args(argv)
 
-debug(versionStr)
+	if args.debug:
+		DEBUG = True
 
-HOME = os.path.expanduser('~')
-if not(HOME.endswith('/')):
-	HOME += '/'
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
 
-debug(f"Current user's home :{HOME}")
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
 
-configfile = f"{HOME}etc/classSchedule.conf"
+	debug(versionStr)
 
-if args.config:
-	debug(f"Alternate config file specified: {str(args.config[0])}")
-	configfile = str(args.config[0])
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
 
-	if not configfile.startswith('/'):
-		configfile = HOME+configfile
+	debug(f"Current user's home :{HOME}")
 
-debug(f"Configuration file: {configfile}")
+	# supervisor.py watches the heartbeat to see that the program is not stuck
+	heartbeatfile = None
+	if args.heartbeat:
+		heartbeatfile = makeFilename(HOME,args.heartbeat[0])
+		debug(f"Heartbeat file: {heartbeatfile}")
+	hb = Heartbeat(heartbeatfile)
 
-if not os.path.isfile(configfile):
-	errorExit(f"{configfile} does not exist.")
+	metricsfile = None
+	if args.metrics:
+		metricsfile = makeFilename(HOME,args.metrics[0])
+		debug(f"Metrics file: {metricsfile}")
+	metrics = Metrics(metricsfile,script)
 
-conf = configparser.ConfigParser()
-conf.read(configfile)
+	# Profiling is switched off (the dumps are written) and on again with
+	# SIGUSR1
+	profiledir = None
+	if args.profile:
+		profiledir = makeFilename(HOME,args.profile[0])
+		debug(f"Profile dumps: {profiledir}")
+	prof = Profiler(profiledir,script)
 
-req = ['main,datetime settings','checker,lock file','schedule,file',
-			 'checker,bin file']
+	configfile = f"{HOME}etc/classSchedule.conf"
 
-cfg = checkConfig(conf, req)
+	if args.config:
+		debug(f"Alternate config file specified: {str(args.config[0])}")
+		configfile = str(args.config[0])
 
-debug(f"conf['main']['datetime settings'] = {conf['main']['datetime settings']}")
-debug(f"conf['checker']['lock file'] = {conf['checker']['lock file']}")
-debug(f"conf['schedule']['file'] = {conf['schedule']['file']}")
-debug(f"conf['checker']['bin file'] = {conf['checker']['bin file']}")
+		if not configfile.startswith('/'):
+			configfile = HOME+configfile
 
-dtSettingsFile = makeFilename(HOME,conf['main']['datetime settings'])
+	debug(f"Configuration file: {configfile}")
 
-debug(f"Date time settings file: {dtSettingsFile}")
+	if not os.path.isfile(configfile):
+		errorExit(f"{configfile} does not exist.")
 
-schflnm = makeFilename(HOME,conf['schedule']['file'])
+	conf = configparser.ConfigParser()
+	conf.read(configfile)
 
-debug(f"Class schedule file: {schflnm}")
+	req = ['main,settings file','main,datetime settings','checker,lock file',
+				 'schedule,file']
 
-if not os.path.isfile(schflnm):
-	errorExit('The class schedule file does not exist.')
+	cfg = checkConfig(conf, req)
 
-binfile = makeFilename(HOME,conf['checker']['bin file'])
+	debug(f"conf['main']['datetime settings'] = {conf['main']['datetime settings']}")
+	debug(f"conf['checker']['lock file'] = {conf['checker']['lock file']}")
+	debug(f"conf['schedule']['file'] = {conf['schedule']['file']}")
+	debug(f"conf['main']['settings file'] = {conf['main']['settings file']}")
 
-debug(f"Executable to run: {binfile}")
+	dtSettingsFile = makeFilename(HOME,conf['main']['datetime settings'])
 
-if not os.path.isfile(binfile):
-	errorExit("The binary file that you are supposed to run does not exist...")
+	debug(f"Date time settings file: {dtSettingsFile}")
 
-lockfile = makeFilename(HOME,conf['checker']['lock file'])
+	schflnm = makeFilename(HOME,conf['schedule']['file'])
 
-debug(f"Lock file: {lockfile}")
+	debug(f"Class schedule file: {schflnm}")
+
+	if not os.path.isfile(schflnm):
+		errorExit('The class schedule file does not exist.')
+
+	settingsfile = makeFilename(HOME,conf['main']['settings file'])
+
+	debug(f"Settings file: {settingsfile}")
+
+	cachedir = ""
+	if conf.has_option('main','cache'):
+		cachedir = makeFilename(HOME,conf['main']['cache'])
+		debug(f"Compiled settings are kept in {cachedir}")
+		os.makedirs(cachedir,exist_ok=True)
 
-if not CreateProcessLock(lockfile):
-	errorExit(f'Unable to lock - {script} already running?')
+	classSchedule.DEBUG = DEBUG
+	classSchedule.clock = clock
 
-signal.signal(signal.SIGINT,signalHandler)
-signal.signal(signal.SIGTERM,signalHandler)
-signal.signal(signal.SIGHUP,signalHandler) # not usually run with a controlling
-                                           # TTY, but handle it anyway
+	# Lead times learned from the data files, planned again every day
+	planner = preheatPlanner.fromConfig(conf,HOME)
+	preheatPlanner.DEBUG = DEBUG
+	if planner.enabled:
+		debug(f"Preheat times learned from {planner.datapath}, rollup in "+
+			f"{planner.rollupfile}")
 
-running = True
-fmod_old = 0
-updateDate = 0
-fmod_td_old = 0
-updateRequired = False
-updatedDate = getCurrentDate()
-
-while running:
-	# Was the class program changed?
-	fmod = os.path.getmtime(schflnm)
-	if not fmod == fmod_old:
-		fmod_old = fmod
-		debug("Schedule file updated. New settings file required.")
-		updateRequired = True
-	# Do we need to re-read the date time configuration file?
-	fmod = os.path.getmtime(dtSettingsFile)
-	if not fmod == fmod_td_old:
-		debug("Time and date settings file updated. New settings file required.")
-		debug(f"Old update date: {updateDate}")
-		updateDate = readTDconf(dtSettingsFile,updatedDate)
-		fmod_td_old = fmod
-		updateRequired = True
-	# Is an update required because of the date?
-	currentDate = getCurrentDate()
-	if updateDate <= currentDate:
-		debug(f"Current date: {currentDate}, Update date: {updateDate}")
-		updateRequired = True
-	if updateRequired:
-		cmd = [binfile]
-		retval = subprocess.run(cmd,capture_output = True)
-		if retval.returncode == 0:
-			debug("Settings file successfully created")
-		else:
-			print(f"Executable: {binfile}")
-			print(f"Return code: {retval.returncode}")
-			print(f"Std out: {retval.stdout.decode('ascii')}")
-			print(f"Std err: {retval.stderr.decode('ascii')}")
-			print("ERROR: Could not create settings file.")
-			break  # Have to remove the lock file!
-		updatedDate = currentDate
-		updateRequired = False
-		debug(f"settings file updated on {updatedDate}")
-		# If this update was required because of the date, a new update date is
-		# required. For ease of use, the date is updated every time an update is
-		# done.
-		updateDate = readTDconf(dtSettingsFile,updatedDate)
-	time.sleep(0.5)
+	lockfile = makeFilename(HOME,conf['checker']['lock file'])
 
-RemoveProcessLock(lockfile)
+	debug(f"Lock file: {lockfile}")
 
-debug(f'{script} terminated.')
+	if not CreateProcessLock(lockfile):
+		errorExit(f'Unable to lock - {script} already running?')
+
+	# stop() and signals wake up the select() in waitForChange through this
+	# pipe.
+	wakeR,wakeW = os.pipe()
+	os.set_blocking(wakeR,False)
+	os.set_blocking(wakeW,False)
+
+	# Signals can only be handled in the main thread; when this runs as a thread
+	# of supervisor.py the supervisor calls stop() instead.
+	if threading.current_thread() is threading.main_thread():
+		signal.signal(signal.SIGINT,signalHandler)
+		signal.signal(signal.SIGTERM,signalHandler)
+		signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
+		                                           # controlling TTY, but handle
+		                                           # it anyway
+		signal.set_wakeup_fd(wakeW)
+		if prof.enabled:
+			signal.signal(signal.SIGUSR1,prof.handler)
+	prof.start()
+
+	try:
+		inotifyfd = initInotify([schflnm,dtSettingsFile])
+
+		fmod_old = 0
+		updateDate = 0
+		updateTime = 0
+		fmod_td_old = 0
+		updateRequired = False
+		updatedDate = getCurrentDate()
+		schedule = []
+		phases = []
+		phasesYear = 0
+		calpath = ""
+
+		while running:
+			hb.beat()
+			metrics.tick()
+			# Was the class program changed?
+			fmod = os.path.getmtime(schflnm)
+			if not fmod == fmod_old:
+				fmod_old = fmod
+				debug("Schedule file updated. New settings file required.")
+				try:
+					schedule = classSchedule.loadSchedule(schflnm)
+				except SystemExit:
+					print("ERROR: Could not read the class schedule.")
+					break  # Have to remove the lock file!
+				calpath = ""
+				updateRequired = True
+			# Do we need to re-read the date time configuration file? The dates in it
+			# are for the current year, so it is also re-read when the year changes.
+			fmod = os.path.getmtime(dtSettingsFile)
+			if not fmod == fmod_td_old or not phasesYear == clock.localtime().tm_year:
+				debug("Time and date settings file updated. New settings file required.")
+				debug(f"Old update date: {updateDate}")
+				try:
+					phases = classSchedule.readDateTimeConf(dtSettingsFile)
+				except SystemExit:
+					print("ERROR: Could not read the date time settings.")
+					break
+				phasesYear = clock.localtime().tm_year
+				updateDate,updateTime = readTDconf(phases,updatedDate)
+				fmod_td_old = fmod
+				calpath = ""
+				updateRequired = True
+			# Is an update required because of the date?
+			currentDate = getCurrentDate()
+			if updateDate <= currentDate:
+				debug(f"Current date: {currentDate}, Update date: {updateDate}")
+				updateRequired = True
+			if planner.enabled and not updatedDate == currentDate:
+				updateRequired = True
+			if updateRequired:
+				startT = time.perf_counter()
+				leads = {}
+				if planner.enabled:
+					(startTimes,preheatTimes) = classSchedule.selectDateTimeSettings(phases,
+						currentDate,dtSettingsFile)
+					leads = planner.leads(schedule,startTimes,preheatTimes,
+						int(clock.time()/86400) + 40587)
+					metrics.histogram('preheat plan').observe(time.perf_counter() - startT)
+					debug(f"Preheat plan: {planner.describe()}, {len(leads)} classes "+
+						"planned")
+				try:
+					if len(leads) > 0:
+						classSchedule.makeSettings(schedule,phases,currentDate,settingsfile,
+							dtSettingsFile,leads)
+					elif cachedir == "":
+						classSchedule.makeSettings(schedule,phases,currentDate,settingsfile,
+							dtSettingsFile)
+					else:
+						# The settings for all dates are compiled once, after that a new
+						# date only needs a copy from the calendar.
+						if calpath == "":
+							calpath = classSchedule.makeCalendar(schedule,phases,cachedir,
+								schflnm,dtSettingsFile)
+						classSchedule.installSettings(calpath,phases,currentDate,settingsfile)
+				except (SystemExit, OSError) as e:
+					print(f"Settings file: {settingsfile}")
+					print(f"Error: {e}")
+					print("ERROR: Could not create settings file.")
+					break  # Have to remove the lock file!
+				t = time.perf_counter() - startT
+				metrics.histogram('settings render').observe(t)
+				debug(f"Settings file successfully created in {t*1000:0.1f} ms")
+				updatedDate = currentDate
+				updateRequired = False
+				debug(f"settings file updated on {updatedDate}")
+				# If this update was required because of the date, a new update date is
+				# required. For ease of use, the date is updated every time an update is
+				# done.
+				updateDate,updateTime = readTDconf(phases,updatedDate)
+			if not running:
+				break
+			# Sleep until a file changes or the next date the program has to change.
+			nextT = updateTime
+			if planner.enabled:
+				nextT = min(nextT,nextMidnight())
+			timeout = min(max(nextT - clock.time(),1.0),MAX_WAIT)
+			if heartbeatfile:
+				timeout = min(timeout,HEARTBEAT_WAIT)
+			debug(f"Waiting for changes, {timeout:0.0f} s to next date check.")
+			if waitForChange(inotifyfd,wakeR,[schflnm,dtSettingsFile],timeout):
+				metrics.counter('changes').inc()
+				debug("Change detected.")
+
+		if inotifyfd >= 0:
+			os.close(inotifyfd)
+	finally:
+		hb.close()
+		metrics.close()
+		prof.close()
+		if threading.current_thread() is threading.main_thread():
+			signal.set_wakeup_fd(-1)
+		(fd,wakeW) = (wakeW,-1)
+		os.close(fd)
+		os.close(wakeR)
+		RemoveProcessLock(lockfile)
+
+	debug(f'{script} terminated.')
+
+if __name__ == "__main__":
+	main()
@@ -175,6 +175,105 @@
 # 1. Bug fix, humidity in 2nd cycle should be 50 %RH, was set to 55 %RH
 #
 # -----------------------------------------------------------------------------
+# Version: 0.0.15
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The main program is now in main() so that checkSchedule.py can import
+#    this file and create the settings file without starting a new Python
+#    interpreter. Nothing happens when the file is imported.
+# 2. Split getDateTimeSettings into readDateTimeConf (parse the file) and
+#    selectDateTimeSettings (pick the settings for a date) so that the parsed
+#    file can be kept in memory by the caller.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.16
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The settings for ALL the dates in datetime.conf can be created in one
+#    go (compileCalendar) and are kept in a cache directory, named after the
+#    hashes of the class schedule and datetime.conf. Changing to the settings
+#    for a new date is then only a file copy. Set 'cache' in the [main]
+#    section of the configuration file to use it. The '--all' option creates
+#    the calendar and lists the files.
+# 2. '--testdate' takes an optional second date; the settings for every day
+#    in the range are printed.
+# 3. The settings file is written to a new file and moved into place, so the
+#    control program never reads a half written file.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.17
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The settings are now kept as (minute of the week, temp, hum) events and
+#    only formatted when the file is written. checkTHsettings no longer
+#    parses the strings created by createClass again.
+# 2. Overlapping classes are merged on a week that wraps around. A preheat
+#    that starts before midnight (the day before, or Sunday for a Monday
+#    class) used to give a negative time; it is now on the right day. A class
+#    that starts while the previous one is still on no longer switches the
+#    heat off for a minute in between.
+# 3. Bug fix: a class after the last hour in the 'times' list crashed the
+#    program; it now uses the last preheat time.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.18
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The year and date come from 'clock' (see clock.py); checkSchedule.py and
+#    bench/simWeek.py set it.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.19
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. createClass, createTHsettings and makeSettings take the lead times for
+#    single classes ('leads', from preheatPlanner.py); a class that is not in
+#    it uses the preheat time of datetime.conf.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.20
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The name of a cached calendar also has the hash of this file, so a new
+#    version of the settings generator makes new calendars. Calendars made by
+#    another version are removed when a new one is saved.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.21
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling (-p / --profile, see profiling.py): the dumps are written
+#    when the program ends, or at SIGUSR1.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author:
 # Start date:
@@ -193,15 +292,33 @@ import argparse
 import configparser
 import re
 import datetime
+import hashlib
+import shutil
+import collections
+from clock import Clock
+import profiling
 
 script = os.path.basename(__file__)
-VERSION = "0.0.13"
+VERSION = "0.0.21"
 AUTHORS = "Louis Marais"
 
 DEBUG = False
 
+clock = Clock()  # the time and day, see clock.py
+
+# Number of compiled calendars (one per schedule / datetime.conf pair) to keep
+# in the cache directory.
+CACHE_KEEP = 10
+
 weekdays = ['MONDAY','TUESDAY','WEDNESDAY','THURSDAY','FRIDAY','SATURDAY',
 						'SUNDAY']
+
+WEEK = 7 * 1440  # minutes
+
+# One line of the settings file, 'minute' is counted from Monday 00:00
+Event = collections.namedtuple('Event',['minute','temp','hum'])
+
+OFF = Event(0,21.0,20.0)  # Heat and humidity off
 months = ['January','February','March','April','May','June','July','August',
 					'September','October','November','December']
 
@@ -291,6 +408,15 @@ def formatTime(t):
 	s = f"{hr:02d}:{mn:02d}"
 	return(s)
 
+# -----------------------------------------------------------------------------
+# A settings file line: temp / hum setpoints that become active at 'minute',
+# counted from Monday 00:00. The week wraps around, so minute 0 follows minute
+# WEEK - 1.
+def formatEvent(e):
+	dy = weekdays[e.minute // 1440]
+	tmStr = formatTime(e.minute % 1440)
+	return(f"{dy:10s} {tmStr} {e.temp:9.1f} {e.hum:10.1f}")
+
 # -----------------------------------------------------------------------------
 # The following preheat sequence is used:
 #
@@ -298,32 +424,36 @@ def formatTime(t):
 # @ preheat time + 30: t = setT - 5, h = 50
 # @ preheat time + 45: t = setT,     h = setH
 #
-def createClass(set_vals,st_tms,prht_tms):
-	dy = set_vals[0]
+# Returns the events for the class in time order, the last one turns the heat
+# and humidity off. The minutes are NOT wrapped, a preheat that starts before
+# Monday 00:00 has a negative time (checkTHsettings takes care of it).
+#
+# 'leads' has preheat times for single classes, {(day, 'HH:MM'): minutes};
+# they are used instead of the ones for the hour of the class.
+def createClass(set_vals,st_tms,prht_tms,leads=None):
+	dy = weekdays.index(set_vals[0])
 	t = set_vals[1].split(':')
 	hr = int(t[0])
-	tm = hr * 60 + int(t[1])
+	tm = dy * 1440 + hr * 60 + int(t[1])
 	temp = set_vals[2]
 	hum = set_vals[3]
+	prht_tm = prht_tms[-1]  # Classes after the last start time in the list
 	for i in range(0,len(st_tms)):
 		if hr < st_tms[i]:
 				prht_tm = prht_tms[i]
 				break
+	if leads and (set_vals[0],set_vals[1]) in leads:
+		prht_tm = leads[(set_vals[0],set_vals[1])]
 	# Each programme has four entries, the last one is to set the temperature
 	# back (i.e. turn off the heat and humidity)
-	tmStr = formatTime(tm - prht_tm)
-	newprgm = [f"{dy:10s} {tmStr} {25:9.1f} {55:10.1f}"]
-	tmStr = formatTime(tm - prht_tm + 30)
-	newprgm.append(f"{dy:10s} {tmStr} {temp-5:9.1f} {50:10.1f}")
-	tmStr = formatTime(tm - prht_tm + 45)
-	newprgm.append(f"{dy:10s} {tmStr} {temp:9.1f} {hum:10.1f}")
+	newprgm = [Event(tm - prht_tm,25.0,55.0)]
+	newprgm.append(Event(tm - prht_tm + 30,temp-5,50.0))
+	newprgm.append(Event(tm - prht_tm + 45,temp,hum))
 	# For 6 am classes, set temperature 1 degC higher for floor
 	# series ~ 45 minutes into the class.
 	if (hr == 6):
-		tmStr = formatTime(tm + 45)
-		newprgm.append(f"{dy:10s} {tmStr} {temp+1:9.1f} {hum:10.1f}")
-	tmStr = formatTime(tm + 95)
-	newprgm.append(f"{dy:10s} {tmStr} {21:9.1f} {20:10.1f}")
+		newprgm.append(Event(tm + 45,temp+1,hum))
+	newprgm.append(Event(tm + 95,OFF.temp,OFF.hum))
 	return (newprgm)
 
 # -----------------------------------------------------------------------------
@@ -331,28 +461,20 @@ def createClass(set_vals,st_tms,prht_tms):
 def printSettings(lst):
 	print('\n-----  START of class settings --------\n')
 	for l in lst:
-		print(l)
+		print(formatEvent(l))
 	print('\n-----  END of class settings ----------\n')
 	return
 
 # -----------------------------------------------------------------------------
-def createTHsettings(programme,strts,prhts):
-	c = 0
-	n = len(programme)
-	settings = ['MONDAY     00:00      21.0       20.0']
-	min_t = [   # Time between classes - to decide how to plan the classes.
-		47/1440,  # 45 (47) minutes
-		107/1440  # 105 (107) minutes
-		]
+def createTHsettings(programme,strts,prhts,leads=None):
+	settings = []
 	for i in range(0,len(programme)):
-		settings.extend(createClass(programme[i],strts,prhts))
+		settings.append(createClass(programme[i],strts,prhts,leads))
 	debug("Temperature and humidity settings created from class schedule.")
-	# For debugging...
-	#printSettings(settings)
 	return(settings)
 
 # -----------------------------------------------------------------------------
-def saveSettingsFile(schedule,flnm):
+def settingsText(schedule):
 	header = [
 	 '# A file to keep the settings that are required for the temperature /'+
 	 ' humidity',
@@ -367,43 +489,99 @@ def saveSettingsFile(schedule,flnm):
 	 '#         Start    Temperature  Humidity',
 	 '# DoW      Time      (deg C)     (%RH)'
 	 ]
-	# write content
-	with open(flnm,'w') as f:
-		for h in header:
-			f.write(f"{h}\n")
-		for c in schedule:
-			f.write(f"{c}\n")
+	s = ""
+	for h in header:
+		s += f"{h}\n"
+	for e in schedule:
+		s += f"{formatEvent(e)}\n"
+	return(s)
+
+# -----------------------------------------------------------------------------
+# The control program reads the settings file every minute, so write a new
+# file next to it and then move it into place.
+def saveSettingsFile(schedule,flnm):
+	with open(flnm+'.new','w') as f:
+		f.write(settingsText(schedule))
 		f.close()
+	os.replace(flnm+'.new',flnm)
 	return
 
 # -----------------------------------------------------------------------------
-def checkTHsettings(ths):
-	ths_fixed = [ths[0]]
-	p = re.compile(r'(\w+)\s+(\d+):(\d+)\s+(\d+.\d+)\s+(\d+.\d+)')
-	for i in range(1,len(ths)):
-		f = ths[i-1]
-		g = ths[i]
-		m1 = re.match(p,f)
-		m2 = re.match(p,g)
-		if m1.groups()[0] == m2.groups()[0]:
-			ts1 = int(m1.groups()[1])*60 + int(m1.groups()[2])
-			ts2 = int(m2.groups()[1])*60 + int(m2.groups()[2])
-			#print(ts1,ts2)
-			if ts1 > ts2:
-				dy = m2.groups()[0]
-				ts3 = ts1 + 1
-				th = ts3//60
-				tm = ts3 - th*60
-				temp = float(m2.groups()[3])
-				hum = float(m2.groups()[4])
-				s = f"{dy:<11s}{th:02d}:{tm:02d}{temp:10.1f}{hum:11.1f}"
-				ths[i] = s
+# Merge the classes (lists of events from createClass) into one week of
+# settings and fix overlaps:
+#
+# - A class that starts while an earlier class is still on keeps the room
+#   until the earlier class switches off. At that time the settings become
+#   what the later class would have at that time (instead of switching off).
+# - A class completely inside an earlier one is ignored.
+# - The week wraps around, so a class that is still on at Sunday midnight, or
+#   a preheat that starts before Monday 00:00, carries over.
+#
+# Sorting the classes is O(n log n), the rest is linear. The result is sorted
+# by time, starts at Monday 00:00 and every time is unique.
+def checkTHsettings(classes):
+	segs = []
+	for c in classes:
+		shift = (c[0].minute % WEEK) - c[0].minute
+		segs.append([Event(e.minute + shift,e.temp,e.hum) for e in c])
+	# Two copies of the week: the second copy sees everything that spills over
+	# from the end of the first one, so it is the week in steady state.
+	segs.extend([[Event(e.minute + WEEK,e.temp,e.hum) for e in c] for c in segs])
+	segs.sort(key=lambda c: c[0].minute)
+	events = []
+	owner_end = -1
+	for c in segs:
+		if c[0].minute < owner_end:   # Starts while another class is on
+			if c[-1].minute <= owner_end:
+				continue
+			if events and events[-1].minute == owner_end:
+				events.pop()                # Don't switch off...
+			cur = c[0]
+			for e in c:
+				if e.minute <= owner_end:
+					cur = e
+			add = [Event(owner_end,cur.temp,cur.hum)]  # ...continue with this class
+			add.extend([e for e in c if e.minute > owner_end])
+		else:
+			add = c
+		for e in add:
+			if events and events[-1].minute == e.minute:
+				events[-1] = e
+			else:
+				events.append(e)
+		owner_end = c[-1].minute
+	# The settings at Monday 00:00 are whatever was set last in the first week.
+	start = OFF
+	ths = []
+	for e in events:
+		if e.minute < WEEK:
+			start = Event(0,e.temp,e.hum)
+		elif e.minute < 2 * WEEK:
+			ths.append(Event(e.minute - WEEK,e.temp,e.hum))
+	if not ths or ths[0].minute > 0:
+		ths.insert(0,start)
+	checkTimeline(ths)
 	debug("Temperature and Humidity settings corrected for overlapping times.")
 	return(ths)
 
+# -----------------------------------------------------------------------------
+# Sanity check of the merged settings before they are written.
+def checkTimeline(ths):
+	if not ths or not ths[0].minute == 0:
+		errorExit("Settings do not start at Monday 00:00.")
+	for i in range(0,len(ths)):
+		e = ths[i]
+		if e.minute < 0 or e.minute >= WEEK:
+			errorExit(f"Settings time out of range: {e.minute}")
+		if i > 0 and e.minute <= ths[i-1].minute:
+			errorExit(f"Settings not in time order at {formatEvent(e)}")
+		if e.temp > 80 or e.hum > 80:
+			errorExit(f"Invalid settings: {formatEvent(e)}")
+	return
+
 # -----------------------------------------------------------------------------
 def makedate(day,mnth):
-	yr = time.localtime().tm_year
+	yr = clock.localtime().tm_year
 	dy = int(day)
 	mn = months.index(mnth)+1
 	tmst = time.mktime(datetime.datetime(year=yr,month=mn,day=dy).timetuple())
@@ -411,39 +589,52 @@ def makedate(day,mnth):
 	return(dt)
 
 # -----------------------------------------------------------------------------
-def getDateTimeSettings(fl,dt):  # Get settings on or after 'dt'
+# Read the date and time configuration file once. Returns a list of phases,
+# each phase is [startday, startmonth, date, times, preheat]. The dates are
+# for the current year (see makedate) so the caller must re-read the file when
+# the year changes.
+def readDateTimeConf(fl):
 	cnf = configparser.ConfigParser()
 	cnf.read(fl)
 	req = ['main,dates','defaults,startday','defaults,startmonth',
 				'defaults,times','defaults,preheat']
 	dtcnf = checkConfig(cnf, req)
 	chks = [s.strip() for s in list(cnf['main']['dates'].split(','))]
-	newdates = [makedate(cnf['defaults']['startday'],cnf['defaults']['startmonth'])]
-	sdts = [cnf['defaults']['startday']]
-	smnt = [cnf['defaults']['startmonth']]
-	times = [cnf['defaults']['times']]
-	preheats = [cnf['defaults']['preheat']]
+	phases = [[cnf['defaults']['startday'],cnf['defaults']['startmonth'],
+						makedate(cnf['defaults']['startday'],cnf['defaults']['startmonth']),
+						cnf['defaults']['times'],cnf['defaults']['preheat']]]
 	for itm in chks:
 		reqs = ['startday','startmonth','times','preheat']
 		for r in reqs:
 			if not r in cnf[itm]:
 				errorExit(f"{r} not in {itm}")
-		newdates.append(makedate(cnf[itm]['startday'],cnf[itm]['startmonth']))
-		sdts.append(cnf[itm]['startday'])
-		smnt.append(cnf[itm]['startmonth'])
-		times.append(cnf[itm]['times'])
-		preheats.append(cnf[itm]['preheat'])
+		phases.append([cnf[itm]['startday'],cnf[itm]['startmonth'],
+						makedate(cnf[itm]['startday'],cnf[itm]['startmonth']),
+						cnf[itm]['times'],cnf[itm]['preheat']])
+	return(phases)
+
+# -----------------------------------------------------------------------------
+def findPhase(phases,dt):  # Index of the phase that is active on 'dt'
 	# find date on or after dt
-	cdt = newdates[0]
-	idx = -1
-	for i in range(0,len(newdates)):
-		if dt >= newdates[i]:
-			debug(f"Possible start date for new settings: {sdts[i]} {smnt[i]}")
-			debug(f"     Settings for {newdates[i]}, it is larger or equal to {dt}")
-			cdt = newdates[i]
-			tms = times[i]
-			phs = preheats[i]
+	idx = 0
+	for i in range(0,len(phases)):
+		if dt >= phases[i][2]:
+			debug(f"Possible start date for new settings: {phases[i][0]} "+
+				f"{phases[i][1]}")
+			debug(f"     Settings for {phases[i][2]}, it is larger or equal to {dt}")
 			idx = i
+	return(idx)
+
+# -----------------------------------------------------------------------------
+def selectDateTimeSettings(phases,dt,fl):  # Get settings on or after 'dt'
+	return(phaseSettings(phases[findPhase(phases,dt)],fl))
+
+# -----------------------------------------------------------------------------
+def phaseSettings(phase,fl):  # Start and preheat times for one phase
+	sdt = phase[0]
+	smn = phase[1]
+	tms = phase[3]
+	phs = phase[4]
 	# Create lists of start and preheat times for programming the schedule.
 	st_times = []
 	ph_times = []
@@ -454,8 +645,8 @@ def getDateTimeSettings(fl,dt):  # Get settings on or after 'dt'
 		except:
 			msg =  f"Settings file: {fl}\n"
 			msg +=  "       There is an error in the start time list for "
-			msg += f"{sdts[idx]} {smnt[idx]}\n"
-			msg += f"       Start times list: {times[idx]}\n"
+			msg += f"{sdt} {smn}\n"
+			msg += f"       Start times list: {tms}\n"
 			errorExit(msg)
 		if t >= 0 and t <= 24:
 			st_times.append(t)
@@ -466,8 +657,8 @@ def getDateTimeSettings(fl,dt):  # Get settings on or after 'dt'
 		except:
 			msg =  f"Settings file: {fl}\n"
 			msg +=  "       There is an error in the preheat times list for "
-			msg += f"{sdts[idx]} {smnt[idx]}\n"
-			msg += f"       Preheat times list: {preheats[idx]}\n"
+			msg += f"{sdt} {smn}\n"
+			msg += f"       Preheat times list: {phs}\n"
 			errorExit(msg)
 		if t >= 0 and t <= 360: # Maximum preheat period is 360 minutes (6 hours)
 			ph_times.append(t)
@@ -476,12 +667,133 @@ def getDateTimeSettings(fl,dt):  # Get settings on or after 'dt'
 		msg += f"       The lengths of the start hours ({len(st_times)}) and pre-heat "
 		msg += f"times ({len(ph_times)}) are not equal!\n"
 		msg += "       The error is for this date in the settings file: "
-		msg += f"{sdts[idx]} {smnt[idx]}\n"
-		msg += f"       Start times list: {times[idx]}\n"
-		msg += f"       Preheat times list: {preheats[idx]}\n"
+		msg += f"{sdt} {smn}\n"
+		msg += f"       Start times list: {tms}\n"
+		msg += f"       Preheat times list: {phs}\n"
 		errorExit(msg)
 	return(st_times,ph_times)
 
+# -----------------------------------------------------------------------------
+def getDateTimeSettings(fl,dt):  # Get settings on or after 'dt'
+	return(selectDateTimeSettings(readDateTimeConf(fl),dt,fl))
+
+# -----------------------------------------------------------------------------
+# Everything needed to go from a (parsed) schedule and date time configuration
+# to a settings file. Used by main() and by checkSchedule.py, which keeps the
+# parsed files in memory (and may have learned lead times, see createClass).
+def makeSettings(schedule,phases,dt,settingsfile,dtflnm,leads=None):
+	start_tms,preheat_tms = selectDateTimeSettings(phases,dt,dtflnm)
+	thsettings = createTHsettings(schedule,start_tms,preheat_tms,leads)
+	thsettings = checkTHsettings(thsettings)
+	# For debugging...
+	#printSettings(thsettings)
+	saveSettingsFile(thsettings,settingsfile)
+	return
+
+# -----------------------------------------------------------------------------
+# Create the settings for every phase in datetime.conf in one go. Returns a
+# list with the settings for each phase (same order as 'phases').
+def compileCalendar(schedule,phases,dtflnm):
+	calendar = []
+	for phase in phases:
+		start_tms,preheat_tms = phaseSettings(phase,dtflnm)
+		thsettings = createTHsettings(schedule,start_tms,preheat_tms)
+		calendar.append(checkTHsettings(thsettings))
+	debug(f"Settings created for {len(calendar)} phases.")
+	return(calendar)
+
+# -----------------------------------------------------------------------------
+def hashFile(flnm):
+	with open(flnm,'rb') as f:
+		h = hashlib.sha256(f.read()).hexdigest()
+		f.close()
+	return(h[0:16])
+
+# -----------------------------------------------------------------------------
+# A compiled calendar is stored in a directory named after the hashes of the
+# settings generator (this file), the class schedule and the datetime.conf
+# file it was made from.
+def calendarPath(cachedir,schflnm,dtflnm):
+	return(os.path.join(cachedir,
+		f"{hashFile(__file__)}-{hashFile(schflnm)}-{hashFile(dtflnm)}"))
+
+# -----------------------------------------------------------------------------
+def phaseFile(calpath,phases,idx):
+	return(os.path.join(calpath,
+		f"{idx:02d}_{phases[idx][0]}{phases[idx][1]}.settings"))
+
+# -----------------------------------------------------------------------------
+def saveCalendar(calendar,phases,calpath):
+	tmppath = calpath+'.new'
+	if os.path.isdir(tmppath):
+		shutil.rmtree(tmppath)
+	os.makedirs(tmppath)
+	for i in range(0,len(calendar)):
+		saveSettingsFile(calendar[i],phaseFile(tmppath,phases,i))
+	os.replace(tmppath,calpath)
+	debug(f"Calendar saved in {calpath}")
+	# Remove the calendars made by another version of this file, and the oldest
+	cachedir = os.path.dirname(calpath)
+	generator = os.path.basename(calpath).split('-')[0]+'-'
+	old = []
+	for d in os.listdir(cachedir):
+		if not os.path.isdir(os.path.join(cachedir,d)) or d.endswith('.new'):
+			continue
+		if d.startswith(generator):
+			old.append(os.path.join(cachedir,d))
+		else:
+			debug(f"Removing calendar of another version {d}")
+			shutil.rmtree(os.path.join(cachedir,d))
+	old.sort(key=os.path.getmtime)
+	for d in old[:-CACHE_KEEP]:
+		debug(f"Removing old calendar {d}")
+		shutil.rmtree(d)
+	return
+
+# -----------------------------------------------------------------------------
+# Compile the calendar for this schedule and datetime.conf if it is not in the
+# cache yet. Returns the path to the calendar.
+def makeCalendar(schedule,phases,cachedir,schflnm,dtflnm):
+	calpath = calendarPath(cachedir,schflnm,dtflnm)
+	if os.path.isdir(calpath):
+		debug(f"Calendar found in cache: {calpath}")
+	else:
+		saveCalendar(compileCalendar(schedule,phases,dtflnm),phases,calpath)
+	return(calpath)
+
+# -----------------------------------------------------------------------------
+# Changing to a new phase is only copying a file from the calendar.
+def installSettings(calpath,phases,dt,settingsfile):
+	src = phaseFile(calpath,phases,findPhase(phases,dt))
+	shutil.copyfile(src,settingsfile+'.new')
+	os.replace(settingsfile+'.new',settingsfile)
+	debug(f"Settings file {settingsfile} copied from {src}")
+	return
+
+# -----------------------------------------------------------------------------
+# Print the settings for every day from 'dt1' to 'dt2' (day, month tuples),
+# one block per phase.
+def dumpRange(schedule,phases,dtflnm,dt1,dt2):
+	yr = clock.localtime().tm_year
+	d = datetime.date(yr,months.index(dt1[1])+1,int(dt1[0]))
+	end = datetime.date(yr,months.index(dt2[1])+1,int(dt2[0]))
+	if end < d:
+		errorExit("The end of the test date range is before the start.")
+	calendar = compileCalendar(schedule,phases,dtflnm)
+	blocks = []  # [phase index, first day, last day]
+	while d <= end:
+		idx = findPhase(phases,makedate(d.day,months[d.month-1]))
+		if len(blocks) > 0 and blocks[-1][0] == idx:
+			blocks[-1][2] = d
+		else:
+			blocks.append([idx,d,d])
+		d += datetime.timedelta(days=1)
+	for b in blocks:
+		print(f"# {b[1].day} {months[b[1].month-1]} to {b[2].day} "+
+			f"{months[b[2].month-1]}: {phases[b[0]][0]} {phases[b[0]][1]} settings")
+		print(settingsText(calendar[b[0]]))
+	return
+
 # -----------------------------------------------------------------------------
 def makeFilename(hm,fl):
 	if not fl.startswith('/'):
@@ -490,9 +802,10 @@ def makeFilename(hm,fl):
 
 # -----------------------------------------------------------------------------
 def getCurrentDate(): # Something like MJD, but not quite (uses localtime, not gmtime)
-	yr = time.localtime().tm_year
-	mn = time.localtime().tm_mon
-	dy = time.localtime().tm_mday
+	now = clock.localtime()
+	yr = now.tm_year
+	mn = now.tm_mon
+	dy = now.tm_mday
 	tmst = time.mktime(datetime.datetime(year=yr,month=mn,day=dy).timetuple())
 	dt = int(tmst/86400) + 40587
 	return(dt)
@@ -508,99 +821,137 @@ def getDateFromStr(s):
 # Main
 # -----------------------------------------------------------------------------
 
-parser = argparse.ArgumentParser(description="Reads class schedule, allows "+
-																 "modifications and saving to a user selected "+
-																 "file name, then generates the settings file")
-parser.add_argument("-v","--version",action="store_true",help="Show version "+
-										"and exit.")
-parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
-										"configuration file. The default is "+
-										"~/etc/classSchedule.conf.")
-parser.add_argument("-t","--testdate",nargs=1,help="Specify a date to create "+
-										"a settings file for. Date must be in format 'd Month'")
-parser.add_argument("-d","--debug",action="store_true",
-										help="Turn debugging on")
+def main(argv=None):
+	global DEBUG
 
-args = parser.parse_args()
+	parser = argparse.ArgumentParser(description="Reads class schedule, allows "+
+																	 "modifications and saving to a user selected "+
+																	 "file name, then generates the settings file")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/classSchedule.conf.")
+	parser.add_argument("-t","--testdate",nargs='+',help="Specify a date to create "+
+											"a settings file for. Date must be in format 'd Month'. "+
+											"If two dates are given, the settings for all the days "+
+											"from the first to the second date are printed and no "+
+											"settings file is created.")
+	parser.add_argument("-a","--all",action="store_true",help="Create the "+
+											"settings for all the dates in the date time settings "+
+											"file and save them in the cache directory.")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when it "+
+											"ends or SIGUSR1 is received (see profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
 
-if args.debug:
-	DEBUG = True
+	args = parser.parse_args(argv)
 
-versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+	if args.debug:
+		DEBUG = True
 
-if args.version:
-	print(versionStr)
-	sys.exit(0)
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
 
-debug(versionStr)
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
 
-HOME = os.path.expanduser('~')
-if not(HOME.endswith('/')):
-	HOME += '/'
+	debug(versionStr)
 
-debug(f"Current user's home: {HOME}")
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
 
-configfile = f"{HOME}etc/classSchedule.conf"
+	prof = profiling.fromArgs(args,HOME,script)
+	try:
+		debug(f"Current user's home: {HOME}")
 
-if args.config:
-	debug(f"Alternate config file specified: {str(args.config[0])}")
-	configfile = str(args.config[0])
-	if not configfile.startswith('/'):
-		configfile = HOME+configfile
+		configfile = f"{HOME}etc/classSchedule.conf"
 
-debug("Configuration file: "+configfile)
+		if args.config:
+			debug(f"Alternate config file specified: {str(args.config[0])}")
+			configfile = str(args.config[0])
+			if not configfile.startswith('/'):
+				configfile = HOME+configfile
 
-if not os.path.isfile(configfile):
-	errorExit(configfile+' does not exist.')
+		debug("Configuration file: "+configfile)
 
-sDate = getCurrentDate()
+		if not os.path.isfile(configfile):
+			errorExit(configfile+' does not exist.')
 
-if args.testdate:
-	debug(f"Test date: {args.testdate[0]}")
-	(dy,mn) = getDateFromStr(args.testdate[0])
-	sDate = makedate(dy,mn)
+		sDate = getCurrentDate()
 
-conf = configparser.ConfigParser()
-conf.read(configfile)
+		if args.testdate:
+			if len(args.testdate) > 2:
+				errorExit("Specify one test date, or two for a range of dates.")
+			debug(f"Test date: {args.testdate[0]}")
+			(dy,mn) = getDateFromStr(args.testdate[0])
+			sDate = makedate(dy,mn)
 
-req = ['main,settings file','main,datetime settings']
+		conf = configparser.ConfigParser()
+		conf.read(configfile)
 
-cfg = checkConfig(conf, req)
+		req = ['main,settings file','main,datetime settings']
 
-debug(f"conf['main']['settings file'] = {conf['main']['settings file']}")
-debug(f"conf['main']['datetime settings'] = {conf['main']['datetime settings']}")
+		cfg = checkConfig(conf, req)
 
-# The file to save the temp hum settings that is set by the control program.
-settingsfile = makeFilename(HOME,conf['main']['settings file'])
+		debug(f"conf['main']['settings file'] = {conf['main']['settings file']}")
+		debug(f"conf['main']['datetime settings'] = {conf['main']['datetime settings']}")
 
-debug("Settings file: "+settingsfile)
+		# The file to save the temp hum settings that is set by the control program.
+		settingsfile = makeFilename(HOME,conf['main']['settings file'])
 
-schedulefile = ""
-if conf['schedule']['file']:
-	schedulefile = makeFilename(HOME,conf['schedule']['file'])
-	debug("Found a class schedule in the configuration: {}".format(schedulefile))
-	if not os.path.isfile(schedulefile):
-		schedulefile = ""
-		debug("Ignoring the class schedule in the configuration as it does not exists.")
-
-dtsettingsflnm = makeFilename(HOME,conf['main']['datetime settings'])
-
-if not os.path.isfile(dtsettingsflnm):
-	errorExit(f"{dtsettingsflnm} does not exist.")
-
-debug(f"Date and Time settings file: {dtsettingsflnm}")
-
-start_tms,preheat_tms = getDateTimeSettings(dtsettingsflnm,sDate)
-
-schedule = loadSchedule(schedulefile)
+		debug("Settings file: "+settingsfile)
 
-thsettings = createTHsettings(schedule,start_tms,preheat_tms)
-
-thsettings = checkTHsettings(thsettings)
-
-# For debugging...
-#printSettings(thsettings)
-
-saveSettingsFile(thsettings,settingsfile)
+		schedulefile = ""
+		if conf['schedule']['file']:
+			schedulefile = makeFilename(HOME,conf['schedule']['file'])
+			debug("Found a class schedule in the configuration: {}".format(schedulefile))
+			if not os.path.isfile(schedulefile):
+				schedulefile = ""
+				debug("Ignoring the class schedule in the configuration as it does not exists.")
+
+		dtsettingsflnm = makeFilename(HOME,conf['main']['datetime settings'])
+
+		if not os.path.isfile(dtsettingsflnm):
+			errorExit(f"{dtsettingsflnm} does not exist.")
+
+		debug(f"Date and Time settings file: {dtsettingsflnm}")
+
+		cachedir = ""
+		if conf.has_option('main','cache'):
+			cachedir = makeFilename(HOME,conf['main']['cache'])
+			debug(f"Compiled settings are kept in {cachedir}")
+			os.makedirs(cachedir,exist_ok=True)
+
+		schedule = loadSchedule(schedulefile)
+
+		phases = readDateTimeConf(dtsettingsflnm)
+
+		if args.testdate and len(args.testdate) == 2:
+			dumpRange(schedule,phases,dtsettingsflnm,getDateFromStr(args.testdate[0]),
+				getDateFromStr(args.testdate[1]))
+		elif args.all:
+			if cachedir == "" or schedulefile == "":
+				errorExit("A cache directory and a class schedule are required for "+
+					"the '--all' option.")
+			calpath = makeCalendar(schedule,phases,cachedir,schedulefile,
+				dtsettingsflnm)
+			for i in range(0,len(phases)):
+				print(phaseFile(calpath,phases,i))
+		elif not cachedir == "" and not schedulefile == "":
+			calpath = makeCalendar(schedule,phases,cachedir,schedulefile,
+				dtsettingsflnm)
+			installSettings(calpath,phases,sDate,settingsfile)
+		else:
+			makeSettings(schedule,phases,sDate,settingsfile,dtsettingsflnm)
+
+		debug(f'{script} terminated.')
+	finally:
+		prof.close()
+	return
 
-debug(f'{script} terminated.')
+# -----------------------------------------------------------------------------
+if __name__ == "__main__":
+	main()
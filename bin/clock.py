@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+# clock.py
+
+# The time as temphumlog.py, checkSchedule.py and classSchedule.py see it.
+# Each of them has a module variable 'clock' (a Clock, the real time) and asks
+# it, and not the time and datetime modules, what time and day it is. A
+# simulation (bench/simWeek.py) replaces it with
+#
+#   FixedClock(t)     stands still at t until it is set or advanced
+#   VirtualClock(t)   starts at t and only moves when something sleeps (or
+#                     advances it), so a week of control goes by as fast as
+#                     the computer can work it out
+#   VirtualClock(t,speed)
+#                     starts at t and runs 'speed' times faster than the real
+#                     time; sleeps are 'speed' times shorter
+#
+# Local time is the local time of the computer (TZ), also for the simulated
+# clocks. Timings of the programs themselves (how long a read or a file write
+# took) are not done with the clock, they are always real.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import time
+import datetime
+import threading
+
+# -----------------------------------------------------------------------------
+# The real time
+class Clock:
+
+	def time(self):
+		return(time.time())
+
+	def monotonic(self):
+		return(time.monotonic())
+
+	def sleep(self,seconds):
+		time.sleep(seconds)
+		return
+
+	def localtime(self,t=None):
+		if t is None:
+			t = self.time()
+		return(time.localtime(t))
+
+	# Local date and time, like datetime.datetime.now()
+	def now(self):
+		return(datetime.datetime.fromtimestamp(self.time()))
+
+	# Like datetime.datetime.utcnow() (no time zone)
+	def utcnow(self):
+		return(datetime.datetime.fromtimestamp(self.time(),
+			datetime.timezone.utc).replace(tzinfo=None))
+
+# -----------------------------------------------------------------------------
+# Stands still: sleep() returns at once without moving it
+class FixedClock(Clock):
+
+	def __init__(self,t):
+		self.t = float(t)
+		self.lock = threading.Lock()
+		return
+
+	def time(self):
+		return(self.t)
+
+	def monotonic(self):
+		return(self.t)
+
+	def sleep(self,seconds):
+		return
+
+	def set(self,t):
+		with self.lock:
+			self.t = float(t)
+		return
+
+	def advance(self,seconds):
+		with self.lock:
+			self.t += seconds
+		return
+
+# -----------------------------------------------------------------------------
+# Simulated time, starting at 't'. Without a speed it only moves with sleep()
+# and advance(); with one it follows the real time, 'speed' times faster.
+class VirtualClock(FixedClock):
+
+	def __init__(self,t,speed=None):
+		super().__init__(t)
+		self.speed = speed
+		self.startT = time.monotonic()
+		return
+
+	def time(self):
+		if self.speed is None:
+			return(self.t)
+		return(self.t + (time.monotonic() - self.startT)*self.speed)
+
+	def monotonic(self):
+		return(self.time())
+
+	def sleep(self,seconds):
+		if self.speed is None:
+			self.advance(seconds)
+		else:
+			time.sleep(seconds/self.speed)
+		return
+
+	def set(self,t):
+		with self.lock:
+			self.t = float(t)
+			self.startT = time.monotonic()
+		return
+
+# -----------------------------------------------------------------------------
+# 'YYYY-MM-DD HH:MM[:SS]' in local time to seconds since the epoch
+def parseTime(s):
+	for fmt in ['%Y-%m-%d %H:%M:%S','%Y-%m-%d %H:%M','%Y-%m-%d']:
+		try:
+			return(time.mktime(datetime.datetime.strptime(s.strip(),fmt).timetuple()))
+		except ValueError:
+			pass
+	raise ValueError(f"Not a date and time (YYYY-MM-DD HH:MM[:SS]): {s}")
@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+# dataFiles.py
+
+# Reads the day files of the loggers (data/MJD.dat, data/co2log/MJD.dat),
+# also when archiver.py compressed them. A day is in the first of
+#
+#   MJD.dat            as the logger writes it (today, and days not archived)
+#   MJD.dat.gz         compressed on its own (gzip, xz or zstd)
+#   MJD.dat.xz
+#   MJD.dat.zst
+#   YYYY-MM.zip        all the days of a month (UTC) in one file, the members
+#                      MJD.dat (deflate or xz), or MJD.dat.zst (zstd, stored)
+#
+# so a reader only asks for a day: findDay() tells where it is, openDay()
+# gives it as a text file. zstd needs the zstandard module, the others are in
+# the standard library.
+#
+# DayCache keeps the text of the days read last (hot days: the plot of the
+# last hours reads the same one or two days every minute). A day before
+# yesterday (UTC) no longer changes, so it is given from the cache without
+# looking at the file again; today and yesterday are read again when the file
+# changed.
+#
+# monitor/bin/dataFiles.py (for createTempHum.py) is a link to this file.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import io
+import time
+import gzip
+import lzma
+import zipfile
+import collections
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# The compression methods and the suffix of their files
+SUFFIX = {'gzip': '.gz','xz': '.xz','zstd': '.zst'}
+
+# -----------------------------------------------------------------------------
+def compress(data,method):
+	if method == 'gzip':
+		return(gzip.compress(data,compresslevel=9,mtime=0))
+	if method == 'xz':
+		return(lzma.compress(data,preset=9))
+	if method == 'zstd':
+		if zstandard is None:
+			raise ValueError("zstd needs the zstandard module")
+		return(zstandard.ZstdCompressor(level=19).compress(data))
+	raise ValueError(f"Unknown compression: {method}")
+
+# -----------------------------------------------------------------------------
+# 'suffix' is that of the file (or zip member) the data came from
+def decompress(data,suffix):
+	if suffix == '.gz':
+		return(gzip.decompress(data))
+	if suffix == '.xz':
+		return(lzma.decompress(data))
+	if suffix == '.zst':
+		if zstandard is None:
+			raise ValueError("zstd needs the zstandard module")
+		return(zstandard.ZstdDecompressor().decompress(data))
+	return(data)
+
+# -----------------------------------------------------------------------------
+# The month (UTC) of an MJD, 'YYYY-MM'
+def monthOf(mjd):
+	return(time.strftime('%Y-%m',time.gmtime((mjd - 40587)*86400)))
+
+# -----------------------------------------------------------------------------
+# Where the day is: (file, zip member or None), None if it is not there
+def findDay(path,mjd,ext='dat'):
+	flnm = os.path.join(path,f"{mjd}.{ext}")
+	if os.path.isfile(flnm):
+		return(flnm,None)
+	for suffix in SUFFIX.values():
+		if os.path.isfile(flnm+suffix):
+			return(flnm+suffix,None)
+	zflnm = os.path.join(path,monthOf(mjd)+'.zip')
+	if os.path.isfile(zflnm):
+		try:
+			with zipfile.ZipFile(zflnm,'r') as z:
+				names = set(z.namelist())
+		except (OSError,zipfile.BadZipFile):
+			return(None)
+		for member in [f"{mjd}.{ext}",f"{mjd}.{ext}.zst"]:
+			if member in names:
+				return(zflnm,member)
+	return(None)
+
+# -----------------------------------------------------------------------------
+# The bytes of the day, None if it is not there. A day that is archived while
+# it is looked for is looked for again.
+def readBytes(path,mjd,ext='dat'):
+	for attempt in range(0,2):
+		where = findDay(path,mjd,ext)
+		if where is None:
+			return(None)
+		(flnm,member) = where
+		try:
+			if member is None:
+				with open(flnm,'rb') as f:
+					data = f.read()
+					f.close()
+				return(decompress(data,os.path.splitext(flnm)[1]))
+			with zipfile.ZipFile(flnm,'r') as z:
+				data = z.read(member)
+			return(decompress(data,os.path.splitext(member)[1]))
+		except FileNotFoundError:
+			continue
+	return(None)
+
+# -----------------------------------------------------------------------------
+# The day as a text file (to read line by line), None if it is not there
+def openDay(path,mjd,ext='dat'):
+	where = findDay(path,mjd,ext)
+	if where is not None and where[0].endswith(f".{ext}"):
+		try:
+			return(open(where[0],'r'))
+		except FileNotFoundError:
+			pass
+	data = readBytes(path,mjd,ext)
+	if data is None:
+		return(None)
+	return(io.StringIO(data.decode('utf-8','replace')))
+
+# -----------------------------------------------------------------------------
+# The MJDs of the days in a directory, archived or not
+def listDays(path,ext='dat'):
+	mjds = set()
+	for flnm in os.listdir(path):
+		name = flnm
+		if name.endswith('.zip'):
+			try:
+				with zipfile.ZipFile(os.path.join(path,name),'r') as z:
+					members = z.namelist()
+			except (OSError,zipfile.BadZipFile):
+				continue
+		else:
+			members = [name]
+		for m in members:
+			for suffix in SUFFIX.values():
+				if m.endswith(suffix):
+					m = m[:-len(suffix)]
+			if m.endswith(f".{ext}") and m[:-len(ext)-1].isdigit():
+				mjds.add(int(m[:-len(ext)-1]))
+	return(sorted(mjds))
+
+# -----------------------------------------------------------------------------
+# The days read last, as lists of lines
+class DayCache:
+
+	def __init__(self,size=8):
+		self.size = size
+		self.days = collections.OrderedDict()  # (path,mjd,ext): (signature,lines)
+		self.hits = 0
+		self.misses = 0
+
+	def signature(self,path,mjd,ext):
+		where = findDay(path,mjd,ext)
+		if where is None:
+			return(None)
+		try:
+			st = os.stat(where[0])
+		except OSError:
+			return(None)
+		return((where[0],where[1],st.st_mtime,st.st_size))
+
+	# The lines of the day ([] if it is not there)
+	def lines(self,path,mjd,ext='dat'):
+		key = (path,mjd,ext)
+		today = int(time.time()/86400) + 40587
+		if key in self.days and mjd < today - 1:
+			self.days.move_to_end(key)
+			self.hits += 1
+			return(self.days[key][1])
+		sig = self.signature(path,mjd,ext)
+		if key in self.days and self.days[key][0] == sig:
+			self.days.move_to_end(key)
+			self.hits += 1
+			return(self.days[key][1])
+		self.misses += 1
+		data = readBytes(path,mjd,ext) if sig is not None else None
+		if data is None:
+			return([])  # not kept, it may be there next time
+		lines = data.decode('utf-8','replace').splitlines(True)
+		self.days[key] = (sig,lines)
+		self.days.move_to_end(key)
+		while len(self.days) > self.size:
+			self.days.popitem(last=False)
+		return(lines)
+
+	def describe(self):
+		return(f"{len(self.days)} days cached, {self.hits} hits, {self.misses} "+
+			"misses")
@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+# heartbeat.py
+
+# A heartbeat that the programs run by supervisor.py update every time
+# through their main loop, so the supervisor can see that they still work and
+# not just that they are still running.
+#
+# The heartbeat is a small file (status/<component>.heartbeat) that both the
+# program and the supervisor map into memory (mmap), so a beat is a few bytes
+# written to memory, also when the program is a separate process:
+#
+#   count   number of beats (unsigned 64 bit)
+#   time    time.monotonic() of the last beat (the same clock in every
+#           process)
+#   pid     process that beats
+#   hang    seconds to hang at the next beat (test mode, see supervisor.py
+#           --hang), 0 normally
+#
+# Heartbeat(None) does nothing, for a program that is not run by the
+# supervisor.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import mmap
+import time
+import struct
+
+LAYOUT = struct.Struct('<Qdqd')  # count, time, pid, hang
+BEAT = struct.Struct('<Qdq')     # the part the program writes
+HANG = 24                        # offset of hang
+
+# -----------------------------------------------------------------------------
+class Heartbeat:
+
+	def __init__(self,flnm):
+		self.flnm = flnm
+		self.mm = None
+		if flnm is None:
+			return
+		fd = os.open(flnm,os.O_RDWR | os.O_CREAT,0o644)
+		try:
+			if os.fstat(fd).st_size < LAYOUT.size:
+				os.ftruncate(fd,LAYOUT.size)
+			self.mm = mmap.mmap(fd,LAYOUT.size)
+		finally:
+			os.close(fd)
+		return
+
+	# Called by the program every time through its loop
+	def beat(self):
+		if self.mm is None:
+			return
+		(count,t,pid,hang) = LAYOUT.unpack_from(self.mm)
+		if hang > 0:
+			self.hang(hang)
+		BEAT.pack_into(self.mm,0,count + 1,time.monotonic(),os.getpid())
+		return
+
+	# Test mode: stop beating for 'hang' seconds, as if the program is stuck.
+	# The supervisor ends the hang early by setting hang back to 0 (a thread
+	# can not be killed).
+	def hang(self,hang):
+		endT = time.monotonic() + hang
+		while time.monotonic() < endT:
+			if struct.unpack_from('<d',self.mm,HANG)[0] == 0.0:
+				break
+			time.sleep(0.1)
+		self.release()
+		return
+
+	# (count, time of the last beat, pid), count 0 if there was no beat yet
+	def read(self):
+		if self.mm is None:
+			return(0,0.0,0)
+		(count,t,pid,hang) = LAYOUT.unpack_from(self.mm)
+		return(count,t,pid)
+
+	# Test mode: ask the program to hang for 'seconds' at its next beat
+	def inject(self,seconds):
+		if self.mm is not None:
+			struct.pack_into('<d',self.mm,HANG,float(seconds))
+		return
+
+	def release(self):
+		self.inject(0.0)
+		return
+
+	def close(self):
+		if self.mm is not None:
+			self.mm.close()
+			self.mm = None
+		return
@@ -0,0 +1,236 @@
+#!/usr/bin/python3
+# metrics.py
+
+# Counters, gauges and latency histograms for the programs (temphumlog.py,
+# sgp30log.py, upload.py, checkSchedule.py and createTempHum.py), so that what
+# they do can be seen without turning debugging on:
+#
+#   counter     a number that only goes up (lines parsed, parse failures)
+#   gauge       a value that is set (samples in the last minute, queue depth)
+#   histogram   how long something took, counted in fixed buckets (command
+#               round trip, file writes, uploads, rendering)
+#
+# Metrics(flnm) writes a snapshot of all of them (JSON) to flnm every
+# 'interval' seconds (tick() in the main loop), and when it is closed. The
+# file is replaced in one go, so a reader never sees half a snapshot.
+# 'metrics.py flnm' shows a snapshot.
+#
+# Metrics(None) does nothing: every counter, gauge and histogram it gives is
+# the same object whose methods just return, so a program without --metrics
+# only pays for the method call.
+#
+# A metric is updated from one thread; a snapshot taken by another thread may
+# be a moment out of step, which does not matter here.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import bisect
+
+# Upper bounds (seconds) of the buckets of a latency histogram; a last bucket
+# counts everything slower
+LATENCY = (0.001,0.002,0.005,0.01,0.02,0.05,0.1,0.2,0.5,1.0,2.0,5.0,10.0,30.0)
+
+# -----------------------------------------------------------------------------
+class Counter:
+
+	def __init__(self):
+		self.value = 0
+
+	def inc(self,n=1):
+		self.value += n
+		return
+
+	def snapshot(self):
+		return(self.value)
+
+# -----------------------------------------------------------------------------
+class Gauge:
+
+	def __init__(self):
+		self.value = 0.0
+
+	def set(self,v):
+		self.value = v
+		return
+
+	def snapshot(self):
+		return(self.value)
+
+# -----------------------------------------------------------------------------
+class Histogram:
+
+	def __init__(self,buckets=LATENCY):
+		self.buckets = tuple(buckets)
+		self.counts = [0]*(len(self.buckets) + 1)
+		self.count = 0
+		self.sum = 0.0
+		self.max = 0.0
+
+	def observe(self,v):
+		self.counts[bisect.bisect_left(self.buckets,v)] += 1
+		self.count += 1
+		self.sum += v
+		if v > self.max:
+			self.max = v
+		return
+
+	# Upper bound of the bucket the q quantile is in (max for the last bucket)
+	def quantile(self,q):
+		if self.count == 0:
+			return(0.0)
+		n = 0
+		for i in range(0,len(self.counts)):
+			n += self.counts[i]
+			if n >= q*self.count:
+				if i < len(self.buckets):
+					return(min(self.buckets[i],self.max))
+				break
+		return(self.max)
+
+	def snapshot(self):
+		return({'buckets': list(self.buckets),'counts': list(self.counts),
+			'count': self.count,'sum': self.sum,'max': self.max,
+			'p50': self.quantile(0.5),'p90': self.quantile(0.9),
+			'p99': self.quantile(0.99)})
+
+# -----------------------------------------------------------------------------
+# What a disabled registry gives for every metric
+class NoMetric:
+
+	def inc(self,n=1):
+		return
+
+	def set(self,v):
+		return
+
+	def observe(self,v):
+		return
+
+NOOP = NoMetric()
+
+# -----------------------------------------------------------------------------
+class Metrics:
+
+	def __init__(self,flnm,program='',interval=60.0):
+		self.flnm = flnm
+		self.enabled = flnm is not None
+		self.program = program
+		self.interval = interval
+		self.startT = time.monotonic()
+		self.lastT = self.startT
+		self.counters = {}
+		self.gauges = {}
+		self.histograms = {}
+		return
+
+	def counter(self,name):
+		if not self.enabled:
+			return(NOOP)
+		if not name in self.counters:
+			self.counters[name] = Counter()
+		return(self.counters[name])
+
+	def gauge(self,name):
+		if not self.enabled:
+			return(NOOP)
+		if not name in self.gauges:
+			self.gauges[name] = Gauge()
+		return(self.gauges[name])
+
+	def histogram(self,name,buckets=LATENCY):
+		if not self.enabled:
+			return(NOOP)
+		if not name in self.histograms:
+			self.histograms[name] = Histogram(buckets)
+		return(self.histograms[name])
+
+	def snapshot(self):
+		return({'program': self.program,'pid': os.getpid(),'time': time.time(),
+			'uptime': time.monotonic() - self.startT,
+			'counters': {k: v.snapshot() for (k,v) in list(self.counters.items())},
+			'gauges': {k: v.snapshot() for (k,v) in list(self.gauges.items())},
+			'histograms': {k: v.snapshot() for (k,v) in
+				list(self.histograms.items())}})
+
+	def write(self):
+		if not self.enabled:
+			return
+		try:
+			with open(self.flnm+'.new','w') as f:
+				json.dump(self.snapshot(),f,indent=1)
+			os.replace(self.flnm+'.new',self.flnm)
+		except OSError as e:
+			print(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()),
+				f"Could not write metrics to {self.flnm}: {e}")
+		self.lastT = time.monotonic()
+		return
+
+	# Called in the main loop: writes the snapshot when it is time to
+	def tick(self):
+		if self.enabled and time.monotonic() - self.lastT >= self.interval:
+			self.write()
+		return
+
+	def close(self):
+		self.write()
+		return
+
+# -----------------------------------------------------------------------------
+# A snapshot, one line per metric
+def describe(snap):
+	lines = [f"{snap['program']} (pid {snap['pid']}), "+
+		time.strftime('%Y-%m-%d %H:%M:%S',time.gmtime(snap['time']))+
+		f" UTC, up {snap['uptime']:0.0f} s"]
+	for (k,v) in sorted(snap['counters'].items()):
+		lines.append(f"  {k}: {v}")
+	for (k,v) in sorted(snap['gauges'].items()):
+		lines.append(f"  {k}: {v:g}")
+	for (k,h) in sorted(snap['histograms'].items()):
+		s = f"  {k}: {h['count']}"
+		if h['count'] > 0:
+			s += (f", mean {h['sum']/h['count']*1000:0.1f} ms, p50 <= "+
+				f"{h['p50']*1000:0.1f} ms, p90 <= {h['p90']*1000:0.1f} ms, p99 <= "+
+				f"{h['p99']*1000:0.1f} ms, max {h['max']*1000:0.1f} ms")
+		lines.append(s)
+	return(lines)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print(f"Usage: {os.path.basename(__file__)} snapshot_file ...")
+		sys.exit(1)
+	for flnm in sys.argv[1:]:
+		try:
+			with open(flnm,'r') as f:
+				snap = json.load(f)
+		except (OSError,ValueError) as e:
+			print(f"{flnm}: {e}")
+			continue
+		print('\n'.join(describe(snap)))
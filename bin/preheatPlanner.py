@@ -0,0 +1,449 @@
+#!/usr/bin/python3
+# preheatPlanner.py
+
+# Preheat times learned from the data files temphumlog.py writes, instead of
+# the fixed ones in datetime.conf (set by season and the hour of the class).
+#
+# Every time the room was heated for a class (a heating episode: the setpoint
+# goes up well above the room temperature) the data files show the
+# temperature at the start, the class setpoint (the first setpoint held for
+# HOLD minutes) and how long the room took to get within TOLERANCE of it.
+# The minutes are fitted on the temperature gap (setpoint - start):
+#
+#   minutes = a + b*gap
+#
+# with the recent days weighted more (half life 'halflife' days), so the
+# season (the outside temperature, how the heaters do) follows by itself. The
+# lead time for a class is then a + b*(setpoint - expected start temperature)
+# + margin, where the expected start temperature is that of the recent
+# episodes that started around the same hour.
+#
+# The data files are summarised per day in a rollup (kept in the 'rollup'
+# file): the episodes and the sums the fit needs, per hour the episode
+# started. Only the days whose data file changed (today) are read again, so a
+# new plan costs milliseconds. An episode over (UTC) midnight is lost, it is
+# in two files.
+#
+# checkSchedule.py uses it when 'adaptive' is set in the [preheat] section of
+# classSchedule.conf; a class without enough episodes (MIN_EPISODES) keeps the
+# preheat time of datetime.conf. PreheatPlanner(None) does nothing.
+#
+#   preheatPlanner.py        shows the lead time for every class, learned and
+#                            from datetime.conf
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The days are also read when archiver.py compressed them (see
+#    dataFiles.py).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling (-p / --profile, see profiling.py): the dumps are written
+#    when the program ends, or at SIGUSR1.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import math
+import argparse
+import configparser
+import classSchedule
+import dataFiles
+import profiling
+
+script = os.path.basename(__file__)
+VERSION = "0.3"
+AUTHORS = "Louis Marais"
+
+DEBUG = False
+
+RISE = 3.0          # degC the setpoint must be above the room to start heating
+HOLD = 40           # minutes the class setpoint is held (the preheat steps are
+                    # shorter)
+TOLERANCE = 0.5     # degC below the setpoint that counts as there
+MAX_LEAD = 360      # minutes, as in datetime.conf
+MIN_LEAD = 30
+MAX_GAP = 300       # seconds without data that ends an episode
+MIN_EPISODES = 3    # episodes needed before a learned lead time is used
+ROUND = 5           # lead times are rounded up to this many minutes
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def debug(msg):
+	if DEBUG:
+		print(ts(),msg)
+	return
+
+# -----------------------------------------------------------------------------
+def errorExit(s):
+	print(f'ERROR: {s}')
+	sys.exit(1)
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+# Rows of a day: (seconds since the epoch, temperature, setpoint, boost)
+def readDay(datapath,mjd):
+	rows = []
+	day = (mjd - 40587)*86400
+	f = dataFiles.openDay(datapath,mjd)
+	if f is None:
+		return(rows)
+	with f:
+		for line in f:
+			if line.startswith('#'):
+				continue
+			d = line.split()
+			if len(d) < 11:
+				continue
+			try:
+				hms = d[0].split(':')
+				rows.append((day + int(hms[0])*3600 + int(hms[1])*60 + int(hms[2]),
+					float(d[1]),float(d[4]),d[10] == 'ON'))
+			except (ValueError,IndexError):
+				continue
+		f.close()
+	return(rows)
+
+# -----------------------------------------------------------------------------
+# The heating episodes in the rows of a day: [start (seconds since the epoch),
+# start temperature, class setpoint, minutes to reach it, boost minutes]
+def findEpisodes(rows):
+	episodes = []
+	i = 1
+	while i < len(rows):
+		(t,temp,tset,b) = rows[i]
+		if not (tset - rows[i-1][2] >= 2.0 and tset - temp >= RISE):
+			i += 1
+			continue
+		# Heating starts here. The class setpoint is the first one held for HOLD
+		# minutes.
+		start = i
+		target = None
+		since = i
+		j = i + 1
+		while j < len(rows) and rows[j][0] - rows[j-1][0] <= MAX_GAP:
+			if rows[j][2] != rows[since][2]:
+				if rows[j][0] - rows[since][0] >= HOLD*60 and rows[since][2] > temp:
+					target = rows[since][2]
+					break
+				if rows[j][2] < rows[since][2] - RISE:
+					break  # switched off before the class
+				since = j
+			if rows[j][0] - t > MAX_LEAD*60*2:
+				break
+			j += 1
+		if target is None and j < len(rows) and rows[j][0] - rows[since][0] >= HOLD*60:
+			target = rows[since][2]
+		if target is None:
+			i = j
+			continue
+		# How long it took to get there
+		boost = 0
+		reached = None
+		k = start
+		while k < len(rows) and (k == start or rows[k][0] - rows[k-1][0] <= MAX_GAP):
+			if rows[k][3]:
+				boost += 1
+			if rows[k][1] >= target - TOLERANCE:
+				reached = k
+				break
+			if rows[k][2] < target - RISE:
+				break
+			k += 1
+		if reached is not None:
+			episodes.append([t,temp,target,(rows[reached][0] - t)/60.0,boost])
+		i = max(k,i + 1)
+	return(episodes)
+
+# -----------------------------------------------------------------------------
+# What the fit needs from a day, per local hour the episodes started:
+# [n, sum gap, sum minutes, sum gap^2, sum gap*minutes, sum start temperature]
+def daySums(episodes):
+	sums = {}
+	for (t,temp,target,minutes,boost) in episodes:
+		hr = time.localtime(t).tm_hour
+		gap = target - temp
+		s = sums.setdefault(str(hr),[0,0.0,0.0,0.0,0.0,0.0])
+		s[0] += 1
+		s[1] += gap
+		s[2] += minutes
+		s[3] += gap*gap
+		s[4] += gap*minutes
+		s[5] += temp
+	return(sums)
+
+# -----------------------------------------------------------------------------
+class PreheatPlanner:
+
+	def __init__(self,datapath,rollupfile=None,days=28,halflife=7.0,margin=10):
+		self.datapath = datapath
+		self.enabled = datapath is not None
+		self.rollupfile = rollupfile
+		self.days = days
+		self.halflife = halflife
+		self.margin = margin
+		self.rollup = {}    # MJD (str) -> {'mtime','size','episodes','sums'}
+		self.read = 0       # data files read by the last update
+		if self.enabled and rollupfile is not None and os.path.isfile(rollupfile):
+			try:
+				with open(rollupfile,'r') as f:
+					self.rollup = json.load(f)
+					f.close()
+			except (OSError,ValueError) as e:
+				print(ts(),f"Preheat rollup {rollupfile} not read: {e}")
+				self.rollup = {}
+		return
+
+	# Reads the data files that changed since the last time
+	def update(self,today=None):
+		if not self.enabled:
+			return
+		if today is None:
+			today = int(time.time()/86400) + 40587
+		changed = False
+		self.read = 0
+		keep = {}
+		for mjd in range(today - self.days + 1,today + 1):
+			# Also when it was archived (a new file, it is read once more)
+			where = dataFiles.findDay(self.datapath,mjd)
+			if where is None:
+				continue
+			st = os.stat(where[0])
+			old = self.rollup.get(str(mjd))
+			if old is not None and old['mtime'] == st.st_mtime and \
+				old['size'] == st.st_size:
+				keep[str(mjd)] = old
+				continue
+			episodes = findEpisodes(readDay(self.datapath,mjd))
+			keep[str(mjd)] = {'mtime': st.st_mtime,'size': st.st_size,
+				'episodes': episodes,'sums': daySums(episodes)}
+			self.read += 1
+			changed = True
+		if len(keep) != len(self.rollup):
+			changed = True
+		self.rollup = keep
+		if changed and self.rollupfile is not None:
+			try:
+				with open(self.rollupfile+'.new','w') as f:
+					json.dump(self.rollup,f)
+					f.close()
+				os.replace(self.rollupfile+'.new',self.rollupfile)
+			except OSError as e:
+				print(ts(),f"Preheat rollup {self.rollupfile} not written: {e}")
+		debug(f"Preheat rollup: {len(self.rollup)} days, {self.read} read again")
+		return
+
+	# The weighted sums over the days, for all hours or only the hours in 'hours'
+	def sums(self,today,hours=None):
+		tot = [0.0]*6
+		for (mjd,day) in self.rollup.items():
+			w = 0.5**((today - int(mjd))/self.halflife)
+			for (hr,s) in day['sums'].items():
+				if hours is not None and not int(hr) in hours:
+					continue
+				for i in range(0,6):
+					tot[i] += w*s[i]
+		return(tot)
+
+	# minutes = a + b*gap, and the number of episodes it is fitted on
+	def fit(self,today):
+		(n,sx,sy,sxx,sxy,st) = self.sums(today)
+		episodes = sum([s[0] for day in self.rollup.values()
+			for s in day['sums'].values()])
+		if n <= 0:
+			return(None,None,0)
+		var = sxx/n - (sx/n)**2
+		if episodes < 2*MIN_EPISODES or var < 0.25:
+			# All about the same gap: a rate only
+			if sx <= 0:
+				return(None,None,episodes)
+			return(0.0,sy/sx,episodes)
+		b = (sxy/n - (sx/n)*(sy/n))/var
+		a = sy/n - b*sx/n
+		return(a,b,episodes)
+
+	# Lead times (minutes) for the classes of 'schedule': {(DAY, 'HH:MM'):
+	# minutes}. 'static' gives the preheat time of datetime.conf for a class,
+	# used to find the hour the heating starts.
+	def leads(self,schedule,startTimes,preheatTimes,today=None):
+		if not self.enabled:
+			return({})
+		if today is None:
+			today = int(time.time()/86400) + 40587
+		self.update(today)
+		(a,b,episodes) = self.fit(today)
+		if a is None or episodes < MIN_EPISODES:
+			debug(f"Preheat planner: {episodes} episodes, not enough to plan")
+			return({})
+		allSums = self.sums(today)
+		plan = {}
+		for c in schedule:
+			(hr,mn) = classSchedule.gettime(c[1])
+			static = staticLead(hr,startTimes,preheatTimes)
+			startHr = ((hr*60 + mn - static)//60) % 24
+			s = self.sums(today,[(startHr + d) % 24 for d in [-1,0,1]])
+			tstart = s[5]/s[0] if s[0] > 0 else allSums[5]/allSums[0]
+			lead = a + b*max(c[2] - tstart,0.0) + self.margin
+			lead = int(math.ceil(lead/ROUND)*ROUND)
+			plan[(c[0],c[1])] = min(max(lead,MIN_LEAD),MAX_LEAD)
+		return(plan)
+
+	def describe(self):
+		n = sum([len(d['episodes']) for d in self.rollup.values()])
+		return(f"{len(self.rollup)} days, {n} heating episodes, {self.read} data "+
+			"files read")
+
+# -----------------------------------------------------------------------------
+# The preheat time createClass (classSchedule.py) uses for a class at 'hr'
+def staticLead(hr,startTimes,preheatTimes):
+	for i in range(0,len(startTimes)):
+		if hr < startTimes[i]:
+			return(preheatTimes[i])
+	return(preheatTimes[-1])
+
+# -----------------------------------------------------------------------------
+# PreheatPlanner from the [preheat] section of classSchedule.conf, disabled
+# without it
+def fromConfig(conf,home):
+	if not conf.has_section('preheat') or \
+		not conf['preheat'].getboolean('adaptive',fallback=False):
+		return(PreheatPlanner(None))
+	datapath = makeFilename(home,conf['preheat'].get('data','data'))
+	rollupfile = makeFilename(home,conf['preheat'].get('rollup',
+		'cache/preheat.rollup'))
+	os.makedirs(os.path.dirname(rollupfile),exist_ok=True)
+	return(PreheatPlanner(datapath,rollupfile,
+		conf['preheat'].getint('days',fallback=28),
+		conf['preheat'].getfloat('half life',fallback=7.0),
+		conf['preheat'].getint('margin',fallback=10)))
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+def main(argv=None):
+	global DEBUG
+
+	parser = argparse.ArgumentParser(description="Shows the preheat times "+
+																	 "learned from the data files.")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/classSchedule.conf.")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when it "+
+											"ends or SIGUSR1 is received (see profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	prof = profiling.fromArgs(args,HOME,script)
+	try:
+		configfile = makeFilename(HOME,"etc/classSchedule.conf")
+		if args.config:
+			configfile = makeFilename(HOME,args.config[0])
+		if not os.path.isfile(configfile):
+			errorExit(f"{configfile} does not exist.")
+		conf = configparser.ConfigParser()
+		conf.read(configfile)
+
+		# Shown also when it is not switched on in the configuration
+		if not conf.has_section('preheat'):
+			conf['preheat'] = {}
+		conf['preheat']['adaptive'] = 'yes'
+		planner = fromConfig(conf,HOME)
+
+		schedule = classSchedule.loadSchedule(makeFilename(HOME,
+			conf['schedule']['file']))
+		dtflnm = makeFilename(HOME,conf['main']['datetime settings'])
+		phases = classSchedule.readDateTimeConf(dtflnm)
+		(startTimes,preheatTimes) = classSchedule.selectDateTimeSettings(phases,
+			classSchedule.getCurrentDate(),dtflnm)
+
+		startT = time.perf_counter()
+		plan = planner.leads(schedule,startTimes,preheatTimes)
+		dt = time.perf_counter() - startT
+		print(f"Planned in {dt*1000:0.1f} ms: {planner.describe()}")
+		startT = time.perf_counter()
+		plan = planner.leads(schedule,startTimes,preheatTimes)
+		dt = time.perf_counter() - startT
+		print(f"Planned again in {dt*1000:0.1f} ms: {planner.describe()}")
+		(a,b,episodes) = planner.fit(int(time.time()/86400) + 40587)
+		if a is not None:
+			print(f"Minutes to the setpoint = {a:0.1f} + {b:0.2f} * (setpoint - start "+
+				f"temperature), fitted on {episodes} episodes; margin {planner.margin} min")
+		print(f"  {'class':18s} {'datetime.conf':>13s} {'learned':>8s}")
+		for c in schedule:
+			(hr,mn) = classSchedule.gettime(c[1])
+			s = f"  {c[0]:9s} {c[1]:8s} {staticLead(hr,startTimes,preheatTimes):13d}"
+			if (c[0],c[1]) in plan:
+				s += f" {plan[(c[0],c[1])]:8d}"
+			else:
+				s += f" {'-':>8s}"
+			print(s)
+	finally:
+		prof.close()
+	return
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,253 @@
+#!/usr/bin/python3
+# profiling.py
+
+# Profiling of a program that is running, without restarting it (the daemons
+# run for weeks, and a restart loses the serial port lock and the state of
+# the controller). Started with --profile DIR and switched off and on again
+# with SIGUSR1:
+#
+#   kill -USR1 <pid>     stops the profiling and writes the dumps; the next
+#                        SIGUSR1 starts it again
+#
+# While profiling a thread samples the stacks of all the other threads
+# (sys._current_frames) every 'interval' seconds, and tracemalloc follows the
+# memory the program allocates. cProfile is not used: it only sees the thread
+# that starts it, and supervisor.py runs the programs in threads. The samples
+# are wall clock time, so a thread that waits (select, sleep) is counted
+# where it waits; the CPU time the process used is in the summary.
+#
+# When the profiling stops (also when the program ends) three files are
+# written to DIR, named <program>-<YYYYMMDD-HHMMSS>:
+#
+#   .txt          the top 'top' functions (samples in the function itself,
+#                 and in the function or what it calls), the top lines
+#                 allocating memory and what grew since the start
+#   .folded       every stack sampled with its count (one line each, the
+#                 input of flamegraph.pl)
+#   .tracemalloc  the tracemalloc snapshot (tracemalloc.Snapshot.load)
+#
+# Profiler(None) does nothing.
+#
+# The daemons (temphumlog.py, sgp30log.py, upload.py, checkSchedule.py,
+# supervisor.py) and the monitor scripts (createTempHum.py, showTempHum.py)
+# set it up themselves. The command line tools (classSchedule.py,
+# preheatPlanner.py, roomModel.py, storage.py, archiver.py) use fromArgs():
+# they are profiled from the start, and the dumps are written when they end
+# (or at SIGUSR1). gui/UpdateClasses.py (the Tk schedule editor, not in bin
+# or monitor) has no --profile.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. fromArgs() sets the profiling up for the -p / --profile option of the
+#    command line tools.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import signal
+import threading
+import tracemalloc
+import collections
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def where(code,line):
+	return(f"{os.path.basename(code.co_filename)}:{line} {code.co_name}")
+
+# -----------------------------------------------------------------------------
+class Profiler:
+
+	def __init__(self,directory,program,interval=0.01,top=25,frames=10):
+		self.directory = directory
+		self.enabled = directory is not None
+		self.program = os.path.splitext(program)[0]
+		self.interval = interval  # seconds between samples
+		self.top = top            # lines in each summary
+		self.frames = frames      # frames tracemalloc keeps per allocation
+		self.thread = None
+		self.stopping = threading.Event()
+		self.lock = threading.Lock()
+		self.dumps = []           # files written
+		if self.enabled and not os.path.isdir(directory):
+			os.makedirs(directory,exist_ok=True)
+		return
+
+	# Sampling (and not just writing the dumps of the last run)
+	def sampling(self):
+		return(self.thread is not None and self.thread.is_alive() and
+			not self.stopping.is_set())
+
+	def start(self):
+		with self.lock:
+			if not self.enabled or self.sampling():
+				return
+			# A new run starts once the previous one wrote its dumps
+			if self.thread is not None:
+				self.thread.join()
+			self.stopping.clear()
+			self.thread = threading.Thread(target=self.run,name='profiler',
+				daemon=True)
+			self.thread.start()
+		return
+
+	# The dumps are written by the profiler thread
+	def stop(self):
+		self.stopping.set()
+		return
+
+	def toggle(self):
+		if self.sampling():
+			print(ts(),f"Profiling stopped, writing the dumps to {self.directory}")
+			self.stop()
+		else:
+			print(ts(),"Profiling started")
+			self.start()
+		return
+
+	# For signal.signal(signal.SIGUSR1,prof.handler)
+	def handler(self,signum,frame):
+		self.toggle()
+		return
+
+	# Stops the profiling (if it runs) and waits for the dumps
+	def close(self,timeout=30.0):
+		t = self.thread
+		if t is not None and t.is_alive():
+			self.stop()
+			t.join(timeout)
+		return
+
+	def run(self):
+		startT = time.time()
+		startCPU = time.process_time()
+		traced = tracemalloc.is_tracing()
+		if not traced:
+			tracemalloc.start(self.frames)
+		before = tracemalloc.take_snapshot()
+		me = threading.get_ident()
+		samples = 0
+		own = collections.Counter()      # samples in the function itself
+		total = collections.Counter()    # samples in it or what it calls
+		stacks = collections.Counter()
+		perThread = collections.Counter()
+		while not self.stopping.wait(self.interval):
+			names = {t.ident: t.name for t in threading.enumerate()}
+			for (tid,frame) in sys._current_frames().items():
+				if tid == me:
+					continue
+				samples += 1
+				perThread[names.get(tid,str(tid))] += 1
+				own[where(frame.f_code,frame.f_lineno)] += 1
+				stack = []
+				seen = set()
+				while frame is not None:
+					code = frame.f_code
+					stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+					key = where(code,code.co_firstlineno)
+					if not key in seen:
+						seen.add(key)
+						total[key] += 1
+					frame = frame.f_back
+				stacks[';'.join(reversed(stack))] += 1
+		after = tracemalloc.take_snapshot()
+		(current,peak) = tracemalloc.get_traced_memory()
+		if not traced:
+			tracemalloc.stop()
+		self.dump(startT,time.time(),time.process_time() - startCPU,samples,own,
+			total,stacks,perThread,before,after,current,peak)
+		return
+
+	def dump(self,startT,endT,cpu,samples,own,total,stacks,perThread,before,after,
+		current,peak):
+		name = os.path.join(self.directory,self.program+'-'+
+			time.strftime('%Y%m%d-%H%M%S',time.gmtime(endT)))
+		# Not the allocations of the profiling itself
+		ignore = [tracemalloc.Filter(False,tracemalloc.__file__),
+			tracemalloc.Filter(False,__file__)]
+		before = before.filter_traces(ignore)
+		after = after.filter_traces(ignore)
+		lines = [f"{self.program} (pid {os.getpid()}) profiled from "+
+			time.strftime('%Y-%m-%d %H:%M:%S',time.gmtime(startT))+" to "+
+			time.strftime('%Y-%m-%d %H:%M:%S',time.gmtime(endT))+" UTC",
+			f"{endT - startT:0.1f} s, CPU time used {cpu:0.2f} s "+
+			f"({cpu/max(endT - startT,1e-6)*100:0.1f} %), {samples} samples every "+
+			f"{self.interval*1000:0.0f} ms",
+			f"Memory traced: {current/1024:0.1f} KiB now, peak {peak/1024:0.1f} KiB",
+			"","Samples per thread:"]
+		for (k,n) in perThread.most_common():
+			lines.append(f"  {n:8d} {k}")
+		lines += ["",f"Top {self.top} lines (samples in the function itself):"]
+		for (k,n) in own.most_common(self.top):
+			lines.append(f"  {n:8d} {n/max(samples,1)*100:5.1f} % {k}")
+		lines += ["",f"Top {self.top} functions (samples in the function and "+
+			"what it calls):"]
+		for (k,n) in total.most_common(self.top):
+			lines.append(f"  {n:8d} {n/max(samples,1)*100:5.1f} % {k}")
+		lines += ["",f"Top {self.top} lines allocating memory:"]
+		for s in after.statistics('lineno')[:self.top]:
+			lines.append(f"  {s.size/1024:10.1f} KiB {s.count:8d} blocks "+
+				f"{s.traceback[0]}")
+		lines += ["",f"Top {self.top} changes since the profiling started:"]
+		for s in after.compare_to(before,'lineno')[:self.top]:
+			lines.append(f"  {s.size_diff/1024:+10.1f} KiB {s.count_diff:+8d} blocks "+
+				f"{s.traceback[0]}")
+		try:
+			with open(name+'.txt','w') as f:
+				f.write('\n'.join(lines)+'\n')
+			with open(name+'.folded','w') as f:
+				for (k,n) in stacks.most_common():
+					f.write(f"{k} {n}\n")
+			after.dump(name+'.tracemalloc')
+			self.dumps.append(name+'.txt')
+			print(ts(),f"Profile written to {name}.txt")
+		except OSError as e:
+			print(ts(),f"Could not write the profile {name}: {e}")
+		return
+
+# -----------------------------------------------------------------------------
+# The profiler for the -p / --profile option of a program ('args' from
+# argparse), started, and switched off and on with SIGUSR1 (from the main
+# thread only, a signal handler can not be set in another). Profiler(None)
+# without the option.
+def fromArgs(args,home,program):
+	if not args.profile:
+		return(Profiler(None,program))
+	directory = args.profile[0]
+	if not directory.startswith('/'):
+		directory = home + directory
+	prof = Profiler(directory,program)
+	if threading.current_thread() is threading.main_thread():
+		signal.signal(signal.SIGUSR1,prof.handler)
+	prof.start()
+	return(prof)
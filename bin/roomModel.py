@@ -0,0 +1,551 @@
+#!/usr/bin/python3
+# roomModel.py
+
+# A thermal model of the hot room, fitted from the data files temphumlog.py
+# writes, to try preheat times (datetime.conf) without waiting for the room.
+#
+# Every minute the room loses heat to the outside and moisture to the air
+# around it, and the heater, booster, humidifier and vent add (or take) a
+# fixed amount:
+#
+#   T' = T + loss*(outside - T) + heat*heater + boost*booster - vent*vent
+#   H' = H + hloss*(ambient - H) + humid*humidifier - hvent*vent
+#
+# The parameters are fitted (least squares) on consecutive minutes in the
+# data files. Whether the heater, humidifier and vent were on is taken from
+# the mode columns when they say so (ON / OFF, HEAT / IDLE); when they do
+# not (AUTO) the heater is taken to be on while the room is below the
+# setpoint, like the controller does. 'outside' is the average over the
+# days fitted, so fit recent days for the season.
+#
+# The tuning simulates the week of settings that classSchedule.py makes from
+# the class schedule for every candidate preheat table of a phase, with the
+# booster of temphumlog.py (checkBoost), all the candidates at once (NumPy,
+# one array element per candidate). The vent is left off. Each table gets a
+# score:
+#
+#   late      minutes the classes wait for the room to come within TOLERANCE
+#             of the setpoint (up to the end of the class)
+#   heater    minutes the heater and booster are on in the week
+#   score     late*weight + heater, smaller is better
+#
+#   roomModel.py --fit                  fit the model on the last 28 days and
+#                                       save it (~/etc/room.model)
+#   roomModel.py --tune                 score preheat tables for today's phase
+#   roomModel.py --tune --phase 30May --range 120:300:15
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. --fit reads the data from the database (see storage.py) when it is
+#    enabled in the [storage] section of temphum.conf, instead of the data
+#    files.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The days are also read when archiver.py compressed them (see
+#    dataFiles.py).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.4
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling (-p / --profile, see profiling.py): the dumps are written
+#    when the program ends, or at SIGUSR1.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import argparse
+import configparser
+import itertools
+import numpy as np
+import classSchedule
+import storage
+import dataFiles
+import profiling
+
+script = os.path.basename(__file__)
+VERSION = "0.4"
+AUTHORS = "Louis Marais"
+
+DEBUG = False
+
+WEEK = classSchedule.WEEK
+CLASS_LENGTH = 95    # minutes, the settings switch off 95 minutes after the start
+TOLERANCE = 0.5      # degC below the setpoint that counts as there
+CHUNK = 512          # candidates simulated together
+
+# Mode column values that say whether something was on
+ON_MODES = ['ON','HEAT','HEATING','HUMIDIFY','HUMIDIFYING']
+OFF_MODES = ['OFF','IDLE']
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def debug(msg):
+	if DEBUG:
+		print(ts(),msg)
+	return
+
+# -----------------------------------------------------------------------------
+def errorExit(s):
+	print(f'ERROR: {s}')
+	sys.exit(1)
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+class RoomModel:
+
+	PARAMETERS = ['loss','outside','heat','boost','vent','hloss','ambient',
+		'humid','hvent']
+
+	def __init__(self,loss=1/240,outside=15.0,heat=0.12,boost=0.10,vent=0.0,
+		hloss=1/60,ambient=40.0,humid=0.5,hvent=0.0):
+		self.loss = loss        # per minute
+		self.outside = outside  # degC
+		self.heat = heat        # degC per minute
+		self.boost = boost
+		self.vent = vent
+		self.hloss = hloss      # per minute
+		self.ambient = ambient  # %RH
+		self.humid = humid      # %RH per minute
+		self.hvent = hvent
+		self.fitted = {}        # how the fit went (days, minutes, rms)
+		return
+
+	# One minute; works on numbers and on arrays (one element per candidate)
+	def step(self,T,H,heater,booster,humidifier,vent=0):
+		T = T + self.loss*(self.outside - T) + self.heat*heater + \
+			self.boost*booster - self.vent*vent
+		H = H + self.hloss*(self.ambient - H) + self.humid*humidifier - \
+			self.hvent*vent
+		return(T,H)
+
+	def save(self,flnm):
+		d = {k: getattr(self,k) for k in self.PARAMETERS}
+		d['fitted'] = self.fitted
+		with open(flnm+'.new','w') as f:
+			json.dump(d,f,indent=1)
+			f.close()
+		os.replace(flnm+'.new',flnm)
+		return
+
+	def describe(self):
+		lines = [f"  temperature: loss {self.loss*60:0.3f} /h to {self.outside:0.1f} "+
+			f"degC, heater {self.heat*60:+0.2f} degC/h, booster {self.boost*60:+0.2f} "+
+			f"degC/h, vent {-self.vent*60:+0.2f} degC/h",
+			f"  humidity:    loss {self.hloss*60:0.3f} /h to {self.ambient:0.1f} %RH, "+
+			f"humidifier {self.humid*60:+0.2f} %RH/h, vent {-self.hvent*60:+0.2f} %RH/h"]
+		if len(self.fitted) > 0:
+			lines.append(f"  fitted on {self.fitted['minutes']} minutes in "+
+				f"{self.fitted['days']} days, rms {self.fitted['rms']:0.3f} degC, "+
+				f"{self.fitted['hrms']:0.3f} %RH per minute")
+		return(lines)
+
+# -----------------------------------------------------------------------------
+def loadModel(flnm):
+	with open(flnm,'r') as f:
+		d = json.load(f)
+		f.close()
+	m = RoomModel(**{k: d[k] for k in RoomModel.PARAMETERS if k in d})
+	m.fitted = d.get('fitted',{})
+	return(m)
+
+# -----------------------------------------------------------------------------
+# The data files of days firstMJD to lastMJD (temphumlog.py), in arrays:
+# 't' (seconds since the epoch), 'temp', 'hum', 'tset', 'hset' and the modes
+# as strings ('tmode', 'hmode', 'vmode', 'bmode').
+def readData(datapath,firstMJD,lastMJD):
+	rows = []
+	days = 0
+	for mjd in range(firstMJD,lastMJD+1):
+		f = dataFiles.openDay(datapath,mjd)
+		if f is None:
+			continue
+		days += 1
+		day = (mjd - 40587)*86400
+		with f:
+			for line in f:
+				if line.startswith('#'):
+					continue
+				d = line.split()
+				if len(d) < 11:
+					continue
+				try:
+					hms = d[0].split(':')
+					t = day + int(hms[0])*3600 + int(hms[1])*60 + int(hms[2])
+					rows.append((t,float(d[1]),float(d[2]),float(d[4]),float(d[5]),
+						d[7],d[8],d[9],d[10]))
+				except (ValueError,IndexError):
+					continue
+			f.close()
+	debug(f"{len(rows)} minutes read from {days} data files")
+	cols = list(zip(*rows)) if len(rows) > 0 else [[]]*9
+	data = {'t': np.array(cols[0],dtype=float),'temp': np.array(cols[1]),
+		'hum': np.array(cols[2]),'tset': np.array(cols[3]),
+		'hset': np.array(cols[4]),'tmode': np.array(cols[5],dtype=str),
+		'hmode': np.array(cols[6],dtype=str),'vmode': np.array(cols[7],dtype=str),
+		'bmode': np.array(cols[8],dtype=str),'days': days}
+	return(data)
+
+# -----------------------------------------------------------------------------
+# On (1.0) or off (0.0) from a mode column, 'fallback' where the mode does not
+# say
+def modeOn(modes,fallback):
+	known = np.isin(modes,ON_MODES+OFF_MODES)
+	return(np.where(known,np.isin(modes,ON_MODES),fallback).astype(float))
+
+# -----------------------------------------------------------------------------
+# Least squares of dy = c0 + c1*y + c2*x2 + ..., leaving out the inputs that
+# never change (they can not be fitted). Returns the coefficients (None for
+# the ones left out) and the rms of the residuals.
+def fitStep(y,dy,inputs):
+	cols = [np.ones(len(y)),y]
+	used = []
+	for x in inputs:
+		if np.ptp(x) > 0:
+			cols.append(x)
+			used.append(True)
+		else:
+			used.append(False)
+	A = np.column_stack(cols)
+	(c,res,rank,sv) = np.linalg.lstsq(A,dy,rcond=None)
+	rms = float(np.sqrt(np.mean((A @ c - dy)**2)))
+	coef = [c[0],c[1]]
+	i = 2
+	for u in used:
+		coef.append(c[i] if u else None)
+		i += u
+	return(coef,rms)
+
+# -----------------------------------------------------------------------------
+def fitModel(data,default=None):
+	m = RoomModel() if default is None else default
+	t = data['t']
+	ok = np.abs(np.diff(t) - 60.0) < 10.0   # consecutive minutes only
+	if np.count_nonzero(ok) < 60:
+		errorExit(f"Not enough data to fit the model ({np.count_nonzero(ok)} "+
+			"consecutive minutes).")
+	T = data['temp']
+	H = data['hum']
+	heater = modeOn(data['tmode'],T < data['tset'])
+	humidifier = modeOn(data['hmode'],H < data['hset'])
+	vent = modeOn(data['vmode'],0.0)
+	booster = modeOn(data['bmode'],0.0)
+	(c,rms) = fitStep(T[:-1][ok],np.diff(T)[ok],[heater[:-1][ok],
+		booster[:-1][ok],vent[:-1][ok]])
+	if c[1] < 0:
+		m.loss = -c[1]
+		m.outside = c[0]/m.loss
+	for (k,v) in zip(['heat','boost'],c[2:4]):
+		if v is not None:
+			setattr(m,k,v)
+	if c[4] is not None:
+		m.vent = -c[4]
+	(c,hrms) = fitStep(H[:-1][ok],np.diff(H)[ok],[humidifier[:-1][ok],
+		vent[:-1][ok]])
+	if c[1] < 0:
+		m.hloss = -c[1]
+		m.ambient = c[0]/m.hloss
+	if c[2] is not None:
+		m.humid = c[2]
+	if c[3] is not None:
+		m.hvent = -c[3]
+	m.fitted = {'days': data['days'],'minutes': int(np.count_nonzero(ok)),
+		'rms': rms,'hrms': hrms,'time': time.time()}
+	return(m)
+
+# -----------------------------------------------------------------------------
+# Minute of the week (Monday 00:00 is 0) -> start of the next class later that
+# day in minutes from midnight, 0 if there is none (readSchedule in
+# temphumlog.py). Also the classes: [minute of the week, temperature,
+# humidity].
+def classStarts(schedule):
+	nxt = np.zeros(WEEK,dtype=int)
+	for m in range(0,WEEK):
+		cday = classSchedule.weekdays[m // 1440]
+		tm = m % 1440
+		for c in schedule:
+			if c[0] == cday:
+				(hr,mn) = classSchedule.gettime(c[1])
+				if tm < hr*60+mn:
+					nxt[m] = hr*60+mn
+					break
+	classes = []
+	for c in schedule:
+		(hr,mn) = classSchedule.gettime(c[1])
+		classes.append([classSchedule.weekdays.index(c[0])*1440 + hr*60 + mn,
+			c[2],c[3]])
+	return(nxt,classes)
+
+# -----------------------------------------------------------------------------
+# The settings of a week for every preheat table, as setpoints per minute:
+# arrays (WEEK, candidates), so that the setpoints of one minute are together
+def weekSettings(schedule,startTimes,tables):
+	tset = np.empty((WEEK,len(tables)),dtype=np.float32)
+	hset = np.empty((WEEK,len(tables)),dtype=np.float32)
+	for i in range(0,len(tables)):
+		events = classSchedule.checkTHsettings(classSchedule.createTHsettings(
+			schedule,startTimes,list(tables[i])))
+		minutes = [e.minute for e in events] + [WEEK]
+		n = np.diff(minutes)
+		tset[:,i] = np.repeat([e.temp for e in events],n)
+		hset[:,i] = np.repeat([e.hum for e in events],n)
+	return(tset,hset)
+
+# -----------------------------------------------------------------------------
+# The week for all the candidates at once, after 'warmup' minutes of the end
+# of the week. Returns arrays with one element per candidate: minutes late
+# (total over the classes), the largest shortfall at a class start (degC),
+# the mean humidity shortfall at the class starts (%RH), heater minutes and
+# booster minutes.
+def simulateWeek(model,tset,hset,nxt,classes,warmup=1440):
+	n = tset.shape[1]
+	T = np.full(n,max(model.outside,classSchedule.OFF.temp),dtype=np.float64)
+	H = np.full(n,model.ambient,dtype=np.float64)
+	boost = np.zeros(n,dtype=bool)
+	late = np.zeros(n)
+	short = np.zeros(n)
+	hshort = np.zeros(n)
+	heaterMinutes = np.zeros(n)
+	boostMinutes = np.zeros(n)
+	# Minute of the week -> the classes on at that minute
+	atStart = {}
+	active = {}
+	for (k,c) in enumerate(classes):
+		atStart.setdefault(c[0] % WEEK,[]).append(k)
+		for m in range(c[0],c[0]+CLASS_LENGTH):
+			active.setdefault(m % WEEK,[]).append(k)
+	reached = np.zeros((n,len(classes)),dtype=bool)
+	for i in range(-warmup,WEEK):
+		m = i % WEEK
+		ts = tset[m]
+		tm = m % 1440
+		cs = nxt[m]
+		# checkBoost in temphumlog.py
+		if tm <= cs:
+			on = ((tm + 45 >= cs) & (ts - T >= 8)) | ((tm + 30 >= cs) & (ts - T >= 5)) | \
+				((tm + 15 >= cs) & (ts - T >= 2)) | ((tm + 2 >= cs) & (ts > T))
+			boost |= on
+		boost &= T < ts
+		heater = T < ts
+		humidifier = H < hset[m]
+		if i >= 0:
+			for k in atStart.get(m,[]):
+				short = np.maximum(short,classes[k][1] - T)
+				hshort += np.maximum(classes[k][2] - H,0.0)/len(classes)
+				reached[:,k] = False
+			for k in active.get(m,[]):
+				reached[:,k] |= T >= classes[k][1] - TOLERANCE
+				late += ~reached[:,k]
+			heaterMinutes += heater
+			boostMinutes += boost
+		(T,H) = model.step(T,H,heater,boost,humidifier)
+	return(late,short,hshort,heaterMinutes,boostMinutes)
+
+# -----------------------------------------------------------------------------
+# Every combination of the preheat times in 'values' for the bands of a phase
+def candidateTables(bands,values):
+	return([t for t in itertools.product(values,repeat=bands)])
+
+# -----------------------------------------------------------------------------
+def tune(model,schedule,phase,dtflnm,values,weight,top,chunk=CHUNK):
+	(startTimes,current) = classSchedule.phaseSettings(phase,dtflnm)
+	tables = [tuple(current)] + [t for t in candidateTables(len(startTimes),values)
+		if t != tuple(current)]
+	(nxt,classes) = classStarts(schedule)
+	startT = time.perf_counter()
+	results = []
+	for i in range(0,len(tables),chunk):
+		part = tables[i:i+chunk]
+		(tset,hset) = weekSettings(schedule,startTimes,part)
+		r = simulateWeek(model,tset,hset,nxt,classes)
+		results.append(np.column_stack(r))
+	results = np.vstack(results)
+	dt = time.perf_counter() - startT
+	score = results[:,0]*weight + results[:,3]
+	order = np.argsort(score,kind='stable')
+	print(f"Phase {phase[0]} {phase[1]}: start hours {startTimes}, "+
+		f"{len(tables)} preheat tables scored in {dt:0.2f} s")
+	print(f"  {'preheat (min)':24s} {'late':>6s} {'short':>6s} {'hum':>6s} "+
+		f"{'heater':>7s} {'boost':>6s} {'score':>8s}")
+	def row(i,note=''):
+		r = results[i]
+		print(f"  {', '.join([str(v) for v in tables[i]]):24s} {r[0]:6.0f} "+
+			f"{r[1]:6.2f} {r[2]:6.2f} {r[3]:7.0f} {r[4]:6.0f} {score[i]:8.0f}{note}")
+		return
+	row(0,'  (datetime.conf)')
+	for i in order[:top]:
+		row(i)
+	return(tables,results,score)
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+def main(argv=None):
+	global DEBUG
+
+	parser = argparse.ArgumentParser(description="Fit a thermal model of the "+
+																	 "room on the data files and score preheat "+
+																	 "times with it.")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/temphum.conf.")
+	parser.add_argument("-m","--model",nargs=1,default=['etc/room.model'],
+											help="The model file (default ~/etc/room.model).")
+	parser.add_argument("-f","--fit",action="store_true",help="Fit the model "+
+											"and save it.")
+	parser.add_argument("-n","--days",nargs=1,type=int,default=[28],
+											help="Days of data to fit (default 28).")
+	parser.add_argument("-t","--tune",action="store_true",help="Score preheat "+
+											"tables with the model.")
+	parser.add_argument("--phase",nargs=1,help="Section of datetime.conf to "+
+											"tune (default: today's).")
+	parser.add_argument("-r","--range",nargs=1,default=['90:300:15'],
+											help="Preheat times to try for each start time, "+
+											"FIRST:LAST:STEP minutes (default 90:300:15).")
+	parser.add_argument("-w","--weight",nargs=1,type=float,default=[60.0],
+											help="Heater minutes a minute late costs (default 60).")
+	parser.add_argument("--top",nargs=1,type=int,default=[10],
+											help="Tables to show (default 10).")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when it "+
+											"ends or SIGUSR1 is received (see profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	prof = profiling.fromArgs(args,HOME,script)
+	try:
+		configfile = makeFilename(HOME,"etc/temphum.conf")
+		if args.config:
+			configfile = makeFilename(HOME,args.config[0])
+		if not os.path.isfile(configfile):
+			errorExit(f"{configfile} does not exist.")
+		conf = configparser.ConfigParser()
+		conf.read(configfile)
+
+		modelfile = makeFilename(HOME,args.model[0])
+		debug(f"Model file: {modelfile}")
+
+		if args.fit:
+			lastMJD = int(time.time()/86400) + 40587
+			if conf.has_section('storage') and \
+				conf['storage'].getboolean('enabled',fallback=False):
+				dbfile = makeFilename(HOME,conf['storage'].get('database','data/envlog.db'))
+				debug(f"Data from {dbfile}")
+				storage.DEBUG = DEBUG
+				data = storage.readData(storage.connect(dbfile,readonly=True),
+					lastMJD - args.days[0] + 1,lastMJD)
+			else:
+				datapath = makeFilename(HOME,conf['path']['data'])
+				data = readData(datapath,lastMJD - args.days[0] + 1,lastMJD)
+			startT = time.perf_counter()
+			model = fitModel(data)
+			debug(f"Model fitted in {(time.perf_counter() - startT)*1000:0.1f} ms")
+			model.save(modelfile)
+			print(f"Model saved in {modelfile}:")
+			print('\n'.join(model.describe()))
+
+		if args.tune:
+			if os.path.isfile(modelfile):
+				model = loadModel(modelfile)
+			else:
+				print(f"No model in {modelfile} (--fit), the default model is used")
+				model = RoomModel()
+			if DEBUG:
+				print('\n'.join(model.describe()))
+			schconf = configparser.ConfigParser()
+			schconf.read(makeFilename(HOME,conf['main']['schedule config']))
+			schflnm = makeFilename(HOME,schconf['schedule']['file'])
+			dtflnm = makeFilename(HOME,schconf['main']['datetime settings'])
+			schedule = classSchedule.loadSchedule(schflnm)
+			phases = classSchedule.readDateTimeConf(dtflnm)
+			if args.phase:
+				names = [f"{p[0]}{p[1]}" for p in phases]
+				if not args.phase[0] in names:
+					errorExit(f"No phase {args.phase[0]} in {dtflnm} ({', '.join(names)})")
+				phase = phases[names.index(args.phase[0])]
+			else:
+				phase = phases[classSchedule.findPhase(phases,
+					classSchedule.getCurrentDate())]
+			try:
+				(first,last,step) = [int(v) for v in args.range[0].split(':')]
+			except ValueError:
+				errorExit(f"Invalid range: {args.range[0]}")
+			tune(model,schedule,phase,dtflnm,list(range(first,last+1,step)),
+				args.weight[0],args.top[0])
+
+		if not args.fit and not args.tune:
+			print("Nothing to do: --fit and / or --tune")
+	finally:
+		prof.close()
+	return
+
+if __name__ == "__main__":
+	main()
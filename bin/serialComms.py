@@ -0,0 +1,384 @@
+#!/usr/bin/python3
+# serialComms.py
+
+# Routines shared by the programs that talk to the Arduinos over a serial
+# port (temphumlog.py and sgp30log.py).
+#
+# LineReader collects whatever is waiting on the port in one read and splits
+# it into lines, instead of reading one byte at a time.
+#
+# SerialTransport keeps a port open: when the device goes away (a read or
+# write fails, or nothing arrives for 'silence' seconds) the port is closed
+# and opened again, waiting longer after every failed try (backoff). After
+# every (re)open the handshake, if there is one, is done again. The program
+# keeps the UUCP lock on the port all the time. How long no data arrived
+# (the gap) is logged when data arrives again.
+#
+# SerialTransport.read() never waits longer than the timeout of the port,
+# also while the device is gone, so the program can still check if it has to
+# stop (and update its heartbeat).
+#
+# Capture writes everything a SerialTransport receives and sends, with the
+# time (monotonic, seconds since the capture started), to a binary file, so
+# that what happened on site can be replayed off site (bench/replayCapture.py).
+# The file starts with CAPTURE_MAGIC, then records of RECORD (kind, time,
+# length) followed by 'length' bytes:
+#
+#   H   header: JSON with the program and the wall clock time of the start
+#   O   the port was opened (the port)
+#   L   the port was closed, the device was lost (the reason)
+#   R   bytes received
+#   W   bytes written
+#
+# When the file reaches maxSize bytes it is renamed to <file>.1 (the one
+# before is lost) and a new one is started. readCapture() reads a capture.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Added SerialTransport: reconnects with backoff, handshake after every
+#    reconnect, logs the gaps in the data.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Capture of the serial traffic (Capture, readCapture), for replays.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import time
+import struct
+import serial
+
+# All control characters except the line feed, removed from received lines
+# (the Arduinos end lines with \r\n).
+CONTROL = bytes([c for c in range(0,32) if not c == 10])
+
+# If this many bytes arrive without a line feed it is garbage, throw it away.
+MAX_LINE = 4096
+
+CAPTURE_MAGIC = b'S2YCAP1\n'
+RECORD = struct.Struct('<cdH')  # kind, time, length
+CAPTURE_MAX = 64*1024*1024      # bytes
+
+# -----------------------------------------------------------------------------
+class LineReader:
+
+	def __init__(self):
+		self.buf = bytearray()
+		self.dropped = 0  # bytes thrown away because no line feed came
+		self.tap = None   # called with every chunk of bytes read (Capture)
+
+	# Add received bytes, return the complete lines (without control
+	# characters, decoded) in the order they were received.
+	def feed(self,data):
+		if not data:
+			return([])
+		self.buf += data
+		if not b'\n' in data:
+			if len(self.buf) > MAX_LINE:
+				self.dropped += len(self.buf)
+				self.buf.clear()
+			return([])
+		parts = self.buf.split(b'\n')
+		self.buf = bytearray(parts.pop())
+		return([p.translate(None,CONTROL).decode('ascii','replace') for p in parts])
+
+	# Read everything that is waiting. If nothing is waiting, wait (up to the
+	# timeout of the port) for at least one byte.
+	def read(self,ser):
+		n = ser.in_waiting
+		data = ser.read(n if n > 0 else 1)
+		if self.tap is not None and data:
+			self.tap(data)
+		return(self.feed(data))
+
+	# Only read what is already waiting, never wait.
+	def readWaiting(self,ser):
+		n = ser.in_waiting
+		if n == 0:
+			return([])
+		data = ser.read(n)
+		if self.tap is not None and data:
+			self.tap(data)
+		return(self.feed(data))
+
+	def clear(self):
+		self.buf.clear()
+		return
+
+# -----------------------------------------------------------------------------
+# The records are buffered and written to the file at most 'flush' seconds
+# later, so capturing costs the serial loop a memory copy.
+class Capture:
+
+	def __init__(self,flnm,program='',maxSize=CAPTURE_MAX,flush=1.0):
+		self.flnm = flnm
+		self.program = program
+		self.maxSize = maxSize
+		self.flush = flush
+		self.f = None
+		self.startT = time.monotonic()
+		self.flushT = self.startT
+		self.size = 0
+		self.records = 0
+		self.start()
+
+	def start(self):
+		self.f = open(self.flnm,'wb')
+		self.f.write(CAPTURE_MAGIC)
+		self.size = len(CAPTURE_MAGIC)
+		self.record(b'H',json.dumps({'program': self.program,
+			'time': time.time() - (time.monotonic() - self.startT)}).encode())
+		return
+
+	def record(self,kind,data):
+		if self.f is None:
+			return
+		now = time.monotonic()
+		t = now - self.startT
+		for i in range(0,max(len(data),1),0xffff):
+			chunk = data[i:i+0xffff]
+			self.f.write(RECORD.pack(kind,t,len(chunk)))
+			self.f.write(chunk)
+			self.size += RECORD.size + len(chunk)
+			self.records += 1
+		if now - self.flushT >= self.flush:
+			self.f.flush()
+			self.flushT = now
+		if self.size >= self.maxSize:
+			self.f.close()
+			os.replace(self.flnm,self.flnm+'.1')
+			self.start()
+		return
+
+	def received(self,data):
+		self.record(b'R',data)
+		return
+
+	def sent(self,data):
+		self.record(b'W',data)
+		return
+
+	def event(self,kind,msg):
+		self.record(kind,msg.encode('utf-8','replace'))
+		return
+
+	def close(self):
+		if self.f is not None:
+			self.f.close()
+			self.f = None
+		return
+
+# -----------------------------------------------------------------------------
+# The records of a capture: (kind, time, data), kind a one letter string; the
+# data of the header is a dict. A capture cut off (the program was killed)
+# ends at the last complete record.
+def readCapture(flnm):
+	with open(flnm,'rb') as f:
+		if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+			raise ValueError(f"{flnm} is not a capture")
+		while True:
+			h = f.read(RECORD.size)
+			if len(h) < RECORD.size:
+				break
+			(kind,t,n) = RECORD.unpack(h)
+			data = f.read(n)
+			if len(data) < n:
+				break
+			kind = kind.decode('ascii')
+			if kind == 'H':
+				data = json.loads(data)
+			yield (kind,t,data)
+	return
+
+# -----------------------------------------------------------------------------
+def logMessage(msg):
+	print(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()),msg)
+	return
+
+# -----------------------------------------------------------------------------
+class SerialTransport:
+
+	# handshake(transport,lines) is called with the lines received after the
+	# port was opened until it returns something other than None (kept in
+	# 'device', e.g. the serial number of the sensor); it may write to the
+	# port. Lines are only returned by read() after the handshake. If it
+	# takes longer than handshakeTime seconds the port is opened again.
+	# capture: a Capture, None to not capture the traffic
+	def __init__(self,port,baudrate,timeout,silence,handshake=None,
+		handshakeTime=120.0,backoff=(1.0,60.0),log=logMessage,capture=None):
+		self.port = port
+		self.baudrate = baudrate
+		self.timeout = timeout        # of a read, seconds
+		self.silence = silence        # no data for this long: device is gone
+		self.handshake = handshake
+		self.handshakeTime = handshakeTime
+		(self.backoffMin,self.backoffMax) = backoff
+		self.log = log
+		self.reader = LineReader()
+		self.capture = capture
+		if capture is not None:
+			self.reader.tap = capture.received
+		self.ser = None
+		self.ready = False            # open, and the handshake was done
+		self.device = None
+		self.wait = self.backoffMin
+		self.nextTry = 0.0            # monotonic time of the next open
+		self.openedAt = 0.0
+		self.lastRx = 0.0             # monotonic time data was last received
+		self.downSince = 0.0          # start of the current gap, 0 if none
+		self.connects = 0             # times the port was opened
+		self.failures = 0             # opens that failed
+		self.gaps = []                # seconds without data, one per gap
+
+	def open(self):
+		now = time.monotonic()
+		try:
+			self.ser = serial.Serial(self.port,self.baudrate,timeout=self.timeout)
+		except (serial.SerialException,OSError,ValueError) as e:
+			self.failures += 1
+			self.nextTry = now + self.wait
+			self.log(f"{self.port}: could not open ({e}), next try in "+
+				f"{self.wait:0.1f} s")
+			self.wait = min(2*self.wait,self.backoffMax)
+			return(False)
+		self.reader.clear()
+		self.connects += 1
+		if self.capture is not None:
+			self.capture.event(b'O',self.port)
+		self.openedAt = now
+		self.lastRx = now
+		self.ready = self.handshake is None
+		self.device = None
+		return(True)
+
+	# The device is gone: close the port, open it again later
+	def lost(self,reason):
+		now = time.monotonic()
+		if self.downSince == 0.0:
+			self.downSince = self.lastRx
+		self.log(f"{self.port}: {reason}, opening it again in {self.wait:0.1f} s")
+		if self.capture is not None:
+			self.capture.event(b'L',reason)
+		self.close()
+		self.nextTry = now + self.wait
+		self.wait = min(2*self.wait,self.backoffMax)
+		return
+
+	# Data arrived while ready: the end of a gap, if there was one
+	def received(self,now):
+		self.lastRx = now
+		self.wait = self.backoffMin
+		if self.downSince > 0.0:
+			self.gaps.append(now - self.downSince)
+			self.log(f"{self.port}: data again after a gap of "+
+				f"{self.gaps[-1]:0.1f} s ({self.connects} connections, "+
+				f"{self.failures} failed)")
+			self.downSince = 0.0
+		return
+
+	# The lines received, [] if there are none (yet)
+	def read(self):
+		now = time.monotonic()
+		if self.ser is None:
+			if now < self.nextTry:
+				time.sleep(min(self.nextTry - now,self.timeout))
+				return([])
+			if not self.open():
+				return([])
+		try:
+			lines = self.reader.read(self.ser)
+		except (serial.SerialException,OSError) as e:
+			self.lost(f"read failed ({e})")
+			return([])
+		now = time.monotonic()
+		if not self.ready:
+			if len(lines) > 0:
+				self.lastRx = now
+			self.device = self.handshake(self,lines)
+			if self.device is None:
+				if now - self.openedAt > self.handshakeTime:
+					self.lost(f"no handshake in {self.handshakeTime:0.0f} s")
+				return([])
+			self.ready = True
+			self.reader.clear()
+			self.received(now)
+			return([])
+		if len(lines) > 0:
+			self.received(now)
+		elif now - self.lastRx > self.silence:
+			self.lost(f"no data for {now - self.lastRx:0.0f} s")
+		return(lines)
+
+	# Only the lines that are already waiting, never waits
+	def readWaiting(self):
+		if self.ser is None:
+			return([])
+		try:
+			return(self.reader.readWaiting(self.ser))
+		except (serial.SerialException,OSError) as e:
+			self.lost(f"read failed ({e})")
+		return([])
+
+	# Returns False if the data could not be written
+	def write(self,data):
+		if self.ser is None:
+			return(False)
+		if self.capture is not None:
+			self.capture.sent(data)
+		try:
+			self.ser.write(data)
+		except (serial.SerialException,OSError) as e:
+			self.lost(f"write failed ({e})")
+			return(False)
+		return(True)
+
+	def close(self):
+		if self.ser is not None:
+			try:
+				self.ser.close()
+			except (serial.SerialException,OSError):
+				pass
+		self.ser = None
+		self.ready = False
+		return
+
+	def stats(self):
+		s = f"{self.connects} connections, {self.failures} failed, "
+		s += f"{len(self.gaps)} gaps"
+		if len(self.gaps) > 0:
+			s += f" (longest {max(self.gaps):0.1f} s)"
+		return(s)
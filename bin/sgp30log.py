@@ -31,6 +31,163 @@
 # Initial version
 #
 # -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Serial data is read with LineReader (serialComms.py): everything that is
+#    waiting is read in one go and split into lines, instead of one byte at a
+#    time with a string that grows one character at a time.
+# 2. The regular expressions are compiled once, not for every line.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Temperature and humidity for compensation are no longer sent every 60 s.
+#    The temphum file is checked every time through the loop and the values
+#    are sent as soon as they change by more than a threshold (see the
+#    [compensation] section in sgp30.conf). They are also sent after the
+#    Arduino restarts.
+# 2. No more 23 degC / 50 %RH default values when the temphum file can not be
+#    read; the sensor keeps the last values. If the file is not updated for a
+#    while (stale) a message is printed.
+# 3. Counters for the age of the compensation values, values sent, unchanged
+#    values, stale periods and read errors (shown with debug).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.4
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The main program is in main(), with stop() to end it, so that
+#    supervisor.py can run it in a thread. Signal handlers are only set when
+#    running in the main thread.
+# 2. The UUCP lock and the lock file are always removed when the program
+#    ends, also when the serial port goes away.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.5
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Heartbeat (-b / --heartbeat, see heartbeat.py), updated every time
+#    through the main loop so supervisor.py can restart the program when it
+#    gets stuck.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.6
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The serial port is kept open by SerialTransport (serialComms.py): when
+#    no data arrives for the comms timeout, or the USB serial adapter goes
+#    away, the port is opened again (waiting longer after every failed try)
+#    and the serial number exchange is done again. The UUCP lock is kept,
+#    the gaps are logged. The program no longer ends when the sensor is not
+#    found in two minutes; it opens the port again.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.7
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Counters and timings (-m / --metrics, see metrics.py): lines parsed,
+#    parse failures, samples per minute, file writes and compensation values
+#    sent.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.8
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling while the program runs (-p / --profile, see profiling.py):
+#    SIGUSR1 stops it and writes the dumps, and starts it again.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.9
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. --capture: everything received from and sent to the serial port is
+#    written to a file (see Capture in serialComms.py), to replay it later
+#    with bench/replayCapture.py.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.10
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The eCO2 minute records and the compensation values sent to the sensor
+#    also go into the database (see storage.py) when it is enabled in the
+#    [storage] section of the configuration file, in one transaction every
+#    'commit interval' seconds.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.11
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Bug fix: the time of the temphum file was taken as sent before the
+#    compensation values were written to the sensor. When the write failed,
+#    the values were not sent again until the file changed; now they are.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.12
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Bug fix: a line that starts with digits but is not a number (bytes
+#    garbled on the serial line) stopped the program; it is now counted as a
+#    parse failure (getEco2).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.13
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The age of the compensation values and the times they were not sent
+#    (stale, unchanged, read errors) go to the metrics (--metrics) as well,
+#    not only to the debug output.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author: 
 # Start date: 
@@ -48,17 +205,29 @@ import argparse
 import configparser
 import subprocess
 import signal
-import serial
 import time
 import datetime
 import re
 import statistics
+import threading
+from serialComms import SerialTransport, Capture
+from heartbeat import Heartbeat
+from metrics import Metrics
+from profiling import Profiler
+import sqlite3
+import storage
 
 script = os.path.basename(__file__)
-VERSION = "0.1"
+VERSION = "0.13"
 AUTHORS = "Louis Marais"
 
 DEBUG = False
+metrics = Metrics(None)  # see metrics.py, set up in main()
+store = storage.Storage(None)  # the database, see storage.py, set up in main()
+
+# Lines sent by the SGP30 Arduino
+eco2Pattern = re.compile(r'([0-9]+)')  # the whole line (fullmatch)
+snPattern = re.compile(r'Found SGP30 serial #(.*)') # SGP30 serial #(\.+)')
 
 # -----------------------------------------------------------------------------
 # Sub routines
@@ -69,6 +238,13 @@ def signalHandler(signal,frame):
 	debug("User / system request for program termination.")
 	return
 
+# -----------------------------------------------------------------------------
+# Asks main() to finish; used by supervisor.py, which runs main() in a thread
+def stop():
+	global running
+	running = False
+	return
+
 # -----------------------------------------------------------------------------
 def TestProcessLock(lockFile):
 	if (os.path.isfile(lockFile)):
@@ -163,10 +339,12 @@ def savedata(datapath,eco2s,sn,statusfile):
 			f.write('#Time stamp     (ppm)\n');
 			f.close()
 	with open(flnm,"a") as f:
-		s = datetime.datetime.utcnow().strftime("%H:%M:%S")
+		now = int(time.time())
+		s = time.strftime("%H:%M:%S",time.gmtime(now))
 		s += " {:14.1f}\n".format(eco2)
 		f.write(s)
 		f.close()
+	store.eco2(now,eco2)
 	with open(statusfile,"w") as f:
 		f.write("{:0.1f}\n".format(eco2))
 		f.close()
@@ -174,224 +352,376 @@ def savedata(datapath,eco2s,sn,statusfile):
 
 # -----------------------------------------------------------------------------
 def getTempHum(flnm):
-	# Defaults
-	temp = 23
-	hum = 50
-	if os.path.isfile(flnm):
+	# Returns None, None if the file can not be read; it is better to leave the
+	# sensor with the last values it got than to send made up values.
+	try:
 		with open(flnm,'r') as f:
 			s = f.readline()
 			f.close()
-		debug("Read {} from {}".format(s.strip(),flnm))
-		d = s.split(',')
-		try:
-			tval = float(d[0].strip())
-			hval = float(d[1].strip())
-			debug("Temperature: {:0.2f} degC, Humidity: {:0.2f} %RH".
-				 format(tval,hval))
-		except:
-			return(temp,hum)
-		return(tval,hval)
-	else:
+	except OSError:
 		debug("File ({}) not found".format(flnm))
-	return(temp,hum)
+		return(None,None)
+	debug("Read {} from {}".format(s.strip(),flnm))
+	d = s.split(',')
+	try:
+		tval = float(d[0].strip())
+		hval = float(d[1].strip())
+		debug("Temperature: {:0.2f} degC, Humidity: {:0.2f} %RH".
+			 format(tval,hval))
+	except:
+		return(None,None)
+	return(tval,hval)
 
 # -----------------------------------------------------------------------------
-# Main
-# -----------------------------------------------------------------------------
-parser = argparse.ArgumentParser(description="Reads data from SGP30 "+
-																 "air quality sensor, averages and logs the "+
-																 "eCO2 readings")
-parser.add_argument("-v","--version",action="store_true",help="Show version "+
-										"and exit.")
-parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
-										"configuration file. The default is "+
-										"~/etc/sgp30.conf.")
-parser.add_argument("-d","--debug",action="store_true",help="Turn debugging on")
-
-args = parser.parse_args()
-
-if args.debug:
-	DEBUG = True
-
-versionStr = script+" version "+VERSION+" written by "+AUTHORS
-
-if args.version:
-	print(versionStr)
-	sys.exit(0)
-
-debug(versionStr)
-
-HOME = os.path.expanduser('~')
-if not(HOME.endswith('/')):
-	HOME += '/'
-
-debug("Current user's home :"+HOME)
-
-configfile = HOME+"etc/sgp30.conf"
-
-if args.config:
-	debug("Alternate config file specified: "+str(args.config[0]))
-	configfile = str(args.config[0])
-	if not configfile.startswith('/'):
-		configfile = HOME+configfile
-
-debug("Configuration file: "+configfile)
-
-if not os.path.isfile(configfile):
-	errorExit(configfile+' does not exist.')
-
-conf = configparser.ConfigParser()
-conf.read(configfile)
-
-req = ['main,lock file','main,temphum file','main,status file','comms,port',
-			 'path,data']
-
-cfg = checkConfig(conf, req)
-
-port = conf['comms']['port']
-statusfile = makeFilePath(conf['main']['status file'])
-debug("Equivalent CO2 values will be stored in {}".format(statusfile))
-
-# Create UUCP lock for the serial port
-uucpLockPath='/var/lock'
-if ('paths,uucp lock' in cfg):
-	uucpLockPath = conf['paths']['uucp lock']
-
-ret = subprocess.check_output(['/usr/local/bin/lockport','-d',uucpLockPath,
-									 '-p',str(os.getpid()),port,sys.argv[0]]).decode('utf-8')
-
-if (re.match('1',ret)==None):
-	errorExit('Could not obtain a lock on ' + port + '.')
-
-lockfile = conf['main']['lock file']
-if not lockfile.startswith('/'):
-	lockfile = HOME+lockfile
-if not CreateProcessLock(lockfile):
-	errorExit('Unable to lock - '+script+' already running?')
-
-signal.signal(signal.SIGINT,signalHandler)
-signal.signal(signal.SIGTERM,signalHandler)
-signal.signal(signal.SIGHUP,signalHandler) # not usually run with a controlling TTY, but handle it anyway
-
-datapath = makePath(conf['path']['data'])
-checkPath(datapath)
-debug("Data will be stored in {}".format(datapath))
-
-temphumfile = makeFilePath(conf['main']['temphum file'])
-debug("Current temperature / humidity can be found in {}".format(temphumfile))
-
-t_out = 10.0
-if ('comms,timeout' in cfg):
-	t_out = float(conf['comms']['timeout'])
+# Check if new temperature / humidity values must be sent to the sensor for
+# compensation. Only when the temphum file changed, is not stale, and the
+# values differ enough from what was sent last (or 'force' is set, e.g. after
+# the Arduino restarted). Returns (temp, hum) to send, or None. The time of
+# the file ('source time') is only taken as done (comp['mtime']) by the caller,
+# once the values were written to the sensor.
+def checkCompensation(flnm,comp,force):
+	now = time.time()
+	try:
+		mt = os.path.getmtime(flnm)
+	except OSError:
+		mt = 0
+	if now - mt > comp['stale limit']:
+		if not comp['is stale']:
+			print(f"{ts()} Temperature / humidity in {flnm} is stale, "+
+				"compensation not updated.")
+			comp['stale'] += 1
+			metrics.counter('compensation stale').inc()
+			comp['is stale'] = True
+		return(None)
+	if comp['is stale']:
+		debug(f"Temperature / humidity in {flnm} is being updated again.")
+		comp['is stale'] = False
+	if mt == comp['mtime'] and not force:
+		return(None)
+	(temp,hum) = getTempHum(flnm)
+	if temp is None:
+		comp['mtime'] = mt
+		comp['read errors'] += 1
+		metrics.counter('compensation read errors').inc()
+		return(None)
+	if not force and not comp['temp'] is None:
+		if (abs(temp - comp['temp']) < comp['temp threshold'] and
+			abs(hum - comp['hum']) < comp['hum threshold']):
+			comp['mtime'] = mt
+			comp['skipped'] += 1
+			metrics.counter('compensation unchanged').inc()
+			return(None)
+	comp['source time'] = mt
+	return(temp,hum)
 
-debug("Serial communications timeout is {:.1f} s.".format(t_out))
+# -----------------------------------------------------------------------------
+# The eCO2 value of a line, None if it is not one (also when the line was
+# garbled on the serial line, LineReader puts U+FFFD for bytes above 127)
+def getEco2(s):
+	if not eco2Pattern.fullmatch(s.strip()):
+		return(None)
+	return(float(s))
 
-debug('Opening '+port)
+# -----------------------------------------------------------------------------
+# Handshake (see SerialTransport): wait for the serial number of the sensor,
+# and tell the Arduino it was received. Returns the serial number, None if it
+# was not received yet.
+def findSerialNumber(transport,lines):
+	for s in lines:
+		m = snPattern.match(s)
+		if m:
+			sn = m.groups()[0]
+			debug("Serial number: {}".format(sn))
+			transport.write(bytes('OK\r\n','utf-8'))
+			time.sleep(0.5)
+			transport.write(bytes('OK\r\n','utf-8'))
+			return(sn)
+	return(None)
 
-ser = serial.Serial(port,115200,timeout = t_out);
-#
-# Opening the serial port resets the Arduino Nano, but not the Leonardo...
-# Wait for sensor to communicate; the Arduino will send:
-#
-#    SGP30 sensor
-#    Found SGP30 serial #017E3A8B
-#
-# and then start to send eCO2 values in PPM approx every second:
-#    400
-#    etc.
-#
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
 
-s = ""
-foundSN = False
-sn = ""
-startT = time.time()
-t_out = False
-running = True
-
-debug("Waiting for SGP30 device serial number...")
-
-while True:
-	while ser.in_waiting > 0:
-		c = ser.read(1)
-		if c[0] >= 32:
-			s += c.decode('utf-8')
-		if c[0] == 10:
-			p = re.compile(r'Found SGP30 serial #(.*)') # SGP30 serial #(\.+)')
-			m = re.match(p,s)
-			if m:
-				sn = m.groups()[0]
-				debug("Serial number: {}".format(sn))
-				foundSN = True
-				break
-			s = ""
-		time.sleep(0.05)
-		if not running:
-			break
-	if foundSN:
-		ser.write(bytes('OK\r\n','utf-8'))
-		time.sleep(0.5)
-		ser.write(bytes('OK\r\n','utf-8'))
-		break
-	if time.time() > startT + 120.0:  # Two minutes is enough...
-		t_out = True
-		time.sleep(0.1) # To stop CPU going nuts.
-	if not running:
-		t_out = True
-		break
-
-s = ""
-
-now = time.time()
-updateTH = now
-update_interval = 60  # seconds
-
-eco2s = []
-
-oldmin = datetime.datetime.utcnow().minute
-
-while running and not t_out:
-	while ser.in_waiting > 0:
-		c = ser.read(1)
-		if c[0] >= 32:
-			s += c.decode('utf-8')
-		if c[0] == 10:
-			p = re.compile(r'(\d+)')
-			if re.match(p,s):
-				debug("eCO2 = {} ppm".format(s))
-				eco2s.append(float(s))
-				mn = datetime.datetime.utcnow().minute
-				if mn != oldmin:
-					savedata(datapath,eco2s,sn,statusfile)
-					eco2s.clear()
-					oldmin = mn
-			else:
-				p = re.compile(r'Found SGP30 serial #(.*)') # SGP30 serial #(\.+)')
-				m = re.match(p,s)
-				if not m:
-					debug("Unknown data received: {}".format(s))
+def main(argv=None):
+	global DEBUG, HOME, running, metrics, store
+
+	running = True
+
+	parser = argparse.ArgumentParser(description="Reads data from SGP30 "+
+																	 "air quality sensor, averages and logs the "+
+																	 "eCO2 readings")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/sgp30.conf.")
+	parser.add_argument("-b","--heartbeat",nargs=1,help="Heartbeat file, "+
+											"updated every time through the main loop (set by "+
+											"supervisor.py).")
+	parser.add_argument("-m","--metrics",nargs=1,help="Write counters and "+
+											"timings to this file every minute (see "+
+											"metrics.py).")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when "+
+											"SIGUSR1 is received or the program ends (see "+
+											"profiling.py).")
+	parser.add_argument("--capture",nargs=1,help="Write everything received "+
+											"from and sent to the serial port to this file, "+
+											"to replay it later (see bench/replayCapture.py).")
+	parser.add_argument("-d","--debug",action="store_true",help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = script+" version "+VERSION+" written by "+AUTHORS
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	debug("Current user's home :"+HOME)
+
+	# supervisor.py watches the heartbeat to see that the program is not stuck
+	heartbeatfile = None
+	if args.heartbeat:
+		heartbeatfile = makeFilePath(args.heartbeat[0])
+		debug(f"Heartbeat file: {heartbeatfile}")
+	hb = Heartbeat(heartbeatfile)
+
+	metricsfile = None
+	if args.metrics:
+		metricsfile = makeFilePath(args.metrics[0])
+		debug(f"Metrics file: {metricsfile}")
+	metrics = Metrics(metricsfile,script)
+
+	# Profiling is switched off (the dumps are written) and on again with
+	# SIGUSR1
+	profiledir = None
+	if args.profile:
+		profiledir = makeFilePath(args.profile[0])
+		debug(f"Profile dumps: {profiledir}")
+	prof = Profiler(profiledir,script)
+
+	capturefile = None
+	if args.capture:
+		capturefile = makeFilePath(args.capture[0])
+		checkPath(os.path.dirname(capturefile))
+		debug(f"Serial traffic captured in {capturefile}")
+
+	configfile = HOME+"etc/sgp30.conf"
+
+	if args.config:
+		debug("Alternate config file specified: "+str(args.config[0]))
+		configfile = str(args.config[0])
+		if not configfile.startswith('/'):
+			configfile = HOME+configfile
+
+	debug("Configuration file: "+configfile)
+
+	if not os.path.isfile(configfile):
+		errorExit(configfile+' does not exist.')
+
+	conf = configparser.ConfigParser()
+	conf.read(configfile)
+
+	req = ['main,lock file','main,temphum file','main,status file','comms,port',
+				 'path,data']
+
+	cfg = checkConfig(conf, req)
+
+	port = conf['comms']['port']
+	statusfile = makeFilePath(conf['main']['status file'])
+	debug("Equivalent CO2 values will be stored in {}".format(statusfile))
+
+	datapath = makePath(conf['path']['data'])
+	checkPath(datapath)
+	debug("Data will be stored in {}".format(datapath))
+
+	temphumfile = makeFilePath(conf['main']['temphum file'])
+	debug("Current temperature / humidity can be found in {}".format(temphumfile))
+
+	try:
+		store = storage.fromConfig(conf,HOME,script)
+	except (sqlite3.Error,ValueError) as e:
+		errorExit(f"Could not open the database: {e}")
+	if store.enabled:
+		debug(f"Data also stored in {store.dbfile}, committed every "+
+			f"{store.interval:0.0f} s")
+
+	# Compensation settings and counters. The values are only sent to the sensor
+	# when they change by at least the thresholds.
+	comp = {'temp threshold': 0.5, 'hum threshold': 2.0, 'stale limit': 300.0,
+		'mtime': 0, 'temp': None, 'hum': None, 'source time': 0, 'sent': 0,
+		'skipped': 0, 'stale': 0, 'read errors': 0, 'is stale': False}
+	try:
+		if ('compensation,temperature threshold' in cfg):
+			comp['temp threshold'] = float(conf['compensation']['temperature threshold'])
+		if ('compensation,humidity threshold' in cfg):
+			comp['hum threshold'] = float(conf['compensation']['humidity threshold'])
+		if ('compensation,stale' in cfg):
+			comp['stale limit'] = float(conf['compensation']['stale'])
+	except:
+		errorExit("Something went wrong trying to convert the numbers in the "+
+			"[compensation] section of the configuration file.")
+
+	debug(f"Compensation sent when temperature changes by {comp['temp threshold']}"+
+		f" degC or humidity by {comp['hum threshold']} %RH, stale after "+
+		f"{comp['stale limit']:0.0f} s.")
+
+	t_out = 10.0
+	if ('comms,timeout' in cfg):
+		t_out = float(conf['comms']['timeout'])
+
+	debug("Serial communications timeout is {:.1f} s.".format(t_out))
+
+	# Create UUCP lock for the serial port
+	uucpLockPath='/var/lock'
+	if ('paths,uucp lock' in cfg):
+		uucpLockPath = conf['paths']['uucp lock']
+
+	ret = subprocess.check_output(['/usr/local/bin/lockport','-d',uucpLockPath,
+										 '-p',str(os.getpid()),port,sys.argv[0]]).decode('utf-8')
+
+	if (re.match('1',ret)==None):
+		errorExit('Could not obtain a lock on ' + port + '.')
+
+	lockfile = conf['main']['lock file']
+	if not lockfile.startswith('/'):
+		lockfile = HOME+lockfile
+	if not CreateProcessLock(lockfile):
+		subprocess.check_output(['/usr/local/bin/lockport','-r',port])
+		errorExit('Unable to lock - '+script+' already running?')
+
+	# Signals can only be handled in the main thread; when this runs as a thread
+	# of supervisor.py the supervisor calls stop() instead.
+	if threading.current_thread() is threading.main_thread():
+		signal.signal(signal.SIGINT,signalHandler)
+		signal.signal(signal.SIGTERM,signalHandler)
+		signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
+		                                           # controlling TTY, but handle
+		                                           # it anyway
+		if prof.enabled:
+			signal.signal(signal.SIGUSR1,prof.handler)
+	prof.start()
+
+	debug('Opening '+port)
+
+	# The locks are always released, also when the serial port goes away
+	capture = None
+	try:
+		if capturefile is not None:
+			capture = Capture(capturefile,script)
+		# Reads wait at most a second so that the program still checks if it has to
+		# stop (or send temperature and humidity) when the sensor is quiet.
+		#
+		# Opening the serial port resets the Arduino Nano, but not the Leonardo...
+		# Wait for sensor to communicate; the Arduino will send:
+		#
+		#    SGP30 sensor
+		#    Found SGP30 serial #017E3A8B
+		#
+		# and then start to send eCO2 values in PPM approx every second:
+		#    400
+		#    etc.
+		#
+		# This is the handshake (findSerialNumber) that is done every time the
+		# port is opened, also when it is opened again after the sensor went away.
+		ser = SerialTransport(port,115200,min(t_out,1.0),t_out,
+			handshake=findSerialNumber,handshakeTime=120.0,capture=capture)
+		connects = 0
+		sn = ""
+
+		debug("Waiting for SGP30 device serial number...")
+
+		forceTH = True  # Always send the values once after a (re)start
+
+		eco2s = []
+
+		oldmin = datetime.datetime.utcnow().minute
+
+		while running:
+			hb.beat()
+			metrics.tick()
+			for s in ser.read():
+				eco2 = getEco2(s)
+				if not eco2 is None:
+					metrics.counter('lines parsed').inc()
+					if DEBUG:
+						debug("eCO2 = {} ppm".format(s))
+					eco2s.append(eco2)
+					mn = datetime.datetime.utcnow().minute
+					if mn != oldmin:
+						metrics.gauge('samples per minute').set(len(eco2s))
+						startT = time.monotonic()
+						savedata(datapath,eco2s,sn,statusfile)
+						store.flush()
+						metrics.histogram('file write').observe(time.monotonic() - startT)
+						eco2s.clear()
+						oldmin = mn
+						if comp['source time'] > 0:
+							metrics.gauge('compensation age').set(time.time() -
+								comp['source time'])
+						if DEBUG and comp['source time'] > 0:
+							debug(f"Compensation age: {time.time() - comp['source time']:0.0f} s, "+
+								f"sent: {comp['sent']}, unchanged: {comp['skipped']}, "+
+								f"stale: {comp['stale']}, read errors: {comp['read errors']}")
 				else:
-					debug("Serial number received: {}".format(m.groups()[0]))
-			s = ""
-	time.sleep(0.1) # prevents CPU from going nuts.
-	
-	if time.time() > updateTH:
-		(temp,hum) = getTempHum(temphumfile)
-		msg = "{:0.2f}, {:0.2f}\n\r".format(temp,hum)
-		ser.write(bytes(msg,'utf-8'))
-		debug("Sent temperature and humidity to sensor: {:0.2f} degC, {:0.2f} %RH".
-				format(temp,hum))
-		updateTH = updateTH + update_interval
-	
-
-if t_out:
-	print("SGP30 sensor could not be found.")
-
-ser.close()
-
-subprocess.check_output(['/usr/local/bin/lockport','-r',port]) 
-
-RemoveProcessLock(lockfile)
-
-print(ts(),script,'terminated.')
-
-
+					m = snPattern.match(s)
+					if not m:
+						metrics.counter('parse failures').inc()
+						debug("Unknown data received: {}".format(s))
+					else:
+						# The Arduino restarted, it lost the compensation values
+						debug("Serial number received: {}".format(m.groups()[0]))
+						forceTH = True
+
+			if not ser.ready:
+				continue
+			if ser.connects != connects:
+				# (Re)connected, the sensor needs the compensation values again
+				connects = ser.connects
+				metrics.gauge('serial connects').set(connects)
+				sn = ser.device
+				forceTH = True
+
+			th = checkCompensation(temphumfile,comp,forceTH)
+			if not th is None:
+				(temp,hum) = th
+				msg = "{:0.2f}, {:0.2f}\n\r".format(temp,hum)
+				if ser.write(bytes(msg,'utf-8')):
+					comp['mtime'] = comp['source time']
+					comp['temp'] = temp
+					comp['hum'] = hum
+					comp['sent'] += 1
+					metrics.counter('compensation sent').inc()
+					store.command(time.time(),msg.strip())
+					forceTH = False
+					debug("Sent temperature and humidity to sensor: {:0.2f} degC, {:0.2f} %RH".
+							format(temp,hum))
+
+		debug(f"Serial port: {ser.stats()}")
+		ser.close()
+	finally:
+		hb.close()
+		metrics.close()
+		store.close()
+		if store.enabled:
+			debug(f"Database: {store.describe()}")
+		prof.close()
+		if capture is not None:
+			capture.close()
+		subprocess.check_output(['/usr/local/bin/lockport','-r',port])
+		RemoveProcessLock(lockfile)
+
+	print(ts(),script,'terminated.')
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,604 @@
+#!/usr/bin/python3
+# storage.py
+
+# An SQLite database with everything the loggers write, next to the text
+# files (which stay as they are): the minute records of temphumlog.py and
+# sgp30log.py, the commands sent to the controller and the sensor, and every
+# change of the modes (heater, humidifier, vent and booster) the controller
+# reports. All tables have an index on the time 't' (seconds since the epoch,
+# UTC), so a range of hours or days is found without reading whole days of
+# text.
+#
+#   temphum    t, temp, hum, dewpoint, tset, hset, dpset, tmode, hmode, vmode,
+#              bmode (one row a minute, as in data/MJD.dat)
+#   eco2       t, eco2 (data/co2log/MJD.dat)
+#   commands   t, program, command (logs/commands.log and more)
+#   modes      t, name (temp, hum, vent, boost), value
+#
+# A mode change is kept at the time of the first minute record that has the
+# new mode (Storage.minute()), so the logger and --import give the same rows
+# and an import of days that are in the database already adds nothing.
+#
+# The database is in WAL mode: the loggers write while the readers (the
+# reports, several at a time) read, without waiting for each other. A
+# logger does not commit every record: Storage keeps them and writes them in
+# one transaction every 'interval' seconds (flush()), which is what costs on
+# an SD card. Records that could not be written (the database was locked for
+# too long) are kept and written with the next flush, up to MAX_PENDING.
+#
+# query() gives a range of a table as NumPy arrays, one per column; readData()
+# gives the temphum table in the form roomModel.readData() does. NumPy is only
+# needed for the queries, the loggers do without it. WAL does not work on a
+# network file system, so a reader on another host (the monitor) reads the
+# text files as before.
+#
+# The loggers use it when 'enabled' is set in the [storage] section of their
+# configuration file. Storage(None) does nothing.
+#
+#   storage.py --info            what is in the database
+#   storage.py --import          the data files, the eCO2 files and the command
+#                                log into the database (again: rows that are
+#                                there already are skipped)
+#   storage.py --query START     a range of a table, timed
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. --import also reads the days archiver.py compressed (see dataFiles.py).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Bug fix: the mode changes of temphumlog.py were at the second they were
+#    reported, those of --import at the minute, so an import added them all
+#    again. Both now come from the minute records (Storage.minute()).
+# 2. Bug fix: --import added a change of every mode at the first minute it
+#    read. The modes before it are taken from the database.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.4
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling (-p / --profile, see profiling.py): the dumps are written
+#    when the program ends, or at SIGUSR1.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import calendar
+import sqlite3
+import argparse
+import threading
+import configparser
+import dataFiles
+import profiling
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+script = os.path.basename(__file__)
+VERSION = "0.4"
+AUTHORS = "Louis Marais"
+
+DEBUG = False
+
+# The tables: the columns and their types, and the columns that make a row
+# unique (a row imported twice is skipped)
+TABLES = {
+	'temphum': ([('t','REAL'),('temp','REAL'),('hum','REAL'),('dewpoint','REAL'),
+		('tset','REAL'),('hset','REAL'),('dpset','REAL'),('tmode','TEXT'),
+		('hmode','TEXT'),('vmode','TEXT'),('bmode','TEXT')],['t']),
+	'eco2': ([('t','REAL'),('eco2','REAL')],['t']),
+	'commands': ([('t','REAL'),('program','TEXT'),('command','TEXT')],
+		['t','command']),
+	'modes': ([('t','REAL'),('name','TEXT'),('value','TEXT')],['t','name'])}
+
+MODES = ['temp','hum','vent','boost']  # the mode columns of temphum, in order
+
+BUSY = 10.0           # seconds to wait for a lock on the database
+MAX_PENDING = 10000   # records kept while the database can not be written
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def debug(msg):
+	if DEBUG:
+		print(ts(),msg)
+	return
+
+# -----------------------------------------------------------------------------
+def errorExit(s):
+	print('ERROR: '+s)
+	sys.exit(1)
+
+# -----------------------------------------------------------------------------
+def makeFilename(hm,fl):
+	if not fl.startswith('/'):
+		fl = hm + fl
+	return(fl)
+
+# -----------------------------------------------------------------------------
+# A connection in WAL mode; the tables are made when they are not there. A
+# reader (readonly) can not make the database, or write to it.
+def connect(dbfile,readonly=False):
+	if readonly:
+		conn = sqlite3.connect(f"file:{dbfile}?mode=ro",uri=True,timeout=BUSY,
+			isolation_level=None,check_same_thread=False)
+		conn.execute("PRAGMA query_only = ON")
+		return(conn)
+	conn = sqlite3.connect(dbfile,timeout=BUSY,isolation_level=None,
+		check_same_thread=False)
+	conn.execute("PRAGMA journal_mode = WAL")
+	# In WAL mode a power cut may lose the last transactions, not the database
+	conn.execute("PRAGMA synchronous = NORMAL")
+	for (table,(cols,key)) in TABLES.items():
+		conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ("+
+			','.join([f"{c} {kind}" for (c,kind) in cols])+")")
+		conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_t ON {table} ("+
+			','.join(key)+")")
+	return(conn)
+
+# -----------------------------------------------------------------------------
+# What the loggers write. The records are kept until flush(); add() is called
+# from one thread (the serial loop) and flush() from another (the file
+# worker), so the list is locked.
+class Storage:
+
+	def __init__(self,dbfile,program='',interval=60.0):
+		self.dbfile = dbfile
+		self.enabled = dbfile is not None
+		self.program = program
+		self.interval = interval
+		self.lock = threading.Lock()
+		self.pending = {}        # table: [rows]
+		self.npending = 0
+		self.lastT = time.monotonic()
+		self.written = 0         # rows written (not those that were there)
+		self.commits = 0
+		self.failures = 0        # flushes that failed (the rows were kept)
+		self.dropped = 0         # rows thrown away, MAX_PENDING was reached
+		self.longest = 0.0       # longest commit (s)
+		self.modes = None        # the modes of the last minute record
+		self.conn = None
+		if self.enabled:
+			self.conn = connect(dbfile)
+		return
+
+	def add(self,table,row):
+		if not self.enabled:
+			return
+		with self.lock:
+			if self.npending >= MAX_PENDING:
+				# The oldest go first
+				for rows in self.pending.values():
+					if len(rows) > 0:
+						rows.pop(0)
+						self.npending -= 1
+						self.dropped += 1
+						break
+			self.pending.setdefault(table,[]).append(row)
+			self.npending += 1
+		return
+
+	# A minute record, and a mode change for every mode that is not what it was
+	# the minute before
+	def minute(self,t,temp,hum,dp,tset,hset,dpset,tmode,hmode,vmode,bmode):
+		if not self.enabled:
+			return
+		self.add('temphum',(t,temp,hum,dp,tset,hset,dpset,tmode,hmode,vmode,bmode))
+		modes = [tmode,hmode,vmode,bmode]
+		if self.modes is None:
+			self.modes = self.lastModes(t)
+		for i in range(0,len(MODES)):
+			if self.modes[i] != modes[i]:
+				self.mode(t,MODES[i],modes[i])
+		self.modes = modes
+		return
+
+	# The modes before time 't' in the database (None where there is none), so
+	# a restart or an import does not add changes that are not there
+	def lastModes(self,t):
+		modes = [None]*len(MODES)
+		try:
+			for i in range(0,len(MODES)):
+				row = self.conn.execute("SELECT value FROM modes WHERE name = ? AND "+
+					"t < ? ORDER BY t DESC LIMIT 1",(MODES[i],t)).fetchone()
+				if row is not None:
+					modes[i] = row[0]
+		except sqlite3.Error as e:
+			debug(f"Could not read the last modes: {e}")
+		return(modes)
+
+	def eco2(self,t,eco2):
+		self.add('eco2',(t,eco2))
+		return
+
+	def command(self,t,cmd):
+		self.add('commands',(t,self.program,cmd))
+		return
+
+	def mode(self,t,name,value):
+		self.add('modes',(t,name,value))
+		return
+
+	# Writes what was kept, in one transaction, when 'interval' seconds went by
+	# since the last time (or now with force). Returns False if it could not.
+	def flush(self,force=False):
+		if not self.enabled:
+			return(True)
+		if not force and time.monotonic() - self.lastT < self.interval:
+			return(True)
+		self.lastT = time.monotonic()
+		with self.lock:
+			pending = self.pending
+			self.pending = {}
+			self.npending = 0
+		if len(pending) == 0:
+			return(True)
+		startT = time.monotonic()
+		n = self.conn.total_changes
+		try:
+			self.conn.execute("BEGIN IMMEDIATE")
+			for (table,rows) in pending.items():
+				cols = TABLES[table][0]
+				self.conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES ("+
+					','.join(['?']*len(cols))+")",rows)
+			self.conn.execute("COMMIT")
+		except sqlite3.Error as e:
+			print(ts(),f"Could not write to {self.dbfile}: {e}")
+			if self.conn.in_transaction:
+				self.conn.execute("ROLLBACK")
+			self.failures += 1
+			# Kept for the next time, before what came in the mean time
+			with self.lock:
+				for (table,rows) in pending.items():
+					self.pending[table] = rows + self.pending.get(table,[])
+					self.npending += len(rows)
+			return(False)
+		self.written += self.conn.total_changes - n
+		self.commits += 1
+		self.longest = max(self.longest,time.monotonic() - startT)
+		return(True)
+
+	def close(self):
+		if not self.enabled:
+			return
+		self.flush(True)
+		self.conn.close()
+		return
+
+	def describe(self):
+		return(f"{self.written} rows in {self.commits} commits (longest "+
+			f"{self.longest*1000:0.1f} ms), {self.npending} pending, "+
+			f"{self.failures} failed, {self.dropped} dropped")
+
+# -----------------------------------------------------------------------------
+# Storage from the [storage] section of a logger's configuration file,
+# disabled without it
+def fromConfig(conf,home,program=''):
+	if not conf.has_section('storage') or \
+		not conf['storage'].getboolean('enabled',fallback=False):
+		return(Storage(None))
+	dbfile = makeFilename(home,conf['storage'].get('database','data/envlog.db'))
+	return(Storage(dbfile,program,
+		conf['storage'].getfloat('commit interval',fallback=60.0)))
+
+# -----------------------------------------------------------------------------
+# Rows of 'table' with start <= t < end, in time order: a NumPy array per
+# column (float for the numbers, NaN where there is none; str for the text)
+def query(conn,table,start,end,columns=None):
+	if np is None:
+		raise ValueError("Queries need the numpy module")
+	if not table in TABLES:
+		raise ValueError(f"No table {table}")
+	kinds = dict(TABLES[table][0])
+	if columns is None:
+		columns = [c for (c,kind) in TABLES[table][0]]
+	columns = ['t'] + [c for c in columns if c != 't']
+	for c in columns:
+		if not c in kinds:
+			raise ValueError(f"No column {c} in {table}")
+	rows = conn.execute(f"SELECT {','.join(columns)} FROM {table} WHERE t >= ? "+
+		"AND t < ? ORDER BY t",(start,end)).fetchall()
+	cols = list(zip(*rows)) if len(rows) > 0 else [[]]*len(columns)
+	data = {}
+	for i in range(0,len(columns)):
+		if kinds[columns[i]] == 'REAL':
+			data[columns[i]] = np.array(cols[i],dtype=float)
+		else:
+			data[columns[i]] = np.array(cols[i],dtype=str)
+	return(data)
+
+# -----------------------------------------------------------------------------
+# The minute records of days firstMJD to lastMJD, like roomModel.readData()
+def readData(conn,firstMJD,lastMJD):
+	data = query(conn,'temphum',(firstMJD - 40587)*86400.0,
+		(lastMJD + 1 - 40587)*86400.0,['temp','hum','tset','hset','tmode','hmode',
+		'vmode','bmode'])
+	data['days'] = len(np.unique(np.floor(data['t']/86400)))
+	debug(f"{len(data['t'])} minutes read from {data['days']} days")
+	return(data)
+
+# -----------------------------------------------------------------------------
+# The lines of a day that are not comments: (t, the other columns)
+def readDataFile(datapath,mjd):
+	day = (mjd - 40587)*86400
+	rows = []
+	f = dataFiles.openDay(datapath,mjd)
+	if f is None:
+		return(rows)
+	with f:
+		for line in f:
+			if line.startswith('#'):
+				continue
+			d = line.split()
+			if len(d) < 2:
+				continue
+			try:
+				hms = d[0].split(':')
+				rows.append((day + int(hms[0])*3600 + int(hms[1])*60 + int(hms[2]),d[1:]))
+			except (ValueError,IndexError):
+				continue
+		f.close()
+	return(rows)
+
+# -----------------------------------------------------------------------------
+# The data files of temphumlog.py, with the mode changes (see
+# Storage.minute()). Returns the rows read.
+def importTempHum(store,datapath,mjds):
+	n = 0
+	for mjd in mjds:
+		for (t,d) in readDataFile(datapath,mjd):
+			if len(d) < 10:
+				continue
+			try:
+				store.minute(t,float(d[0]),float(d[1]),float(d[2]),float(d[3]),
+					float(d[4]),float(d[5]),d[6],d[7],d[8],d[9])
+			except ValueError:
+				continue
+			n += 1
+		store.flush(True)  # a transaction per day
+	return(n)
+
+# -----------------------------------------------------------------------------
+# The data files of sgp30log.py
+def importEco2(store,datapath,mjds):
+	n = 0
+	for mjd in mjds:
+		for (t,d) in readDataFile(datapath,mjd):
+			try:
+				store.eco2(t,float(d[0]))
+			except ValueError:
+				continue
+			n += 1
+		store.flush(True)
+	return(n)
+
+# -----------------------------------------------------------------------------
+# The command log of temphumlog.py (-l): local time, then the command
+def importCommands(store,logfile,start):
+	n = 0
+	with open(logfile,'r') as f:
+		for line in f:
+			try:
+				tm = time.strptime(line[:30].strip(),"%Y-%m-%d %A %H:%M:%S")
+			except ValueError:
+				continue
+			t = time.mktime(tm)
+			if t < start:
+				continue
+			store.command(t,line[30:].strip())
+			n += 1
+		f.close()
+	store.flush(True)
+	return(n)
+
+# -----------------------------------------------------------------------------
+def info(conn,dbfile):
+	size = sum([os.path.getsize(f) for f in [dbfile,dbfile+'-wal']
+		if os.path.isfile(f)])
+	print(f"{dbfile}: {size/1e6:0.1f} MB")
+	for table in TABLES:
+		(n,first,last) = conn.execute(f"SELECT COUNT(*), MIN(t), MAX(t) FROM "+
+			f"{table}").fetchone()
+		s = f"  {table:9s} {n:8d} rows"
+		if n > 0:
+			s += (" from "+time.strftime('%Y-%m-%d %H:%M',time.gmtime(first))+
+				" to "+time.strftime('%Y-%m-%d %H:%M UTC',time.gmtime(last)))
+		print(s)
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+def main(argv=None):
+	global DEBUG
+
+	parser = argparse.ArgumentParser(description="The database of the data, "+
+																	 "commands and mode changes.")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/temphum.conf.")
+	parser.add_argument("-s","--sgp30",nargs=1,help="The configuration file of "+
+											"sgp30log.py, for --import. The default is "+
+											"~/etc/sgp30.conf.")
+	parser.add_argument("-i","--info",action="store_true",help="Show what is in "+
+											"the database.")
+	parser.add_argument("--import",dest="load",action="store_true",
+											help="Import the data files and the command log.")
+	parser.add_argument("-n","--days",nargs=1,type=int,help="Only the last "+
+											"DAYS days (--import; default all).")
+	parser.add_argument("-q","--query",nargs=1,help="Query from 'YYYY-MM-DD "+
+											"HH:MM' (UTC).")
+	parser.add_argument("-t","--hours",nargs=1,type=float,default=[24.0],
+											help="Hours to query (default 24).")
+	parser.add_argument("-T","--table",nargs=1,choices=list(TABLES),
+											default=['temphum'],help="Table to query (default "+
+											"temphum).")
+	parser.add_argument("-j","--jobs",nargs=1,type=int,default=[1],
+											help="Run the query this many times at the same time, "+
+											"each with its own connection.")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when it "+
+											"ends or SIGUSR1 is received (see profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	prof = profiling.fromArgs(args,HOME,script)
+	try:
+		configfile = makeFilename(HOME,"etc/temphum.conf")
+		if args.config:
+			configfile = makeFilename(HOME,args.config[0])
+		if not os.path.isfile(configfile):
+			errorExit(f"{configfile} does not exist.")
+		conf = configparser.ConfigParser()
+		conf.read(configfile)
+
+		dbfile = makeFilename(HOME,"data/envlog.db")
+		if conf.has_section('storage'):
+			dbfile = makeFilename(HOME,conf['storage'].get('database','data/envlog.db'))
+		debug(f"Database: {dbfile}")
+
+		if args.load:
+			try:
+				store = Storage(dbfile,'temphumlog.py',0.0)
+			except sqlite3.Error as e:
+				errorExit(f"Could not open {dbfile}: {e}")
+			start = 0.0
+			if args.days:
+				start = (int(time.time()/86400) - args.days[0] + 1)*86400.0
+			datapath = makeFilename(HOME,conf['path']['data'])
+			mjds = [m for m in dataFiles.listDays(datapath) if (m - 40587)*86400 >= start]
+			startT = time.perf_counter()
+			n = importTempHum(store,datapath,mjds)
+			print(f"{n} minutes from {len(mjds)} data files in "+
+				f"{time.perf_counter() - startT:0.2f} s")
+			sgp30file = makeFilename(HOME,"etc/sgp30.conf")
+			if args.sgp30:
+				sgp30file = makeFilename(HOME,args.sgp30[0])
+			if os.path.isfile(sgp30file):
+				sgp30conf = configparser.ConfigParser()
+				sgp30conf.read(sgp30file)
+				co2path = makeFilename(HOME,sgp30conf['path']['data'])
+				mjds = [m for m in dataFiles.listDays(co2path) if (m - 40587)*86400 >= start]
+				startT = time.perf_counter()
+				n = importEco2(store,co2path,mjds)
+				print(f"{n} eCO2 minutes from {len(mjds)} data files in "+
+					f"{time.perf_counter() - startT:0.2f} s")
+			logfile = makeFilename(HOME,conf['main']['logfile'])
+			if os.path.isfile(logfile):
+				n = importCommands(store,logfile,start)
+				print(f"{n} commands from {logfile}")
+			store.close()
+			print(f"{dbfile}: {store.describe()}")
+
+		if args.info or args.query:
+			if not os.path.isfile(dbfile):
+				errorExit(f"{dbfile} does not exist.")
+			try:
+				conn = connect(dbfile,readonly=True)
+			except sqlite3.Error as e:
+				errorExit(f"Could not open {dbfile}: {e}")
+
+		if args.info:
+			info(conn,dbfile)
+
+		if args.query:
+			try:
+				start = calendar.timegm(time.strptime(args.query[0].strip(),
+					"%Y-%m-%d %H:%M"))
+			except ValueError:
+				errorExit(f"Not a date and time (YYYY-MM-DD HH:MM): {args.query[0]}")
+			end = start + args.hours[0]*3600
+			table = args.table[0]
+			results = [None]*args.jobs[0]
+			def job(i):
+				c = connect(dbfile,readonly=True)
+				t0 = time.perf_counter()
+				results[i] = (query(c,table,start,end),time.perf_counter() - t0)
+				c.close()
+				return
+			startT = time.perf_counter()
+			threads = [threading.Thread(target=job,args=(i,))
+				for i in range(0,args.jobs[0])]
+			for th in threads:
+				th.start()
+			for th in threads:
+				th.join()
+			dt = time.perf_counter() - startT
+			(data,qt) = results[0]
+			print(f"{table}: {len(data['t'])} rows in {qt*1000:0.1f} ms"+
+				(f" ({args.jobs[0]} queries at the same time in {dt*1000:0.1f} ms, the "+
+				f"slowest {max([r[1] for r in results])*1000:0.1f} ms)"
+				if args.jobs[0] > 1 else ""))
+			if len(data['t']) > 0:
+				for (c,v) in data.items():
+					if c != 't' and v.dtype.kind == 'f':
+						print(f"  {c:9s} min {np.nanmin(v):8.2f}  mean {np.nanmean(v):8.2f}  "+
+							f"max {np.nanmax(v):8.2f}")
+	finally:
+		prof.close()
+	return
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,639 @@
+#!/usr/bin/python3
+# supervisor.py
+
+# Runs the logging, upload and scheduling programs in one process, instead of
+# kickstart.py starting each of them in its own Python interpreter (and
+# restarting them at most every 5 minutes).
+#
+# The components are listed in supervisor.conf. A component is either
+#   module   a program in bin/ with a main(argv) and a stop() (temphumlog,
+#            sgp30log, upload, checkSchedule), run in a thread of this
+#            process
+#   command  any other program (logpicputemp.pl), run as a child process
+#
+# A component that stops is started again after a wait that doubles every
+# time it stops again (backoff min .. backoff max seconds), and goes back to
+# the shortest wait once it has run for 'stable' seconds. The state of all
+# the components is written to the status file.
+#
+# A component with a 'deadline' gets a heartbeat file (see heartbeat.py) that
+# it updates every time through its main loop. A component that does not do
+# that for 'deadline' seconds is stuck: it is stopped (a child process is
+# killed if it does not stop) and started again. How long it took to see
+# that it was stuck and how long until it worked again are kept in the status
+# file (and the watchdog log). A thread that can not be stopped can only be
+# ended by restarting the supervisor.
+#
+# Test mode: 'supervisor.py --hang temphum 60' makes temphum hang for 60 s
+# at its next heartbeat.
+#
+# kickstart.py now only has to check that this program is running.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Heartbeat watchdog: components with a 'deadline' are restarted when
+#    their heartbeat stops. Time to detect and time to recover are kept.
+# 2. --hang to test the watchdog.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling of the supervisor and the components it runs in threads
+#    (-p / --profile, see profiling.py): SIGUSR1 stops it and writes the
+#    dumps, and starts it again. The dumps are also written before the
+#    supervisor restarts itself because a thread is stuck.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shlex
+import signal
+import argparse
+import resource
+import importlib
+import threading
+import traceback
+import subprocess
+import configparser
+from heartbeat import Heartbeat
+from profiling import Profiler
+
+script = os.path.basename(__file__)
+VERSION = "0.3"
+AUTHORS = "Louis Marais"
+
+DEBUG = False
+running = True
+
+# -----------------------------------------------------------------------------
+# Sub routines
+# -----------------------------------------------------------------------------
+def signalHandler(signal,frame):
+	global running
+	running = False
+	return
+
+# -----------------------------------------------------------------------------
+def TestProcessLock(lockFile):
+	if (os.path.isfile(lockFile)):
+		with open(lockFile,'r') as flock:
+			info = flock.readline().split()
+			flock.close()
+		if (len(info)==2):
+			if (os.path.exists('/proc/'+str(info[1]))):
+				return False
+	return True
+
+# -----------------------------------------------------------------------------
+def CreateProcessLock(lockFile):
+	if (not TestProcessLock(lockFile)):
+		return False;
+	with open(lockFile,'w') as flock:
+		flock.write(os.path.basename(sys.argv[0]) + ' ' + str(os.getpid()))
+		flock.close()
+	return True
+
+# -----------------------------------------------------------------------------
+def RemoveProcessLock(lockFile):
+	if (os.path.isfile(lockFile)):
+		os.unlink(lockFile)
+	return
+
+# -----------------------------------------------------------------------------
+def ts():
+	return(time.strftime('%Y-%m-%d %H:%M:%S ',time.gmtime()))
+
+# -----------------------------------------------------------------------------
+def debug(msg):
+	if DEBUG:
+		print(ts(),msg)
+	return
+
+# -----------------------------------------------------------------------------
+def errorExit(s):
+	print('ERROR: '+s)
+	sys.exit(1)
+
+# -----------------------------------------------------------------------------
+def checkConfig(cfg, req):
+	cnt = []
+	for section in cfg.sections():
+		s = section.lower()
+		for key in cfg[section]:
+			cnt.append(s+','+key.lower())
+	for s in req:
+		if not s in cnt:
+			errorExit('Required key ({}) not in configuration file.'.format(s))
+	debug("All required section:key pairs found in configuration file.")
+	return(cnt)
+
+# -----------------------------------------------------------------------------
+def makeFilePath(s):
+	if not s.startswith('/'):
+		s = HOME + s
+	return(s)
+
+# -----------------------------------------------------------------------------
+def duration(s):
+	s = int(s)
+	if s < 120:
+		return(f"{s} s")
+	if s < 7200:
+		return(f"{s//60} min")
+	if s < 172800:
+		return(f"{s//3600} h {(s%3600)//60} min")
+	return(f"{s//86400} d {(s%86400)//3600} h")
+
+# -----------------------------------------------------------------------------
+# One program run by the supervisor, in a thread (module) or as a child
+# process (command).
+class Component:
+
+	def __init__(self,name,section,backoff):
+		self.name = name
+		if 'module' in section:
+			self.kind = 'thread'
+			self.target = section['module']
+		elif 'command' in section:
+			self.kind = 'child'
+			self.target = makeFilePath(section['command'])
+		else:
+			raise ValueError(f"[{name}] needs a 'module' or a 'command'")
+		self.args = shlex.split(section.get('args',''))
+		self.lockfile = ''
+		if 'lock file' in section:
+			self.lockfile = makeFilePath(section['lock file'])
+		(self.backoffMin,self.backoffMax,self.stable) = backoff
+		# Heartbeat: seconds the component may go without a beat, 0 for no
+		# heartbeat
+		self.deadline = float(section.get('deadline','0'))
+		self.hb = None
+		if self.deadline > 0:
+			self.hbfile = makeFilePath(section.get('heartbeat file',
+				f"status/{name}.heartbeat"))
+			self.hb = Heartbeat(self.hbfile)
+			self.args += ['--heartbeat',self.hbfile]
+		self.lastCount = 0
+		self.lastBeat = 0.0    # monotonic time the count last changed
+		self.detectedAt = 0.0  # monotonic time a stall was seen, until it works
+		                       # again
+		self.killAt = 0.0
+		self.stalls = 0
+		self.detect = []       # seconds from the last beat to seeing the stall
+		self.recover = []      # seconds from seeing the stall to the first beat
+		                       # after the restart
+		self.wait = self.backoffMin
+		self.module = None
+		self.thread = None
+		self.proc = None
+		self.exitCode = None
+		self.state = 'waiting'
+		self.startedAt = 0.0   # monotonic time of the last start
+		self.nextStart = 0.0   # monotonic time of the next start, when waiting
+		self.starts = 0
+		self.lastExit = ''
+
+	def start(self):
+		self.clearLock()
+		self.exitCode = None
+		try:
+			if self.kind == 'thread':
+				if self.module is None:
+					self.module = importlib.import_module(self.target)
+				self.thread = threading.Thread(target=self.runModule,
+					name=self.name,daemon=True)
+				self.thread.start()
+			else:
+				self.proc = subprocess.Popen([self.target] + self.args,cwd=HOME)
+		except Exception as e:
+			# Could not even start: try again later like any other exit
+			print(ts(),f"{self.name}: could not start {self.target}: {e}")
+			self.exitCode = str(e)
+			self.startedAt = time.monotonic()
+			self.stopped(self.startedAt)
+			return
+		self.starts += 1
+		self.state = 'running'
+		self.startedAt = time.monotonic()
+		if self.hb is not None:
+			self.lastCount = self.hb.read()[0]
+			self.lastBeat = self.startedAt
+		debug(f"{self.name}: started {self.target} {' '.join(self.args)}")
+		return
+
+	def runModule(self):
+		try:
+			self.module.main(self.args)
+			self.exitCode = 0
+		except SystemExit as e:
+			self.exitCode = e.code
+		except Exception as e:
+			traceback.print_exc()
+			self.exitCode = f"{type(e).__name__}: {e}"
+		return
+
+	def alive(self):
+		if self.kind == 'thread':
+			return(self.thread is not None and self.thread.is_alive())
+		return(self.proc is not None and self.proc.poll() is None)
+
+	# The component ended: wait before starting it again, longer every time
+	# it ends soon after being started
+	def stopped(self,now):
+		if self.kind == 'child' and self.proc is not None and self.exitCode is None:
+			self.exitCode = self.proc.returncode
+		ran = now - self.startedAt
+		if ran >= self.stable:
+			self.wait = self.backoffMin
+		self.lastExit = f"exit {self.exitCode} after {duration(ran)}"
+		self.state = 'waiting'
+		self.nextStart = now + self.wait
+		print(ts(),f"{self.name}: {self.lastExit}, restart in {self.wait:0.0f} s")
+		self.wait = min(2*self.wait,self.backoffMax)
+		return
+
+	# A lock file left behind by a thread of this process (or by a process
+	# that is gone) would stop the component from starting again
+	def clearLock(self):
+		if self.lockfile == '' or not os.path.isfile(self.lockfile):
+			return
+		try:
+			with open(self.lockfile,'r') as f:
+				info = f.readline().split()
+				f.close()
+			if len(info) == 2 and (info[1] == str(os.getpid()) or
+				not os.path.exists('/proc/'+info[1])):
+				debug(f"{self.name}: removing stale lock file {self.lockfile}")
+				os.unlink(self.lockfile)
+		except OSError:
+			pass
+		return
+
+	# Heartbeat watchdog, for a running component. Returns True when it is
+	# stuck.
+	def watch(self,now):
+		if self.hb is None:
+			return(False)
+		count = self.hb.read()[0]
+		if count != self.lastCount:
+			self.lastCount = count
+			self.lastBeat = now
+			if self.detectedAt > 0:
+				self.recover.append(now - self.detectedAt)
+				print(ts(),f"{self.name}: working again {self.recover[-1]:0.1f} s "+
+					"after it was found stuck")
+				logEvent(self.name,'recover',self.recover[-1])
+				self.detectedAt = 0.0
+			return(False)
+		return(now - self.lastBeat > self.deadline)
+
+	# The heartbeat stopped: stop the component, it is started again when it
+	# has stopped. A child that does not stop is killed at killAt.
+	def stall(self,now,killAfter):
+		(count,t,pid) = self.hb.read()
+		last = self.lastBeat
+		if count == self.lastCount and t > self.startedAt:
+			last = t
+		self.stalls += 1
+		self.detect.append(now - last)
+		self.detectedAt = now
+		self.killAt = now + killAfter
+		self.state = 'stalled'
+		print(ts(),f"{self.name}: no heartbeat for {now - last:0.1f} s "+
+			f"(deadline {self.deadline:0.0f} s), restarting it")
+		logEvent(self.name,'detect',self.detect[-1])
+		self.stop()
+		self.hb.release()  # ends a hang from --hang
+		return
+
+	def stop(self):
+		if not self.alive():
+			return
+		if self.kind == 'thread':
+			if hasattr(self.module,'stop'):
+				self.module.stop()
+		else:
+			self.proc.terminate()
+		return
+
+	def kill(self):
+		if self.kind == 'child' and self.alive():
+			self.proc.kill()
+		return
+
+	def status(self,now):
+		info = []
+		if self.state == 'running':
+			info.append(f"up {duration(now - self.startedAt)}")
+			if self.kind == 'child':
+				info.append(f"pid {self.proc.pid}")
+		elif self.state == 'waiting' and self.lastExit != '':
+			info.append(f"restart in {duration(max(self.nextStart - now,0))}")
+		info.append(f"{self.starts} starts")
+		if self.hb is not None and self.state == 'running':
+			info.append(f"heartbeat {now - self.lastBeat:0.1f} s ago")
+		if self.stalls > 0:
+			info.append(f"{self.stalls} stalls, detect {self.detect[-1]:0.1f} s "+
+				f"(max {max(self.detect):0.1f} s)")
+		if len(self.recover) > 0:
+			info.append(f"recover {self.recover[-1]:0.1f} s "+
+				f"(max {max(self.recover):0.1f} s)")
+		if self.lastExit != '':
+			info.append(f"last {self.lastExit}")
+		return(f"{self.name:12s} {self.kind:6s} {self.state:8s} "+', '.join(info))
+
+# -----------------------------------------------------------------------------
+# Watchdog events, one line each: time, component, detect or recover, seconds
+def logEvent(name,event,seconds):
+	if watchdogLog == '':
+		return
+	try:
+		with open(watchdogLog,'a') as f:
+			f.write(f"{ts()}{name} {event} {seconds:0.1f}\n")
+			f.close()
+	except OSError as e:
+		debug(f"Could not write {watchdogLog}: {e}")
+	return
+
+# -----------------------------------------------------------------------------
+# Ask the components to stop, and give them 'timeout' seconds to do it. A
+# thread may have started just before it was asked to stop, so ask again.
+def stopAll(components,timeout):
+	endT = time.monotonic() + timeout
+	while time.monotonic() < endT:
+		alive = [c for c in components if c.alive()]
+		if len(alive) == 0:
+			break
+		for c in alive:
+			c.stop()
+		time.sleep(0.5)
+	for c in components:
+		if c.alive():
+			print(ts(),f"{c.name} did not stop")
+			c.kill()
+		c.state = 'stopped'
+	return
+
+# -----------------------------------------------------------------------------
+# A thread that is stuck can not be killed; the only way out is to start
+# this program again (same PID, so the lock files are still ours). The new
+# supervisor is told when the stall was seen, to work out the time to
+# recover.
+def restartSupervisor(components,stuck):
+	print(ts(),f"{stuck.name} is stuck and does not stop, restarting {script}")
+	stopAll([c for c in components if not c is stuck],stopTime)
+	if not running:
+		return  # asked to stop in the mean time
+	RemoveProcessLock(lockfile)
+	prof.close()  # the dumps show where the thread is stuck
+	wall = time.time() - (time.monotonic() - stuck.detectedAt)
+	os.environ['SUPERVISOR_RECOVERING'] = (f"{stuck.name} {wall:0.3f} "+
+		f"{stuck.detect[-1]:0.3f}")
+	sys.stdout.flush()
+	os.execv(sys.executable,[sys.executable,os.path.abspath(__file__)] +
+		sys.argv[1:])
+
+# -----------------------------------------------------------------------------
+# The combined status: this process and every component
+def writeStatus(flnm,components,started):
+	now = time.monotonic()
+	mem = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0
+	lines = [f"{ts()}{script} {VERSION} pid {os.getpid()}, up "+
+		f"{duration(now - started)}, {threading.active_count()} threads, "+
+		f"max RSS {mem:0.1f} MB"]
+	for c in components:
+		lines.append(c.status(now))
+	try:
+		with open(flnm+'.new','w') as f:
+			f.write('\n'.join(lines)+'\n')
+		os.replace(flnm+'.new',flnm)
+	except OSError as e:
+		debug(f"Could not write {flnm}: {e}")
+	return
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(description="Runs the logging, upload and "+
+																 "schedule programs, and restarts them when "+
+																 "they stop.")
+parser.add_argument("-v","--version",action="store_true",help="Show version "+
+										"and exit.")
+parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+										"configuration file. The default is "+
+										"~/etc/supervisor.conf.")
+parser.add_argument("-s","--status",action="store_true",help="Show the "+
+										"status of the components and exit.")
+parser.add_argument("--hang",nargs=2,metavar=('COMPONENT','SECONDS'),
+										help="Test the watchdog: make a component hang "+
+										"for a number of seconds, and exit.")
+parser.add_argument("-p","--profile",nargs=1,help="Profile the supervisor "+
+										"and the components it runs in threads, and write "+
+										"the dumps to this directory when SIGUSR1 is "+
+										"received or the supervisor ends (see "+
+										"profiling.py).")
+parser.add_argument("-d","--debug",action="store_true",
+										help="Turn debugging on")
+
+args = parser.parse_args()
+
+if args.debug:
+	DEBUG = True
+
+versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+
+if args.version:
+	print(versionStr)
+	sys.exit(0)
+
+debug(versionStr)
+
+HOME = os.path.expanduser('~')
+if not(HOME.endswith('/')):
+	HOME += '/'
+
+debug(f"Current user's home :{HOME}")
+
+configfile = HOME+"etc/supervisor.conf"
+
+if args.config:
+	debug(f"Alternate config file specified: {args.config[0]}")
+	configfile = str(args.config[0])
+	if not configfile.startswith('/'):
+		configfile = HOME+configfile
+
+debug(f"Configuration file: {configfile}")
+
+if not os.path.isfile(configfile):
+	errorExit(f"{configfile} does not exist.")
+
+conf = configparser.ConfigParser()
+conf.read(configfile)
+
+req = ['main,lock file','main,status file','main,components']
+
+cfg = checkConfig(conf, req)
+
+statusfile = makeFilePath(conf['main']['status file'])
+
+if args.status:
+	if not os.path.isfile(statusfile):
+		errorExit(f"{statusfile} does not exist - is {script} running?")
+	with open(statusfile,'r') as f:
+		print(f.read(),end='')
+		f.close()
+	sys.exit(0)
+
+try:
+	backoff = (2.0,300.0,600.0)
+	if ('main,backoff min' in cfg):
+		backoff = (float(conf['main']['backoff min']),backoff[1],backoff[2])
+	if ('main,backoff max' in cfg):
+		backoff = (backoff[0],float(conf['main']['backoff max']),backoff[2])
+	if ('main,stable' in cfg):
+		backoff = (backoff[0],backoff[1],float(conf['main']['stable']))
+	stopTime = 15.0
+	if ('main,stop timeout' in cfg):
+		stopTime = float(conf['main']['stop timeout'])
+	statusTime = 10.0
+	if ('main,status interval' in cfg):
+		statusTime = float(conf['main']['status interval'])
+	killAfter = 5.0
+	if ('main,kill after' in cfg):
+		killAfter = float(conf['main']['kill after'])
+except:
+	errorExit("Something went wrong trying to convert the numbers in the "+
+		"[main] section of the configuration file.")
+
+debug(f"Restart after {backoff[0]:0.0f} .. {backoff[1]:0.0f} s, stable after "+
+	f"{backoff[2]:0.0f} s")
+
+# The programs run in threads import their modules from bin/
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+components = []
+for name in filter(None,[s.strip() for s in conf['main']['components'].split(',')]):
+	if not conf.has_section(name):
+		errorExit(f"Component {name} has no [{name}] section.")
+	try:
+		components.append(Component(name,conf[name],backoff))
+	except ValueError as e:
+		errorExit(f"[{name}]: {e}")
+	debug(f"Component {name}: {components[-1].kind} {components[-1].target}, "+
+		f"heartbeat deadline {components[-1].deadline:0.0f} s")
+
+if args.hang:
+	c = [c for c in components if c.name == args.hang[0]]
+	if len(c) == 0 or c[0].hb is None:
+		errorExit(f"{args.hang[0]} is not a component with a heartbeat.")
+	c[0].hb.inject(float(args.hang[1]))
+	print(f"{args.hang[0]} will hang for {args.hang[1]} s at its next heartbeat.")
+	sys.exit(0)
+
+watchdogLog = ''
+if ('main,watchdog log' in cfg):
+	watchdogLog = makeFilePath(conf['main']['watchdog log'])
+	debug(f"Watchdog log: {watchdogLog}")
+
+# After a restart because of a stuck thread (see restartSupervisor)
+if 'SUPERVISOR_RECOVERING' in os.environ:
+	(name,wall,detect) = os.environ.pop('SUPERVISOR_RECOVERING').split()
+	for c in components:
+		if c.name == name:
+			c.stalls = 1
+			c.detect = [float(detect)]
+			c.detectedAt = time.monotonic() - (time.time() - float(wall))
+
+lockfile = makeFilePath(conf['main']['lock file'])
+debug(f"Lock file: {lockfile}")
+
+# Profiling is switched off (the dumps are written) and on again with SIGUSR1
+profiledir = None
+if args.profile:
+	profiledir = makeFilePath(args.profile[0])
+	debug(f"Profile dumps: {profiledir}")
+prof = Profiler(profiledir,script)
+
+if not CreateProcessLock(lockfile):
+	errorExit(f'Unable to lock - {script} already running?')
+
+signal.signal(signal.SIGINT,signalHandler)
+signal.signal(signal.SIGTERM,signalHandler)
+signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
+                                           # controlling TTY, but handle it
+                                           # anyway
+if prof.enabled:
+	signal.signal(signal.SIGUSR1,prof.handler)
+prof.start()
+
+started = time.monotonic()
+lastStatus = 0.0
+
+while running:
+	now = time.monotonic()
+	changed = False
+	for c in components:
+		if c.state in ['running','stalled'] and not c.alive():
+			c.stopped(now)
+			changed = True
+		elif c.state == 'running' and c.watch(now):
+			c.stall(now,killAfter)
+			changed = True
+		elif c.state == 'stalled' and now >= c.killAt:
+			if c.kind == 'thread':
+				restartSupervisor(components,c)
+			print(ts(),f"{c.name} did not stop, killing it")
+			c.kill()
+			c.killAt = now + killAfter
+		elif c.state == 'waiting' and now >= c.nextStart:
+			c.start()
+			changed = True
+	if changed or now - lastStatus >= statusTime:
+		writeStatus(statusfile,components,started)
+		lastStatus = now
+	time.sleep(0.5)
+
+debug("Stopping the components")
+stopAll(components,stopTime)
+
+writeStatus(statusfile,components,started)
+
+prof.close()
+
+RemoveProcessLock(lockfile)
+
+print(ts(),script,'terminated.')
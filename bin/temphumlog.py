@@ -77,6 +77,182 @@
 # 2. Changed some format strings to f-strings.
 #
 # -----------------------------------------------------------------------------
+# Version: 0.1.7
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Serial data is read with LineReader (serialComms.py): everything that is
+#    waiting is read in one go and split into lines, instead of readline()
+#    and reading the command echo one byte at a time.
+# 2. The sensor data regular expression is compiled once.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.8
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The main program is in main(), with stop() to end it, so that
+#    supervisor.py can run it in a thread. Signal handlers are only set when
+#    running in the main thread.
+# 2. The UUCP lock and the lock file are always removed when the program
+#    ends, also when the serial port goes away. Sending a command to the
+#    controller gives up when the program has to stop.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.9
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Heartbeat (-b / --heartbeat, see heartbeat.py), updated every time
+#    through the main loop so supervisor.py can restart the program when it
+#    gets stuck.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.10
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The serial port is kept open by SerialTransport (serialComms.py): when
+#    no data arrives for the comms timeout, or the USB serial adapter goes
+#    away, the port is opened again (waiting longer after every failed try)
+#    instead of the program ending. The UUCP lock is kept. The setpoint (and
+#    BOOST) are sent again after a reconnect, and the gaps are logged.
+# 2. A command that could not be sent is sent again the next minute.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.11
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The files (data, status, command log, settings and class schedule) are
+#    written and read by a file worker thread (FileWorker), so a slow SD card
+#    no longer keeps the serial port from being read. The serial loop only
+#    queues the work of the minute and acts on the results when they come
+#    back. The longest time between serial port reads and the depth of the
+#    file queue are shown with -d.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.12
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Counters and timings (-m / --metrics, see metrics.py): lines parsed,
+#    parse failures, samples per minute, command round trip, file writes and
+#    serial port stalls.
+# 2. Debug output in the main loop is only formatted when debugging is on.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.13
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling while the program runs (-p / --profile, see profiling.py):
+#    SIGUSR1 stops it and writes the dumps, and starts it again.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.14
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. --capture: everything received from and sent to the serial port is
+#    written to a file (see Capture in serialComms.py), to replay it later
+#    with bench/replayCapture.py.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.15
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The time and day come from 'clock' (see clock.py), so that a week of
+#    control can be simulated (bench/simWeek.py).
+# 2. The booster decisions moved to checkBoost().
+# 3. readSchedule() asks for the time once, it could read the hour of one
+#    minute and the minute of the next.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.16
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Predictive booster ('mode = predictive' in the [boost] section of the
+#    configuration file): the heating rate is followed with every sample
+#    (SlopeTracker) and the booster is turned on at the last moment it can
+#    still get the room to the setpoint by the start of the class
+#    (checkBoostPredictive). 'mode = rule' (the default) keeps the 45, 30, 15
+#    and 2 minute checks.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.17
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The minute records, the commands sent and the mode changes reported by
+#    the controller also go into the database (see storage.py) when it is
+#    enabled in the [storage] section of the configuration file. They are
+#    written in one transaction every 'commit interval' seconds, by the file
+#    worker.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.18
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The mode changes for the database come from the minute records (see
+#    storage.py), at the time of the minute, as 'storage.py --import' makes
+#    them. They were at the second the controller reported them, so an import
+#    added every change again.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1.19
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Bug fix: the time of a minute record (data file, time stamp, database)
+#    and the time used to find the next class were taken when the file
+#    worker wrote the minute. After a slow disk, minutes that waited in the
+#    queue got the same time, or went into the file of the next day. The
+#    time is now taken when the minute is queued.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author:
 # Start date:
@@ -88,7 +264,6 @@
 #
 # -----------------------------------------------------------------------------
 
-import serial
 import signal
 import re
 import sys
@@ -99,20 +274,45 @@ import statistics
 import argparse
 import configparser
 import subprocess
+import threading
+import queue
+import sqlite3
+import math
 import dateutil.relativedelta
+from serialComms import SerialTransport, Capture
+from heartbeat import Heartbeat
+from metrics import Metrics
+from profiling import Profiler
+from clock import Clock
+import storage
 
 script = os.path.basename(__file__)
-VERSION = "0.1.6"
+VERSION = "0.1.19"
 AUTHORS = "Louis Marais"
 
 running = True
 DEBUG = False
+metrics = Metrics(None)  # see metrics.py, set up in main()
+clock = Clock()          # the time and day, see clock.py
+store = storage.Storage(None)  # the database, see storage.py, set up in main()
 logcommands = False
 
+# The predictive booster ([boost] in the configuration file): how much faster
+# (degC per minute) the booster heats, the minutes of slack kept, how far
+# before the class (minutes) it looks and the time constant (seconds) of the
+# heating rate
+BOOST = {'mode': 'rule','rate': 0.1,'margin': 2.0,'window': 60.0,'tau': 300.0}
+
+FILE_QUEUE = 10      # minutes of file work that may wait for the disk
+FILE_STOP_WAIT = 10  # seconds to wait for the file work still queued
+
 numbers = ['0','1','2','3','4','5','6','7','8','9','-']
 weekdays = ['MONDAY','TUESDAY','WEDNESDAY','THURSDAY','FRIDAY','SATURDAY',
 						'SUNDAY']
 
+# Line sent by the controller every second
+sensorPattern = re.compile(r'\s*(-*\d+\.\d+) degC,\s*(-*\d+.\d+) %RH,\s*dp\s*(-*\d+\.\d+) degC,\s*(-*\d+\.\d+) degC,\s*(-*\d+.\d+) %RH,\s*(-*\d+\.\d+) degC,\s*(\w+),\s*(\w+),\s*(\w+),\s*(\w+)')
+
 # -----------------------------------------------------------------------------
 # Sub routines
 # -----------------------------------------------------------------------------
@@ -121,6 +321,13 @@ def signalHandler(signal,frame):
 	running = False
 	return
 
+# -----------------------------------------------------------------------------
+# Asks main() to finish; used by supervisor.py, which runs main() in a thread
+def stop():
+	global running
+	running = False
+	return
+
 # -----------------------------------------------------------------------------
 def TestProcessLock(lockFile):
 	if (os.path.isfile(lockFile)):
@@ -200,8 +407,7 @@ def getSensorData(s):
 	temp = 9999.9
 	hum = 9999.9
 	dpnt = 9999.9
-	p = re.compile(r'\s*(-*\d+\.\d+) degC,\s*(-*\d+.\d+) %RH,\s*dp\s*(-*\d+\.\d+) degC,\s*(-*\d+\.\d+) degC,\s*(-*\d+.\d+) %RH,\s*(-*\d+\.\d+) degC,\s*(\w+),\s*(\w+),\s*(\w+),\s*(\w+)')
-	m = re.match(p,s)
+	m = sensorPattern.match(s)
 	tset = 0
 	hset = 0
 	dpset = 0
@@ -230,8 +436,10 @@ def addStr(s,t):
 	return(s)
 
 # -----------------------------------------------------------------------------
-def getMJD():
-	mjd = int(time.time()/86400) + 40587
+def getMJD(t=None):
+	if t is None:
+		t = clock.time()
+	mjd = int(t/86400) + 40587
 	return(mjd)
 
 # -----------------------------------------------------------------------------
@@ -249,13 +457,16 @@ def getAverage(d,lmt):
 	return(mn)
 
 # -----------------------------------------------------------------------------
-def save_send_data(t,h,dp,sn,t_cor,h_cor,t_set,h_set,dp_set,t_mode,h_mode,
+# 'now' is the time of the minute (when the serial loop finished it), not the
+# time the file worker gets to it
+def save_send_data(now,t,h,dp,sn,t_cor,h_cor,t_set,h_set,dp_set,t_mode,h_mode,
 									 v_mode,b_mode):
 	temp = getAverage(t,0.05)
 	hum = getAverage(h,0.05)
 	dpnt = getAverage(dp,0.05)
 	
-	flnm = datapath+str(getMJD())+'.dat'
+	now = int(now)
+	flnm = datapath+str(getMJD(now))+'.dat'
 	if not(os.path.exists(flnm)):
 		with open(flnm,"w") as f:
 			f.write('#Environmental sensor data\n')
@@ -267,7 +478,7 @@ def save_send_data(t,h,dp,sn,t_cor,h_cor,t_set,h_set,dp_set,t_mode,h_mode,
 					 '(degC) Temp_mode Hum_mode Vent_mode Boost_mode\n');
 			f.close()
 	with open(flnm,"a") as f:
-		s = datetime.datetime.utcnow().strftime("%H:%M:%S")
+		s = time.strftime("%H:%M:%S",time.gmtime(now))
 		s += f"{temp:14.2f} {hum:9.2f} {dpnt:8.2f} {t_set:8.2f} {h_set:7.2f} "
 		s += f"{dp_set:7.2f} {t_mode:>6s} {h_mode:>8s} {v_mode:>9s} "
 		s += f"{b_mode:>9s}\n"
@@ -276,6 +487,7 @@ def save_send_data(t,h,dp,sn,t_cor,h_cor,t_set,h_set,dp_set,t_mode,h_mode,
 		debug('temp = {:0.2f} degC written to {}'.format(temp,flnm))
 		debug('hum = {:0.2f} %RH written to {}'.format(hum,flnm))
 		debug('dew point = {:0.2f} degC written to {}'.format(dpnt,flnm))
+	store.minute(now,temp,hum,dpnt,t_set,h_set,dp_set,t_mode,h_mode,v_mode,b_mode)
 	return(temp,hum,dpnt)
 
 # -----------------------------------------------------------------------------
@@ -342,7 +554,7 @@ def checkSettingsFile(flnm):
 # Much of this repeats checkSettingsFile but right now I cannot think of a
 # better way...
 def checkControlFile(flnm):
-	now = datetime.datetime.now()
+	now = clock.now()
 	c_dow = weekdays[now.weekday()]
 	c_ts = now.weekday() * 1440 + now.hour * 60 + now.minute
 	newcmd = ""
@@ -376,34 +588,36 @@ def checkControlFile(flnm):
 	return(newcmd)
 
 # -----------------------------------------------------------------------------
+# Returns False if the command could not be sent (the controller is gone)
 def sendcmd(cmd):
 	debug(f"Command to send: {cmd.strip()}")
 	success = False
 	cmd = cmd.strip()+'\n'
-	while not success:
-		ser.write(cmd.encode('ascii'))
+	startT = time.monotonic()
+	while not success and running:
+		if not ser.write(cmd.encode('ascii')):
+			debug(f"Command not sent, no connection: {cmd.strip()}")
+			break
 		time.sleep(0.2)
-		retval = ""
-		while ser.in_waiting:
-			c = ser.read(1)
-			if int.from_bytes(c,byteorder='big',signed=False) >= 32:
-				retval = retval + c.decode('ascii')
-			else:
-				if retval == cmd.strip():
-					success = True
-			if c == b'\r':
-				break
+		# Anything else the controller sent in the mean time is dropped
+		if cmd.strip() in ser.readWaiting():
+			success = True
 		if success:
 			debug(f"Command sent to controller: {cmd.strip()}")
 			break
-	return
+	if success:
+		metrics.histogram('command round trip').observe(time.monotonic() - startT)
+		store.command(clock.time(),cmd.strip())
+	else:
+		metrics.counter('commands failed').inc()
+	return(success)
 
 # -----------------------------------------------------------------------------
 def savecommandlog(cmd,flnm):
 	debug("Saving command to log: {}".format(cmd))
 	with open(flnm,"a") as f:
 		f.write("{:30s} {}\n".
-			format(time.strftime("%Y-%m-%d %A %H:%M:%S",time.localtime()),cmd))
+			format(time.strftime("%Y-%m-%d %A %H:%M:%S",clock.localtime()),cmd))
 		f.close()
 	return
 
@@ -449,10 +663,12 @@ def loadSchedule(flnm):
 	return(schedule)
 
 # -----------------------------------------------------------------------------
-def readSchedule(sch):
-	cday = datetime.datetime.now().strftime('%A').upper()
-	hr = int(datetime.datetime.now().strftime('%H'))
-	mn = int(datetime.datetime.now().strftime('%M'))
+def readSchedule(sch,now=None):
+	if now is None:
+		now = clock.now()
+	cday = now.strftime('%A').upper()
+	hr = now.hour
+	mn = now.minute
 	tm = hr*60+mn
 	debug(f"Today is {cday}, and it is now {hr:2d}:{mn:02d}")
 	futureClass = 0
@@ -469,298 +685,611 @@ def readSchedule(sch):
 	return (futureClass)
 
 # -----------------------------------------------------------------------------
-# Main
-# -----------------------------------------------------------------------------
-
-parser = argparse.ArgumentParser(description="Reads data from TFTHP-1 type "+
-																 "environment sensor, averages and logs the "+
-																 "readings")
-parser.add_argument("-v","--version",action="store_true",help="Show version "+
-										"and exit.")
-parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
-										"configuration file. The default is "+
-										"~/etc/temphum.conf.")
-parser.add_argument("-s","--settings",nargs=1,help="Specify alternative "+
-										"settings file. The default is "+
-										"~/etc/temphum.settings.")
-parser.add_argument("-l","--log",action="store_true",
-										help="Write commands sent to log file.")
-parser.add_argument("-d","--debug",action="store_true",
-										help="Turn debugging on")
-
-args = parser.parse_args()
-
-if args.log:
-	logcommands = True
-
-if args.debug:
-	DEBUG = True
-
-versionStr = f"{script} version {VERSION} written by {AUTHORS}"
-
-if args.version:
-	print(versionStr)
-	sys.exit(0)
-
-debug(versionStr)
-
-HOME = os.path.expanduser('~')
-if not(HOME.endswith('/')):
-	HOME += '/'
-
-debug(f"Current user's home :{HOME}")
-
-configfile = HOME+"etc/temphum.conf"
-
-if args.config:
-	debug(f"Alternate config file specified: {args.config[0]}")
-	configfile = str(args.config[0])
-	if not configfile.startswith('/'):
-		configfile = HOME+configfile
-
-if not os.path.isfile(configfile):
-	errorExit(f"{configfile} does not exist.")
-
-debug(f"Configuration file: {configfile}")
-
-conf = configparser.ConfigParser()
-conf.read(configfile)
-
-settingsfile = HOME+"etc/temphum.settings"
-
-if args.settings:
-	debug(f"Alternate settings file specified: {str(args.settings[0])}")
-	settingsfile = str(args.settings[0])
-	if not settingsfile.startswith('/'):
-		settingsfile = HOME+settingsfile
-
-debug(f"Settings file: {settingsfile}")
-
-if not os.path.isfile(settingsfile):
-	errorExit(f"{settingsfile} does not exist.")
-
-if not checkSettingsFile(settingsfile):
-	errorExit(f"Issue with {settingsfile}. Check it carefully and try again")
-
-req = ['main,lock file','main,status file','main,logfile',
-			 'main,schedule config','comms,port','path,data',
-			 'sensor,serial number','sensor,temperature correction',
-			 'sensor,humidity correction']
-
-cfg = checkConfig(conf, req)
-
-port = conf['comms']['port']
-sn = conf['sensor']['serial number']
-try:
-	temp_cor = float(conf['sensor']['temperature correction'])
-	hum_cor = float(conf['sensor']['humidity correction'])
-except:
-	errorExit("Something went wrong trying to convert the numbers "+
-					  "in the settings file. Please check them carefully.")
-
-# Check if serial device present (it may be a USB device)
-if not os.path.exists(port):
-	errorExit(f"The serial device {port} does not exist")
-
-# Create UUCP lock for the serial port
-uucpLockPath='/var/lock'
-if ('paths,uucp lock' in cfg):
-	uucpLockPath = conf['paths']['uucp lock']
-
-ret = subprocess.check_output(['/usr/local/bin/lockport','-d',uucpLockPath,
-									 '-p',str(os.getpid()),port,sys.argv[0]]).decode('utf-8')
-
-if (re.match('1',ret)==None):
-	errorExit('Could not obtain a lock on ' + port + '.')
-
-if logcommands:
-	logfile = conf['main']['logfile']
-	if not logfile.startswith('/'):
-		logfile = HOME+logfile
-
-	debug("Commands log file: {}".format(logfile))
-
-scheduleConfig = conf['main']['schedule config']
-if not scheduleConfig.startswith('/'):
-	scheduleConfig = HOME+scheduleConfig
-
-if not os.path.isfile(scheduleConfig):
-	errorExit(f"Class schedule config file does not exist: {scheduleConfig}")
-
-debug(f"Class schedule config file: {scheduleConfig}")
-
-confSchedule = configparser.ConfigParser()
-confSchedule.read(scheduleConfig)
-
-# We only need one setting from the class schedule configuration, so no need
-# to check the whole file.
-
-if not confSchedule.has_option('schedule','file'):
-	errorExit("Class schedule config file is missing the ['shedule']"+
-					 "['file'] option.")
-
-scheduleFile = confSchedule['schedule']['file']
-if not scheduleFile.startswith('/'):
-	scheduleFile = HOME + scheduleFile
-
-if not os.path.isfile(scheduleFile):
-	errorExit(f"Class schedule file does not exist: {scheduleFile}")
-
-debug(f"Class schedule file: {scheduleFile}")
-
-lockfile = conf['main']['lock file']
-if not lockfile.startswith('/'):
-	lockfile = HOME+lockfile
-if not CreateProcessLock(lockfile):
-	errorExit(f'Unable to lock - {script} already running?')
-
-debug("Lock file: {}".format(lockfile))
-
-signal.signal(signal.SIGINT,signalHandler)
-signal.signal(signal.SIGTERM,signalHandler)
-signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
-                                           # controlling TTY, but handle it
-                                           # anyway
+# The booster, checked every minute. 'tm' is the time and 'classStart' the
+# start of the next class today, in minutes from midnight (0 if there is no
+# class later today). Returns the new state of the booster and the commands to
+# send to the controller.
+def checkBoost(tm,classStart,tset,t_ave,boost_on):
+	cmds = []
+	if DEBUG:
+		tn = f"{tm//60:02d}:{tm%60:02d}"
+		clst = (f"{classStart//60:02d}:"+
+			f"{classStart - ((classStart//60)*60):02d}")
+		debug(f"It is now {tn}; next class starts at: {clst}")
+		debug(f"Current temperature: {t_ave:0.2f} degC, setpoint:"+
+		f" {tset:0.1f} degC")
+	if tm <= classStart:
+		if not boost_on:
+			if tm + 45 >= classStart:
+				debug("45 min check. Check temperature and turn boost on "+
+							"if required")
+				if tset - t_ave >= 8:
+					boost_on = True
+					debug(f"Booster on because set temperature "+
+								f"({tset:0.1f} degC) is more than "+
+								"8 degC higher than actual temperature "+
+								f"({t_ave:0.2f} degC) 45 minutes before class.")
+			if tm + 30 >= classStart:
+				debug("30 min check. Check temperature and turn boost on "+
+							"if required")
+				if tset - t_ave >= 5:
+					boost_on = True
+					debug(f"Booster on because set temperature "+
+								f"({tset:0.1f} degC) is more than "+
+								"5 degC higher than actual temperature "+
+								f"({t_ave:0.2f} degC) 30 minutes before class.")
+			if tm + 15 >= classStart:
+				debug("15 min check. Check temperature and turn boost on "+
+							"if required")
+				if tset - t_ave >= 2:
+					boost_on = True
+					debug(f"Booster on because set temperature "+
+								f"({tset:0.1f} degC) is more than "+
+								"2 degC higher than actual temperature "+
+								f"({t_ave:0.2f} degC) 15 minutes before class.")
+			if tm + 2 >= classStart:
+				debug("2 min check. Check temperature and turn boost on "+
+							"if required")
+				if tset > t_ave:
+					boost_on = True
+					debug(f"Booster on because set temperature "+
+								f"({tset:0.1f} degC) is more than actual "+
+								f"temperature ({t_ave:0.2f} degC) 2 minutes "+
+								"before class.")
+			if boost_on:
+				cmds.append("BOOST ON")
+	if boost_on:
+		debug("BOOSTER ON: Checking temperatures. Setpoint: "+
+					f"{tset:0.1f} degC, actual value: {t_ave:0.2f} degC.")
+		if t_ave >= tset:
+			debug(f"Temperature ({t_ave:0.2f} degC) has reached setpoint"+
+				f" ({tset:0.1f} degC), turning BOOSTER off.")
+			boost_on = False
+			cmds.append("BOOST OFF")
+	return(boost_on,cmds)
 
-datapath = makePath(conf['path']['data'])
-checkPath(datapath)
-debug(f"Data will be stored in {datapath}")
+# -----------------------------------------------------------------------------
+# The slope of the temperature, a least squares line through the samples with
+# the older ones weighted less (exponentially, time constant 'tau' seconds).
+# The sums are kept with the time counted from the last sample, so a sample
+# costs the same however long it runs.
+class SlopeTracker:
+
+	def __init__(self,tau):
+		self.tau = tau
+		self.t = None
+		self.sw = 0.0   # sum of the weights, and weighted sums of t, y, t*t, t*y
+		self.st = 0.0
+		self.sy = 0.0
+		self.stt = 0.0
+		self.sty = 0.0
+
+	def add(self,t,y):
+		if self.t is not None:
+			dt = t - self.t
+			# Count the time from t, then weigh everything down
+			self.stt = self.stt - 2*dt*self.st + dt*dt*self.sw
+			self.sty = self.sty - dt*self.sy
+			self.st = self.st - dt*self.sw
+			a = math.exp(-dt/self.tau)
+			self.sw *= a
+			self.st *= a
+			self.sy *= a
+			self.stt *= a
+			self.sty *= a
+		self.sw += 1.0
+		self.sy += y
+		self.t = t
+		return
+
+	# degC per minute, None while there is too little to go on
+	def slope(self):
+		if self.sw < 2.0:
+			return(None)
+		mt = self.st/self.sw
+		var = self.stt/self.sw - mt*mt
+		if var <= 1.0:
+			return(None)
+		return((self.sty/self.sw - mt*self.sy/self.sw)/var*60.0)
+
+	# The temperature on the line now (less noisy than the last sample)
+	def value(self):
+		if self.sw <= 0.0:
+			return(None)
+		s = self.slope()
+		if s is None:
+			return(self.sy/self.sw)
+		return(self.sy/self.sw - s/60.0*self.st/self.sw)
 
-statusfile = makeFilePath(conf['main']['status file'])
-debug(f"Current temperature / humidity will be stored in {statusfile}")
+# -----------------------------------------------------------------------------
+# The predictive booster, checked with every sample. 'tm' (minutes from
+# midnight, with the seconds) and 'classStart' as for checkBoost; 'slope' is
+# the heating rate (degC / minute, SlopeTracker). The booster goes on when,
+# even with the booster, the room would only just reach the setpoint by the
+# start of the class, less BOOST['margin'] minutes; it goes off when the
+# setpoint is reached, like checkBoost.
+def checkBoostPredictive(tm,classStart,tset,temp,slope,boost_on):
+	cmds = []
+	if not boost_on and tm <= classStart and tm + BOOST['window'] >= classStart:
+		gap = tset - temp
+		left = classStart - tm - BOOST['margin']
+		rate = max(slope if slope is not None else 0.0,0.0) + BOOST['rate']
+		if gap > 0 and rate*left <= gap:
+			boost_on = True
+			debug(f"Booster on: {gap:0.2f} degC to go in {classStart - tm:0.1f} "+
+				f"minutes, heating at {rate - BOOST['rate']:0.3f} degC/min without "+
+				"the booster")
+			cmds.append("BOOST ON")
+	if boost_on and temp >= tset:
+		debug(f"Temperature ({temp:0.2f} degC) has reached setpoint"+
+			f" ({tset:0.1f} degC), turning BOOSTER off.")
+		boost_on = False
+		cmds.append("BOOST OFF")
+	return(boost_on,cmds)
 
-t = 9999.9
-h = 9999.9
-dp = 9999.9
+# -----------------------------------------------------------------------------
+# Writes (and reads) the files for the serial loop, so that a slow SD card
+# never keeps the serial port from being read. Jobs are (function, arguments),
+# done in order; what a job returns (or the exception it raised) is given back
+# by results(). The queue is kept short: when the disk can not keep up for
+# FILE_QUEUE minutes something is wrong, and the minute is dropped.
+class FileWorker(threading.Thread):
+
+	def __init__(self,size=FILE_QUEUE):
+		super().__init__(daemon=True)
+		self.jobs = queue.Queue(size)
+		self.done = queue.Queue()
+		self.maxDepth = 0    # deepest the queue was
+		self.dropped = 0     # jobs that did not fit in the queue
+		self.longest = 0.0   # longest time a job took (s)
+		self.total = 0       # jobs done
+
+	def put(self,fn,*args):
+		try:
+			self.jobs.put_nowait((fn,args))
+		except queue.Full:
+			self.dropped += 1
+			metrics.counter('file jobs dropped').inc()
+			return(False)
+		self.maxDepth = max(self.maxDepth,self.jobs.qsize())
+		return(True)
+
+	# What the jobs that returned something returned, or raised
+	def results(self):
+		r = []
+		while True:
+			try:
+				r.append(self.done.get_nowait())
+			except queue.Empty:
+				return(r)
+
+	def run(self):
+		while True:
+			job = self.jobs.get()
+			if job is None:
+				break
+			(fn,args) = job
+			startT = time.monotonic()
+			try:
+				r = fn(*args)
+			except (SystemExit,Exception) as e:
+				print(ts(),f"File worker: {fn.__name__} failed: {e!r}")
+				r = e
+			t = time.monotonic() - startT
+			self.longest = max(self.longest,t)
+			self.total += 1
+			metrics.histogram('file write').observe(t)
+			if r is not None:
+				self.done.put(r)
+		return
+
+	# Does the jobs still queued, then ends
+	def stop(self,timeout):
+		self.jobs.put(None)
+		self.join(timeout)
+		return
+
+	def describe(self):
+		return(f"file queue {self.jobs.qsize()} (max {self.maxDepth}), "+
+			f"{self.dropped} dropped, {self.total} jobs, longest "+
+			f"{self.longest*1000:0.1f} ms")
 
-tmps = []
-hums = []
-dewp = []
+# -----------------------------------------------------------------------------
+# The file work of every minute, done by the FileWorker: the data and status
+# files, the settings file and the class schedule (loaded again when the file
+# changed; sched holds the schedule and the time of the file). 'now' is the
+# time of the minute, taken when it was queued. Returns what the control of
+# the controller needs.
+def minuteFiles(now,tmps,hums,dewp,sn,temp_cor,hum_cor,tset,hset,dpset,tm,hm,
+	vm,bm,statusfile,settingsfile,scheduleFile,sched):
+	(t_ave,h_ave,dp_ave) = save_send_data(now,tmps,hums,dewp,sn,temp_cor,hum_cor,
+		tset,hset,dpset,tm,hm,vm,bm)
+	saveStatus(statusfile,t_ave,h_ave,dp_ave)
+	newcmd = checkControlFile(settingsfile)
+	ft = getFileTime(scheduleFile)
+	if not ft == sched['time']: # check if class schedule file has changed
+		sched['classes'] = loadSchedule(scheduleFile)
+		sched['time'] = ft
+	classStart = readSchedule(sched['classes'],
+		datetime.datetime.fromtimestamp(now))
+	store.flush()
+	return(t_ave,h_ave,dp_ave,tset,newcmd,classStart)
 
-oldmin = datetime.datetime.utcnow().minute
-oldcmd = ""
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
 
-oldft = 0
-classStart = 0
-boost_on = False
 
-t_out = 10.0
-if ('comms,timeout' in cfg):
-	t_out = float(conf['comms']['timeout'])
+def main(argv=None):
+	global DEBUG, HOME, logcommands, datapath, ser, running, metrics, store
+
+	running = True
+
+	parser = argparse.ArgumentParser(description="Reads data from TFTHP-1 type "+
+																	 "environment sensor, averages and logs the "+
+																	 "readings")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/temphum.conf.")
+	parser.add_argument("-s","--settings",nargs=1,help="Specify alternative "+
+											"settings file. The default is "+
+											"~/etc/temphum.settings.")
+	parser.add_argument("-l","--log",action="store_true",
+											help="Write commands sent to log file.")
+	parser.add_argument("-b","--heartbeat",nargs=1,help="Heartbeat file, "+
+											"updated every time through the main loop (set by "+
+											"supervisor.py).")
+	parser.add_argument("-m","--metrics",nargs=1,help="Write counters and "+
+											"timings to this file every minute (see "+
+											"metrics.py).")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when "+
+											"SIGUSR1 is received or the program ends (see "+
+											"profiling.py).")
+	parser.add_argument("--capture",nargs=1,help="Write everything received "+
+											"from and sent to the serial port to this file, "+
+											"to replay it later (see bench/replayCapture.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.log:
+		logcommands = True
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = f"{script} version {VERSION} written by {AUTHORS}"
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	debug(f"Current user's home :{HOME}")
+
+	# supervisor.py watches the heartbeat to see that the program is not stuck
+	heartbeatfile = None
+	if args.heartbeat:
+		heartbeatfile = makeFilePath(args.heartbeat[0])
+		debug(f"Heartbeat file: {heartbeatfile}")
+	hb = Heartbeat(heartbeatfile)
+
+	metricsfile = None
+	if args.metrics:
+		metricsfile = makeFilePath(args.metrics[0])
+		debug(f"Metrics file: {metricsfile}")
+	metrics = Metrics(metricsfile,script)
+
+	# Profiling is switched off (the dumps are written) and on again with
+	# SIGUSR1
+	profiledir = None
+	if args.profile:
+		profiledir = makeFilePath(args.profile[0])
+		debug(f"Profile dumps: {profiledir}")
+	prof = Profiler(profiledir,script)
 
-debug("Serial communications timeout is {:.1f} s.".format(t_out))
+	capturefile = None
+	if args.capture:
+		capturefile = makeFilePath(args.capture[0])
+		checkPath(os.path.dirname(capturefile))
+		debug(f"Serial traffic captured in {capturefile}")
+
+	configfile = HOME+"etc/temphum.conf"
+
+	if args.config:
+		debug(f"Alternate config file specified: {args.config[0]}")
+		configfile = str(args.config[0])
+		if not configfile.startswith('/'):
+			configfile = HOME+configfile
+
+	if not os.path.isfile(configfile):
+		errorExit(f"{configfile} does not exist.")
+
+	debug(f"Configuration file: {configfile}")
+
+	conf = configparser.ConfigParser()
+	conf.read(configfile)
+
+	settingsfile = HOME+"etc/temphum.settings"
+
+	if args.settings:
+		debug(f"Alternate settings file specified: {str(args.settings[0])}")
+		settingsfile = str(args.settings[0])
+		if not settingsfile.startswith('/'):
+			settingsfile = HOME+settingsfile
+
+	debug(f"Settings file: {settingsfile}")
+
+	if not os.path.isfile(settingsfile):
+		errorExit(f"{settingsfile} does not exist.")
+
+	if not checkSettingsFile(settingsfile):
+		errorExit(f"Issue with {settingsfile}. Check it carefully and try again")
+
+	req = ['main,lock file','main,status file','main,logfile',
+				 'main,schedule config','comms,port','path,data',
+				 'sensor,serial number','sensor,temperature correction',
+				 'sensor,humidity correction']
+
+	cfg = checkConfig(conf, req)
+
+	port = conf['comms']['port']
+	sn = conf['sensor']['serial number']
+	try:
+		temp_cor = float(conf['sensor']['temperature correction'])
+		hum_cor = float(conf['sensor']['humidity correction'])
+	except:
+		errorExit("Something went wrong trying to convert the numbers "+
+						  "in the settings file. Please check them carefully.")
 
-debug('Opening '+port)
+	# Check if serial device present (it may be a USB device)
+	if not os.path.exists(port):
+		errorExit(f"The serial device {port} does not exist")
 
-with serial.Serial(port,115200,timeout = t_out) as ser:
-	readtime = time.time()
-	while running:
-		line = ser.readline()
-		if (time.time() - readtime) > t_out:
-			print("Error! Serial timeout waiting for data.")
-			ser.close()
-			break
-		readtime = time.time()
-		s = line.decode().strip()
-		if s != "":
-			if s[0] in numbers:
-				(t,h,dp,tset,hset,dpset,tm,hm,vm,bm) = getSensorData(s)
-				if (t != 9999.9) and (h != 9999.9) and (dp != 9999.9):
-					tmps.append(t)
-					hums.append(h)
-					dewp.append(dp)
-					mn = datetime.datetime.utcnow().minute
-					if mn != oldmin:
-						(t_ave,h_ave,dp_ave) = save_send_data(tmps,hums,dewp,sn,temp_cor,
-																						hum_cor,tset,hset,dpset,tm,hm,vm,bm)
-						tmps.clear()
-						hums.clear()
-						dewp.clear()
-						oldmin = mn
-						saveStatus(statusfile,t_ave,h_ave,dp_ave)
-						# Check the settings file to see if new command must be sent to the
-						# controller.
-						newcmd = checkControlFile(settingsfile)
-						if not newcmd == "":
-							if not newcmd == oldcmd:
-								sendcmd(newcmd)
-								if logcommands:
-									savecommandlog(newcmd,logfile)
-								oldcmd = newcmd
-							else:
-								debug("Current command is still valid: {}".format(oldcmd))
-						# New code (from ver 0.1.6) for booster
-						hr = int(datetime.datetime.now().strftime('%H'))
-						mn = int(datetime.datetime.now().strftime('%M'))
-						# To easily compare times, we count time as minutes from the start
-						# of the current day
-						tm = hr*60+mn
-						ft = getFileTime(scheduleFile)
-						if not ft == oldft: # check if class schedule file has changed
-							sch = loadSchedule(scheduleFile)
-							oldft = ft
-						classStart = readSchedule(sch)
-						tn = time.strftime('%H:%M',time.localtime())
-						clst = (f"{classStart//60:02d}:"+
-							f"{classStart - ((classStart//60)*60):02d}")
-						debug(f"It is now {tn}; next class starts at: {clst}")
-						debug(f"Current temperature: {t_ave:0.2f} degC, setpoint:"+
-						f" {tset:0.1f} degC")
-						if tm <= classStart:
-							if not boost_on:
-								if tm + 45 >= classStart:
-									debug("45 min check. Check temperature and turn boost on "+
-												"if required")
-									if tset - t_ave >= 8:
-										boost_on = True
-										debug(f"Booster on because set temperature "+
-													f"({tset:0.1f} degC) is more than "+
-													"8 degC higher than actual temperature "+
-													f"({t_ave:0.2f} degC) 45 minutes before class.")
-								if tm + 30 >= classStart:
-									debug("30 min check. Check temperature and turn boost on "+
-												"if required")
-									if tset - t_ave >= 5:
-										boost_on = True
-										debug(f"Booster on because set temperature "+
-													f"({tset:0.1f} degC) is more than "+
-													"5 degC higher than actual temperature "+
-													f"({t_ave:0.2f} degC) 30 minutes before class.")
-								if tm + 15 >= classStart:
-									debug("15 min check. Check temperature and turn boost on "+
-												"if required")
-									if tset - t_ave >= 2:
-										boost_on = True
-										debug(f"Booster on because set temperature "+
-													f"({tset:0.1f} degC) is more than "+
-													"2 degC higher than actual temperature "+
-													f"({t_ave:0.2f} degC) 15 minutes before class.")
-								if tm + 2 >= classStart:
-									debug("2 min check. Check temperature and turn boost on "+
-												"if required")
-									if tset > t_ave:
-										boost_on = True
-										debug(f"Booster on because set temperature "+
-													f"({tset:0.1f} degC) is more than actual "+
-													f"temperature ({t_ave:0.2f} degC) 2 minutes "+
-													"before class.")
-								if boost_on:
-									sendcmd("BOOST ON")
-									debug("BOOST is now turned ON")
-						if boost_on:
-							debug("BOOSTER ON: Checking temperatures. Setpoint: "+
-										f"{tset:0.1f} degC, actual value: {t_ave:0.2f} degC.")
-							if t_ave >= tset:
-								debug(f"Temperature ({t_ave:0.2f} degC) has reached setpoint"+
-									f" ({tset:0.1f} degC), turning BOOSTER off.")
-								boost_on = False
-								sendcmd("BOOST OFF")
-								debug("BOOST is now turned OFF")
-		time.sleep(0.1)
-	ser.close()
-	
-subprocess.check_output(['/usr/local/bin/lockport','-r',port]) 
+	if logcommands:
+		logfile = conf['main']['logfile']
+		if not logfile.startswith('/'):
+			logfile = HOME+logfile
 
-RemoveProcessLock(lockfile)
+		debug("Commands log file: {}".format(logfile))
 
-print(f"{ts()} {script} terminated.")
+	scheduleConfig = conf['main']['schedule config']
+	if not scheduleConfig.startswith('/'):
+		scheduleConfig = HOME+scheduleConfig
+
+	if not os.path.isfile(scheduleConfig):
+		errorExit(f"Class schedule config file does not exist: {scheduleConfig}")
+
+	debug(f"Class schedule config file: {scheduleConfig}")
+
+	confSchedule = configparser.ConfigParser()
+	confSchedule.read(scheduleConfig)
+
+	# We only need one setting from the class schedule configuration, so no need
+	# to check the whole file.
+
+	if not confSchedule.has_option('schedule','file'):
+		errorExit("Class schedule config file is missing the ['shedule']"+
+						 "['file'] option.")
+
+	scheduleFile = confSchedule['schedule']['file']
+	if not scheduleFile.startswith('/'):
+		scheduleFile = HOME + scheduleFile
+
+	if not os.path.isfile(scheduleFile):
+		errorExit(f"Class schedule file does not exist: {scheduleFile}")
+
+	debug(f"Class schedule file: {scheduleFile}")
+
+	datapath = makePath(conf['path']['data'])
+	checkPath(datapath)
+	debug(f"Data will be stored in {datapath}")
+
+	statusfile = makeFilePath(conf['main']['status file'])
+	debug(f"Current temperature / humidity will be stored in {statusfile}")
+
+	if conf.has_section('boost'):
+		try:
+			for k in ['rate','margin','window','tau']:
+				BOOST[k] = conf['boost'].getfloat(k,fallback=BOOST[k])
+		except ValueError:
+			errorExit("Something went wrong trying to convert the numbers in the "+
+				"[boost] section of the configuration file.")
+		BOOST['mode'] = conf['boost'].get('mode','rule').strip().lower()
+	if not BOOST['mode'] in ['rule','predictive']:
+		errorExit(f"Unknown booster mode (rule or predictive): {BOOST['mode']}")
+	debug(f"Booster: {BOOST}")
+	slope = SlopeTracker(BOOST['tau'])
+
+	try:
+		store = storage.fromConfig(conf,HOME,script)
+	except (sqlite3.Error,ValueError) as e:
+		errorExit(f"Could not open the database: {e}")
+	if store.enabled:
+		debug(f"Data also stored in {store.dbfile}, committed every "+
+			f"{store.interval:0.0f} s")
+
+	t = 9999.9
+	h = 9999.9
+	dp = 9999.9
+
+	tmps = []
+	hums = []
+	dewp = []
+
+	oldmin = clock.utcnow().minute
+	oldcmd = ""
+
+	sched = {'time':0,'classes':[]} # class schedule, kept by minuteFiles
+	classStart = 0
+	boost_on = False
+
+	t_out = 10.0
+	if ('comms,timeout' in cfg):
+		t_out = float(conf['comms']['timeout'])
+
+	debug("Serial communications timeout is {:.1f} s.".format(t_out))
+
+	# Create UUCP lock for the serial port
+	uucpLockPath='/var/lock'
+	if ('paths,uucp lock' in cfg):
+		uucpLockPath = conf['paths']['uucp lock']
+
+	ret = subprocess.check_output(['/usr/local/bin/lockport','-d',uucpLockPath,
+										 '-p',str(os.getpid()),port,sys.argv[0]]).decode('utf-8')
+
+	if (re.match('1',ret)==None):
+		errorExit('Could not obtain a lock on ' + port + '.')
+
+	lockfile = conf['main']['lock file']
+	if not lockfile.startswith('/'):
+		lockfile = HOME+lockfile
+	if not CreateProcessLock(lockfile):
+		subprocess.check_output(['/usr/local/bin/lockport','-r',port])
+		errorExit(f'Unable to lock - {script} already running?')
+
+	debug("Lock file: {}".format(lockfile))
+
+	# Signals can only be handled in the main thread; when this runs as a thread
+	# of supervisor.py the supervisor calls stop() instead.
+	if threading.current_thread() is threading.main_thread():
+		signal.signal(signal.SIGINT,signalHandler)
+		signal.signal(signal.SIGTERM,signalHandler)
+		signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
+		                                           # controlling TTY, but handle
+		                                           # it anyway
+		if prof.enabled:
+			signal.signal(signal.SIGUSR1,prof.handler)
+	prof.start()
+
+	debug('Opening '+port)
+
+	files = FileWorker()
+
+	# The locks are always released, also when the serial port goes away
+	capture = None
+	try:
+		if capturefile is not None:
+			capture = Capture(capturefile,script)
+		# Reads wait at most a second; if nothing arrives for t_out seconds the
+		# port is opened again
+		ser = SerialTransport(port,115200,min(t_out,1.0),t_out,capture=capture)
+		files.start()
+		connects = 0
+		busyT = 0.0     # monotonic time the last read returned
+		maxStall = 0.0  # longest time between reads, in the last minute
+		while running:
+			hb.beat()
+			if busyT > 0.0:
+				maxStall = max(maxStall,time.monotonic() - busyT)
+			lines = ser.read()
+			busyT = time.monotonic()
+			metrics.tick()
+			for r in files.results():
+				if isinstance(r,BaseException):
+					sys.exit(1)  # the file worker printed what went wrong
+				(t_ave,h_ave,dp_ave,tset,newcmd,classStart) = r
+				# Check the settings file to see if new command must be sent to the
+				# controller.
+				if not newcmd == "":
+					if not newcmd == oldcmd:
+						# If it could not be sent it is sent again next time
+						if sendcmd(newcmd):
+							if logcommands:
+								files.put(savecommandlog,newcmd,logfile)
+							oldcmd = newcmd
+					else:
+						debug("Current command is still valid: {}".format(oldcmd))
+				# New code (from ver 0.1.6) for booster
+				now = clock.now()
+				# To easily compare times, we count time as minutes from the start
+				# of the current day
+				tm = now.hour*60+now.minute
+				if BOOST['mode'] == 'rule':
+					(boost_on,cmds) = checkBoost(tm,classStart,tset,t_ave,boost_on)
+					for cmd in cmds:
+						sendcmd(cmd)
+						debug(f"BOOST is now turned {cmd.split()[1]}")
+			if len(lines) == 0:
+				continue
+			if ser.connects != connects:
+				if connects > 0:
+					# The port was opened again, the controller may have restarted:
+					# send the settings (and BOOST) again
+					oldcmd = ""
+					if boost_on:
+						sendcmd("BOOST ON")
+				connects = ser.connects
+				metrics.gauge('serial connects').set(connects)
+			for s in lines:
+				s = s.strip()
+				if s != "":
+					if s[0] in numbers:
+						(t,h,dp,tset,hset,dpset,tm,hm,vm,bm) = getSensorData(s)
+						if (t != 9999.9) and (h != 9999.9) and (dp != 9999.9):
+							metrics.counter('lines parsed').inc()
+							tmps.append(t)
+							hums.append(h)
+							dewp.append(dp)
+							if BOOST['mode'] == 'predictive':
+								slope.add(clock.monotonic(),t)
+								now = clock.now()
+								(boost_on,cmds) = checkBoostPredictive(now.hour*60 + now.minute +
+									now.second/60,classStart,tset,slope.value(),slope.slope(),boost_on)
+								for cmd in cmds:
+									sendcmd(cmd)
+									debug(f"BOOST is now turned {cmd.split()[1]}")
+							mn = clock.utcnow().minute
+							if mn != oldmin:
+								metrics.gauge('samples per minute').set(len(tmps))
+								metrics.gauge('serial stall max').set(maxStall)
+								metrics.gauge('file queue max').set(files.maxDepth)
+								# The files are written (and read) by the file worker, the serial
+								# port is read in the mean time. What the control needs comes back
+								# with files.results().
+								if not files.put(minuteFiles,clock.time(),list(tmps),list(hums),
+									list(dewp),sn,temp_cor,hum_cor,tset,hset,dpset,tm,hm,vm,bm,
+									statusfile,settingsfile,scheduleFile,sched):
+									print(ts(),"File worker queue full, the data of this minute is lost")
+								tmps.clear()
+								hums.clear()
+								dewp.clear()
+								oldmin = mn
+								if DEBUG:
+									debug(f"Serial loop: longest stall {maxStall*1000:0.1f} ms in the "+
+										f"last minute; {files.describe()}")
+								maxStall = 0.0
+						else:
+							metrics.counter('parse failures').inc()
+					else:
+						metrics.counter('other lines').inc()
+		debug(f"Serial port: {ser.stats()}")
+		ser.close()
+	finally:
+		if files.is_alive():
+			files.stop(FILE_STOP_WAIT)
+		debug(f"File worker: {files.describe()}")
+		store.close()
+		if store.enabled:
+			debug(f"Database: {store.describe()}")
+		hb.close()
+		metrics.close()
+		prof.close()
+		if capture is not None:
+			capture.close()
+		subprocess.check_output(['/usr/local/bin/lockport','-r',port])
+		RemoveProcessLock(lockfile)
+
+	print(f"{ts()} {script} terminated.")
+
+if __name__ == "__main__":
+	main()
@@ -12,6 +12,138 @@
 # Last: 2023-12-24
 #
 # -----------------------------------------------------------------------------
+# Version: 0.0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. No more new Adafruit_IO Client and four separate requests every minute.
+#    A single client (AdafruitClient) keeps its connection open and all the
+#    feeds are sent in one request (group data). The Adafruit IO URL, group
+#    and timeout can be set in the configuration file.
+# 2. The time each upload takes is recorded (shown with debug).
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Data is no longer lost when Adafruit IO can not be reached. Every data
+#    point goes into a queue on disk (uploadQueue.py) with the time it was
+#    read and is removed only once it was uploaded. After an outage the
+#    queue is sent oldest first, limited to a number of points per minute.
+#    The queue has a maximum size, the oldest points are thrown away first.
+#    See the [queue] section in upload.conf.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.4
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Uploads are done by a worker thread (UploadWorker), the main loop only
+#    reads the status files and queues the data, so a network that hangs
+#    can no longer stop data from being queued.
+# 2. Each upload cycle has a deadline ([queue] cycle deadline), no new
+#    request is started after it.
+# 3. A watchdog in the main loop replaces a worker that is stuck in one
+#    request for longer than [adafruit] watchdog seconds, or that died. The
+#    old worker is told to stop and left to finish its request and exit on
+#    its own. Points it was sending stay in the queue and are sent again.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.5
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The data can go to more places than Adafruit IO: the sinks listed in
+#    [main] sinks, each configured in its own section (see uploadSinks.py
+#    and upload.conf). Adafruit IO, MQTT, InfluxDB, HTTP and a local file
+#    are supported. All sinks get every data point, and each one is sent
+#    to at the same time with its own batch size, rate, timeout, retries
+#    and watchdog. A sink that is slow or down does not delay the others,
+#    the queue keeps its points until it is back.
+# 2. The feed names can be set in the [feeds] section.
+# 3. The rate and batch settings moved from [queue] to the sink sections.
+#    The worker watchdog is now [queue] watchdog, the time an upload cycle
+#    may take; the watchdog of a sink replaces a connection that hangs.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.6
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The sinks keep to the rate limit of the service (the configured rate,
+#    or the limit in the response headers) and can leave out points that
+#    did not change more than a deadband (see uploadSchedule.py and the
+#    'deadband' and 'heartbeat' options in upload.conf). When the budget is
+#    short the fastest changing feeds go first.
+# 2. After every upload cycle the freshness of every feed (how old the
+#    newest point each sink has sent is) is written to [main] report.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.7
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The main program is in main(), with stop() to end it, so that
+#    supervisor.py can run it in a thread. Signal handlers are only set when
+#    running in the main thread. The lock file is always removed when the
+#    program ends.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.8
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Heartbeat (-b / --heartbeat, see heartbeat.py), updated every time
+#    through the main loop so supervisor.py can restart the program when it
+#    gets stuck.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.9
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Counters and timings (-m / --metrics, see metrics.py): upload latency and
+#    points sent per sink, the queue depth and the time an upload cycle takes.
+# 2. The queue depth is only looked up for the debug output when debugging
+#    is on.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.0.10
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling while the program runs (-p / --profile, see profiling.py):
+#    SIGUSR1 stops it and writes the dumps, and starts it again.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author:
 # Start date:
@@ -20,6 +152,7 @@
 # Modifications:
 # ~~~~~~~~~~~~~~
 # 1.
+#
 # -----------------------------------------------------------------------------
 
 import os
@@ -28,13 +161,20 @@ import time
 import argparse
 import configparser
 import signal
-from Adafruit_IO import Client, Feed
+import threading
+import asyncio
+from uploadQueue import UploadQueue
+from uploadSinks import makeSinks, drainSinks
+from heartbeat import Heartbeat
+from metrics import Metrics
+from profiling import Profiler
 
 script = os.path.basename(__file__)
-VERSION = "0.0.1"
+VERSION = "0.0.10"
 AUTHORS = "Louis Marais"
 
 DEBUG = False
+metrics = Metrics(None)  # see metrics.py, set up in main()
 
 # -----------------------------------------------------------------------------
 # Sub routines
@@ -44,6 +184,13 @@ def signalHandler(signal,frame):
 	running = False
 	return
 
+# -----------------------------------------------------------------------------
+# Asks main() to finish; used by supervisor.py, which runs main() in a thread
+def stop():
+	global running
+	running = False
+	return
+
 # -----------------------------------------------------------------------------
 def TestProcessLock(lockFile):
 	if (os.path.isfile(lockFile)):
@@ -124,159 +271,386 @@ def getMJD():
 	return(mjd)
 
 # -----------------------------------------------------------------------------
-def send_data(conf,thflnm,eco2flnm):
-	try:
-		key = conf['adafruit']['key']
-		user = conf['adafruit']['user']
-		aio = Client(user, key)
-		if os.path.isfile(thflnm):
-			with open(thflnm,"r") as f:
-				s = f.readline()
-				f.close()
+# Sends the queued points to the sinks in its own thread. The worker has its
+# own sinks and its own connection to the queue database. wake() starts an
+# upload cycle, stop() asks the worker to exit after the current cycle. Every
+# send is bounded by the timeout of its sink, a worker that still hangs is
+# abandoned (it is a daemon thread).
+class UploadWorker(threading.Thread):
+
+	def __init__(self,n,sinks,queuefile,maxPoints,cycleTime,reportfile):
+		super().__init__(name=f"upload-{n}",daemon=True)
+		self.sinks = sinks
+		self.reportfile = reportfile
+		self.queuefile = queuefile
+		self.maxPoints = maxPoints
+		self.cycleTime = cycleTime
+		self.wakeup = threading.Event()
+		self.stopping = threading.Event()
+		self.cycleStart = 0.0 # monotonic time the current cycle started, 0
+		                      # when the worker is waiting
+		self.cycles = 0
+
+	def run(self):
+		queue = UploadQueue(self.queuefile,self.maxPoints,
+			[sink.name for sink in self.sinks])
+		while not self.stopping.is_set():
+			self.wakeup.wait()
+			self.wakeup.clear()
+			if self.stopping.is_set():
+				break
+			self.cycleStart = time.monotonic()
+			sent = asyncio.run(drainSinks(self.sinks,queue,
+				self.cycleStart + self.cycleTime,self.stopping))
+			self.cycles += 1
+			metrics.histogram('upload cycle').observe(time.monotonic() -
+				self.cycleStart)
+			if metrics.enabled:
+				for sink in self.sinks:
+					metrics.counter(f"points sent {sink.name}").inc(sent[sink.name])
+					metrics.gauge(f"queue depth {sink.name}").set(queue.depth(sink.name))
+			if DEBUG:
+				for sink in self.sinks:
+					debug(f"{self.name} {sink.name}: {sent[sink.name]} points sent, "+
+						f"{queue.depth(sink.name)} waiting; {sink.stats()}")
+				debug(f"{self.name}: cycle took "+
+					f"{time.monotonic() - self.cycleStart:0.2f} s")
+			self.report(queue)
+			self.cycleStart = 0.0
+		queue.close()
+		for sink in self.sinks:
+			sink.shutdown()
+		return
+
+	# How fresh the data of each sink is, in the report file and with debug
+	def report(self,queue):
+		lines = [f"{ts()}"]
+		for sink in self.sinks:
+			lines.append(f"[{sink.name}] {queue.depth(sink.name)} points waiting, "+
+				sink.schedule.budget.describe())
+			lines += ['  '+l for l in sink.schedule.report(time.time())]
+		for l in lines[1:]:
+			debug(l)
+		if self.reportfile:
 			try:
-				l = list(filter(None,s.strip().split(',')))
-				if len(l) == 3:
-					temp = float(l[0])
-					aio.send_data("studio-temp",temp)
-					#aio.send_data("home-temp",temp)
-					debug("Temperature sent to Adafruit: {:0.1f}".format(temp))
-					hum = float(l[1])
-					aio.send_data("studio-hum",hum)
-					#aio.send_data("home-hum",hum)
-					debug("Humidity sent to Adafruit: {:0.1f}".format(hum))
-					dpnt = float(l[2])
-					aio.send_data("studio-dewpoint",dpnt)
-					#aio.send_data("home-dewpoint",dpnt)
-					debug("Dewpoint sent to Adafruit: {:0.1f}".format(dpnt))
-			except:
-				pass
-		if os.path.isfile(eco2flnm):
-			with open(eco2flnm,"r") as f:
-				s = f.readline()
-				f.close()
-			try:
-				eco2 = float(s.strip())
-				aio.send_data("studio-eco2",eco2)
-				#aio.send_data("home-eco2",eco2)
-				debug("eCO2 value sent to Adafruit dashboard: {:0.1f} ppm".
-				 format(eco2))
-			except:
-				pass
-	except:
-		debug('Data NOT sent to Adafruit dashboard - check connection')
-	return
+				with open(self.reportfile+'.new','w') as f:
+					f.write('\n'.join(lines)+'\n')
+				os.replace(self.reportfile+'.new',self.reportfile)
+			except OSError as e:
+				debug(f"Could not write {self.reportfile}: {e}")
+		return
+
+	def wake(self):
+		self.wakeup.set()
+		return
+
+	def stop(self):
+		self.stopping.set()
+		self.wakeup.set()
+		return
+
+	# Seconds the current cycle has been running, 0 if there is none
+	def busy(self):
+		t = self.cycleStart
+		if t == 0.0:
+			return(0.0)
+		return(time.monotonic() - t)
 
 # -----------------------------------------------------------------------------
-# Main
-# -----------------------------------------------------------------------------
-
-parser = argparse.ArgumentParser(description="Reads data from status files "+
-																 "for environment sensors, and uploads the "+
-																 "data to the Adafruit IoT portal.")
-parser.add_argument("-v","--version",action="store_true",help="Show version "+
-										"and exit.")
-parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
-										"configuration file. The default is "+
-										"~/etc/upload.conf.")
-parser.add_argument("-d","--debug",action="store_true",
-										help="Turn debugging on")
-
-args = parser.parse_args()
-
-if args.debug:
-	DEBUG = True
+# Read the status files, returns a list of (feed, value). feeds has the feed
+# names for 'temperature', 'humidity', 'dewpoint' and 'eco2'.
+def readValues(thflnm,eco2flnm,feeds):
+	values = []
+	if os.path.isfile(thflnm):
+		with open(thflnm,"r") as f:
+			s = f.readline()
+			f.close()
+		try:
+			l = list(filter(None,s.strip().split(',')))
+			if len(l) == 3:
+				values.append((feeds['temperature'],float(l[0])))
+				values.append((feeds['humidity'],float(l[1])))
+				values.append((feeds['dewpoint'],float(l[2])))
+		except:
+			pass
+	if os.path.isfile(eco2flnm):
+		with open(eco2flnm,"r") as f:
+			s = f.readline()
+			f.close()
+		try:
+			values.append((feeds['eco2'],float(s.strip())))
+		except:
+			pass
+	return(values)
 
-versionStr = script+" version "+VERSION+" written by "+AUTHORS
-
-if args.version:
-	print(versionStr)
-	sys.exit(0)
-
-debug(versionStr)
-
-HOME = os.path.expanduser('~')
-if not(HOME.endswith('/')):
-	HOME += '/'
-
-debug("Current user's home :"+HOME)
-
-configfile = HOME+"etc/upload.conf"
-
-if args.config:
-	debug("Alternate config file specified: "+str(args.config[0]))
-	configfile = str(args.config[0])
-	if not configfile.startswith('/'):
-		configfile = HOME+configfile
-
-debug("Configuration file: "+configfile)
-
-if not os.path.isfile(configfile):
-	errorExit(configfile+' does not exist.')
-
-conf = configparser.ConfigParser()
-conf.read(configfile)
-
-req = ['main,lock file','main,thfile','main,eco2file',
-			 'adafruit,user','adafruit,key']
-
-cfg = checkConfig(conf, req)
+# -----------------------------------------------------------------------------
+# Queue the current readings and let the worker know there is work to do.
+def send_data(worker,queue,thflnm,eco2flnm,feeds):
+	values = readValues(thflnm,eco2flnm,feeds)
+	if len(values) > 0:
+		queue.put(values,time.time())
+		if DEBUG:
+			for (k,v) in values:
+				debug(f"{k} queued: {v:0.1f}")
+	if DEBUG:
+		debug(f"Queue: {queue.depth()} waiting, {queue.evicted} thrown away "+
+			"(queue full)")
+	worker.wake()
+	return
 
-debug("Configuration: conf['main']['lock file'] = {}".
-			format(conf['main']['lock file']))
-debug("Configuration: conf['main']['thfile']    = {}".
-			format(conf['main']['thfile']))
-debug("Configuration: conf['main']['eco2file']  = {}".
-			format(conf['main']['eco2file']))
-debug("Configuration: conf['adafruit']['user']  = {}".
-			format(conf['adafruit']['user']))
-debug("Configuration: conf['adafruit']['key']   = {}".
-			format(conf['adafruit']['key']))
+# -----------------------------------------------------------------------------
+def startWorker(n):
+	sinks = makeSinks(conf,sinkNames,HOME)
+	if metrics.enabled:
+		for sink in sinks:
+			sink.latencies = metrics.histogram(f"upload latency {sink.name}")
+	worker = UploadWorker(n,sinks,queuefile,maxPoints,cycleTime,reportfile)
+	worker.start()
+	return(worker)
 
-lockfile = conf['main']['lock file']
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
 
-if not lockfile.startswith('/'):
-	lockfile = HOME+lockfile
 
-debug("Lock file: "+lockfile)
+def main(argv=None):
+	global DEBUG, HOME, running, conf, sinkNames, queuefile, maxPoints
+	global cycleTime, reportfile, metrics
+
+	running = True
+
+	parser = argparse.ArgumentParser(description="Reads data from status files "+
+																	 "for environment sensors, and uploads the "+
+																	 "data to the Adafruit IoT portal.")
+	parser.add_argument("-v","--version",action="store_true",help="Show version "+
+											"and exit.")
+	parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
+											"configuration file. The default is "+
+											"~/etc/upload.conf.")
+	parser.add_argument("-b","--heartbeat",nargs=1,help="Heartbeat file, "+
+											"updated every time through the main loop (set by "+
+											"supervisor.py).")
+	parser.add_argument("-m","--metrics",nargs=1,help="Write counters and "+
+											"timings to this file every minute (see "+
+											"metrics.py).")
+	parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+											"and write the dumps to this directory when "+
+											"SIGUSR1 is received or the program ends (see "+
+											"profiling.py).")
+	parser.add_argument("-d","--debug",action="store_true",
+											help="Turn debugging on")
+
+	args = parser.parse_args(argv)
+
+	if args.debug:
+		DEBUG = True
+
+	versionStr = script+" version "+VERSION+" written by "+AUTHORS
+
+	if args.version:
+		print(versionStr)
+		sys.exit(0)
+
+	debug(versionStr)
+
+	HOME = os.path.expanduser('~')
+	if not(HOME.endswith('/')):
+		HOME += '/'
+
+	debug("Current user's home :"+HOME)
+
+	# supervisor.py watches the heartbeat to see that the program is not stuck
+	heartbeatfile = None
+	if args.heartbeat:
+		heartbeatfile = makeFilePath(args.heartbeat[0])
+		debug(f"Heartbeat file: {heartbeatfile}")
+	hb = Heartbeat(heartbeatfile)
+
+	metricsfile = None
+	if args.metrics:
+		metricsfile = makeFilePath(args.metrics[0])
+		debug(f"Metrics file: {metricsfile}")
+	metrics = Metrics(metricsfile,script)
+
+	# Profiling is switched off (the dumps are written) and on again with
+	# SIGUSR1
+	profiledir = None
+	if args.profile:
+		profiledir = makeFilePath(args.profile[0])
+		debug(f"Profile dumps: {profiledir}")
+	prof = Profiler(profiledir,script)
+
+	configfile = HOME+"etc/upload.conf"
+
+	if args.config:
+		debug("Alternate config file specified: "+str(args.config[0]))
+		configfile = str(args.config[0])
+		if not configfile.startswith('/'):
+			configfile = HOME+configfile
+
+	debug("Configuration file: "+configfile)
+
+	if not os.path.isfile(configfile):
+		errorExit(configfile+' does not exist.')
+
+	conf = configparser.ConfigParser()
+	conf.read(configfile)
+
+	req = ['main,lock file','main,thfile','main,eco2file']
+
+	cfg = checkConfig(conf, req)
+
+	debug("Configuration: conf['main']['lock file'] = {}".
+				format(conf['main']['lock file']))
+	debug("Configuration: conf['main']['thfile']    = {}".
+				format(conf['main']['thfile']))
+	debug("Configuration: conf['main']['eco2file']  = {}".
+				format(conf['main']['eco2file']))
+
+	# The sinks (see uploadSinks.py), each configured in its own section
+	sinkNames = ['adafruit']
+	if ('main,sinks' in cfg):
+		sinkNames = list(filter(None,[s.strip() for s in
+			conf['main']['sinks'].split(',')]))
 
-thfile = conf['main']['thfile']
+	try:
+		sinks = makeSinks(conf,sinkNames,HOME)
+	except ValueError as e:
+		errorExit(f"Sink configuration: {e}")
+
+	for sink in sinks:
+		debug(f"Sink {sink.name} ({sink.type}): {sink.rate} points per minute in "+
+			f"batches of {sink.batch}, timeout {sink.timeout:0.1f} s, "+
+			f"{sink.retries} retries, watchdog {sink.watchdog:0.1f} s, deadband "+
+			f"{sink.section.get('deadband','none')}, heartbeat "+
+			f"{sink.schedule.heartbeat:0.0f} s")
+		sink.shutdown()  # the upload worker makes its own
+
+	feeds = {'temperature': 'studio-temp', 'humidity': 'studio-hum',
+		'dewpoint': 'studio-dewpoint', 'eco2': 'studio-eco2'}
+	for k in feeds:
+		if (f"feeds,{k}" in cfg):
+			feeds[k] = conf['feeds'][k]
+
+	debug(f"Feeds: {feeds}")
+
+	reportfile = ''
+	if ('main,report' in cfg):
+		reportfile = makeFilePath(conf['main']['report'])
+		debug(f"Report file: {reportfile}")
+
+	# Points that could not be uploaded yet are kept on disk (see uploadQueue.py)
+	queuefile = 'data/upload.db'
+	if ('queue,database' in cfg):
+		queuefile = conf['queue']['database']
+	if not queuefile.startswith('/'):
+		queuefile = HOME+queuefile
+	try:
+		maxPoints = 500000
+		if ('queue,max points' in cfg):
+			maxPoints = int(conf['queue']['max points'])
+		cycleTime = 45.0
+		if ('queue,cycle deadline' in cfg):
+			cycleTime = float(conf['queue']['cycle deadline'])
+		watchdog = 120.0
+		if ('queue,watchdog' in cfg):
+			watchdog = float(conf['queue']['watchdog'])
+	except:
+		errorExit("Something went wrong trying to convert the numbers in the "+
+			"[queue] section of the configuration file.")
 
-if not thfile.startswith('/'):
-	thfile = HOME+thfile
+	debug(f"Upload queue: {queuefile}, at most {maxPoints} points, cycle "+
+		f"deadline {cycleTime:0.1f} s, watchdog {watchdog:0.1f} s")
 
-debug("Temperature, humidity and dew point status file: "+thfile)
+	lockfile = conf['main']['lock file']
 
-eco2file = conf['main']['eco2file']
+	if not lockfile.startswith('/'):
+		lockfile = HOME+lockfile
 
-if not eco2file.startswith('/'):
-	eco2file = HOME+eco2file
+	debug("Lock file: "+lockfile)
 
-debug("eCO2 status file: "+eco2file)
+	thfile = conf['main']['thfile']
 
-if not CreateProcessLock(lockfile):
-	errorExit('Unable to lock - '+script+' already running?')
+	if not thfile.startswith('/'):
+		thfile = HOME+thfile
 
-signal.signal(signal.SIGINT,signalHandler)
-signal.signal(signal.SIGTERM,signalHandler)
-signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
-                                           # controlling TTY, but handle it
-                                           # anyway
+	debug("Temperature, humidity and dew point status file: "+thfile)
 
-running = True
+	eco2file = conf['main']['eco2file']
 
-oldmn = -1
+	if not eco2file.startswith('/'):
+		eco2file = HOME+eco2file
 
-while running:  # Loop forever
-	now = time.localtime()
-	mn = int(time.strftime("%M",now))
-	if mn != oldmn:
-		time.sleep(0.2)
-		oldmn = mn
-		time.sleep(0.2)
-		send_data(conf,thfile,eco2file)
-	time.sleep(0.5)
+	debug("eCO2 status file: "+eco2file)
 
-RemoveProcessLock(lockfile)
+	if not CreateProcessLock(lockfile):
+		errorExit('Unable to lock - '+script+' already running?')
 
-print(ts(),script,'terminated.')
+	# Signals can only be handled in the main thread; when this runs as a thread
+	# of supervisor.py the supervisor calls stop() instead.
+	if threading.current_thread() is threading.main_thread():
+		signal.signal(signal.SIGINT,signalHandler)
+		signal.signal(signal.SIGTERM,signalHandler)
+		signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
+		                                           # controlling TTY, but handle
+		                                           # it anyway
+		if prof.enabled:
+			signal.signal(signal.SIGUSR1,prof.handler)
+	prof.start()
 
+	try:
+		queue = UploadQueue(queuefile,maxPoints,sinkNames)
+		debug(f"{queue.depth()} points waiting in the upload queue")
+
+		workers = 1
+		worker = startWorker(workers)
+		abandoned = []
+
+		oldmn = -1
+
+		while running:  # Loop forever
+			hb.beat()
+			metrics.tick()
+			now = time.localtime()
+			mn = int(time.strftime("%M",now))
+			if mn != oldmn:
+				time.sleep(0.2)
+				oldmn = mn
+				time.sleep(0.2)
+				send_data(worker,queue,thfile,eco2file,feeds)
+			# Watchdog: replace a worker that hangs or died
+			# (the new worker starts sending at the next minute)
+			if not worker.is_alive() or worker.busy() > watchdog:
+				if worker.is_alive():
+					print(ts(),f"{worker.name} stuck in an upload cycle for "+
+						f"{worker.busy():0.0f} s, replacing it")
+					worker.stop()
+					abandoned.append(worker)
+				else:
+					print(ts(),f"{worker.name} died, replacing it")
+				workers += 1
+				worker = startWorker(workers)
+			if len(abandoned) > 0:
+				alive = [w for w in abandoned if w.is_alive()]
+				if len(alive) != len(abandoned):
+					debug(f"{len(alive)} abandoned upload workers still running")
+				abandoned = alive
+			time.sleep(0.5)
+
+		# Give the worker time to finish its current cycle, do not wait for
+		# abandoned workers
+		worker.stop()
+		worker.join(max([sink.timeout for sink in sinks]) + 1.0)
+		if worker.is_alive():
+			print(ts(),f"{worker.name} did not stop")
+		queue.close()
+	finally:
+		hb.close()
+		metrics.close()
+		prof.close()
+		RemoveProcessLock(lockfile)
+
+	print(ts(),script,'terminated.')
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+# uploadQueue.py
+
+# A queue on disk (SQLite, write ahead log) for the data points upload.py
+# sends. Every data point is stored with the time it was read, and only
+# removed once it was uploaded, so nothing is lost while the internet (or
+# Adafruit IO) is down.
+#
+# Every point is sent to each of the upload sinks (see uploadSinks.py). The
+# table 'pending' has a row for every point a sink still has to send; a point
+# is removed once no sink needs it any more.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Points are kept per sink (table 'pending'), peek, remove and depth take
+#    the name of the sink. Points queued by version 0.1 are given to all the
+#    sinks, rows for sinks that are no longer configured are removed.
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import sqlite3
+
+# -----------------------------------------------------------------------------
+class UploadQueue:
+
+	# maxPoints is the most data points kept, the oldest are thrown away when
+	# there are more. sinks is the list of sink names new points are queued
+	# for.
+	def __init__(self,flnm,maxPoints,sinks):
+		self.maxPoints = maxPoints
+		self.sinks = list(sinks)
+		self.evicted = 0
+		self.db = sqlite3.connect(flnm,timeout=30.0)
+		self.db.execute('PRAGMA journal_mode=WAL')
+		self.db.execute('PRAGMA synchronous=NORMAL')
+		with self.db:
+			self.db.execute('CREATE TABLE IF NOT EXISTS points ('+
+				'id INTEGER PRIMARY KEY AUTOINCREMENT, feed TEXT NOT NULL, '+
+				'value REAL NOT NULL, created REAL NOT NULL)')
+			self.db.execute('CREATE TABLE IF NOT EXISTS pending ('+
+				'sink TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (sink,id)) '+
+				'WITHOUT ROWID')
+			self.db.execute('DELETE FROM pending WHERE sink NOT IN ('+
+				','.join('?'*len(self.sinks))+')',self.sinks)
+			# Points nobody is waiting for: queued by the previous version, or
+			# only pending for a sink that was removed from the configuration.
+			ids = [r[0] for r in self.db.execute('SELECT id FROM points WHERE '+
+				'id NOT IN (SELECT id FROM pending)')]
+			self.db.executemany('INSERT INTO pending (sink,id) VALUES (?,?)',
+				[(sink,i) for i in ids for sink in self.sinks])
+			self.db.execute('DELETE FROM points WHERE id NOT IN '+
+				'(SELECT id FROM pending)')
+
+	# values is a list of (feed, value), created is the time (seconds since the
+	# epoch) the values were read.
+	def put(self,values,created):
+		with self.db:
+			for (k,v) in values:
+				cur = self.db.execute('INSERT INTO points (feed,value,created) '+
+					'VALUES (?,?,?)',(k,v,created))
+				self.db.executemany('INSERT INTO pending (sink,id) VALUES (?,?)',
+					[(sink,cur.lastrowid) for sink in self.sinks])
+			n = self.depth() - self.maxPoints
+			if n > 0:
+				self.db.execute('DELETE FROM pending WHERE id IN '+
+					'(SELECT id FROM points ORDER BY id LIMIT ?)',(n,))
+				self.db.execute('DELETE FROM points WHERE id IN '+
+					'(SELECT id FROM points ORDER BY id LIMIT ?)',(n,))
+				self.evicted += n
+		return
+
+	# The oldest n points sink has not sent, as a list of (id, feed, value,
+	# created)
+	def peek(self,sink,n):
+		cur = self.db.execute('SELECT points.id,feed,value,created FROM '+
+			'pending JOIN points ON points.id = pending.id WHERE sink = ? '+
+			'ORDER BY pending.id LIMIT ?',(sink,n))
+		return(cur.fetchall())
+
+	# Points sink has sent, removed completely when no other sink needs them
+	def remove(self,sink,ids):
+		with self.db:
+			self.db.executemany('DELETE FROM pending WHERE sink = ? AND id = ?',
+				[(sink,i) for i in ids])
+			self.db.executemany('DELETE FROM points WHERE id = ? AND NOT EXISTS '+
+				'(SELECT 1 FROM pending WHERE pending.id = ?)',
+				[(i,i) for i in ids])
+		return
+
+	# Points waiting for sink, or all the points in the queue
+	def depth(self,sink=None):
+		if sink is None:
+			return(self.db.execute('SELECT COUNT(*) FROM points').fetchone()[0])
+		return(self.db.execute('SELECT COUNT(*) FROM pending WHERE sink = ?',
+			(sink,)).fetchone()[0])
+
+	def close(self):
+		self.db.close()
+		return
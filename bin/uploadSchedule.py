@@ -0,0 +1,232 @@
+#!/usr/bin/python3
+# uploadSchedule.py
+
+# Decides which of the queued data points a sink (uploadSinks.py) sends, and
+# when, so that a service that limits the data points per minute (Adafruit
+# IO: 30 on the free tier) is not asked for more than it allows.
+#
+# RateBudget keeps track of the points sent in the last minute. The limit is
+# the configured rate, or what the service says in its response headers
+# (...RateLimit-Limit / ...RateLimit-Remaining, Retry-After when it throttles).
+#
+# FeedScheduler
+#   - coalesces: a point that differs no more than the deadband of the feed from
+#     the last point kept is not sent, unless the last point kept is older than
+#     the heartbeat (so a feed that does not change is still seen to be alive)
+#   - gives the budget to the feeds that change fastest first: the newest
+#     point of every feed first, then the backlog, fastest changing feeds first
+#   - keeps the freshness of each feed: how old the newest point the service
+#     has is.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import re
+import time
+import collections
+
+PERIOD = 60.0  # the rate limit is per minute
+
+limitHeader = re.compile(r'rate-?limit-?limit$',re.IGNORECASE)
+remainingHeader = re.compile(r'rate-?limit-?remaining$',re.IGNORECASE)
+
+# -----------------------------------------------------------------------------
+class RateBudget:
+
+	def __init__(self,limit,clock=time.monotonic):
+		self.limit = limit          # configured points per minute
+		self.clock = clock
+		self.window = collections.deque() # (time, points) sent in the last minute
+		self.serverLimit = None     # what the service says, if it does
+		self.remaining = None
+		self.remainingT = 0.0
+		self.pausedUntil = 0.0
+		self.throttled = 0          # times the service said 'too many'
+
+	def expire(self,now):
+		while len(self.window) > 0 and now - self.window[0][0] >= PERIOD:
+			self.window.popleft()
+		return
+
+	# Points that can be sent now
+	def available(self):
+		now = self.clock()
+		if now < self.pausedUntil:
+			return(0)
+		self.expire(now)
+		limit = self.limit
+		if self.serverLimit is not None:
+			limit = min(limit,self.serverLimit)
+		n = limit - sum([p for (t,p) in self.window])
+		if self.remaining is not None and now - self.remainingT < PERIOD:
+			n = min(n,self.remaining)
+		return(max(n,0))
+
+	# (the remaining points the service gives already count these)
+	def used(self,n):
+		self.window.append((self.clock(),n))
+		return
+
+	# Rate limit headers of a response, and Retry-After if the service is
+	# throttling (status 429)
+	def update(self,headers,status):
+		try:
+			for (k,v) in headers.items():
+				if limitHeader.search(k):
+					self.serverLimit = int(v)
+				elif remainingHeader.search(k):
+					self.remaining = int(v)
+					self.remainingT = self.clock()
+			if status == 429:
+				self.throttled += 1
+				wait = PERIOD
+				if 'Retry-After' in headers:
+					wait = float(headers['Retry-After'])
+				self.pausedUntil = self.clock() + wait
+		except ValueError:
+			pass
+		return
+
+	def describe(self):
+		s = f"{self.available()} of {self.limit}"
+		if self.serverLimit is not None:
+			s += f" (service limit {self.serverLimit})"
+		s += " points available"
+		if self.throttled > 0:
+			s += f", throttled {self.throttled} times"
+		return(s)
+
+# -----------------------------------------------------------------------------
+# 'deadband' is like "studio-temp:0.1, studio-eco2:10, 0.2": a deadband per
+# feed, and a plain number for all other feeds. Returns (per feed, default),
+# default None when there is none.
+def parseDeadband(s):
+	feeds = {}
+	default = None
+	for item in filter(None,[i.strip() for i in s.split(',')]):
+		if ':' in item:
+			(k,v) = item.rsplit(':',1)
+			feeds[k.strip()] = float(v)
+		else:
+			default = float(item)
+	return(feeds,default)
+
+# -----------------------------------------------------------------------------
+class FeedState:
+
+	def __init__(self):
+		self.ref = None        # (value, created) of the last point kept
+		self.prev = None       # (value, created) of the last point seen
+		self.speed = 0.0       # how fast the feed changes, deadbands per minute
+		self.delivered = None  # created time of the newest point sent
+		self.sent = 0
+		self.coalesced = 0
+
+# -----------------------------------------------------------------------------
+class FeedScheduler:
+
+	ALPHA = 0.3  # weight of the newest change in the speed of a feed
+
+	# deadband: see parseDeadband ('' for none), heartbeat: seconds
+	def __init__(self,limit,deadband,heartbeat,clock=time.monotonic):
+		self.budget = RateBudget(limit,clock)
+		(self.deadbands,self.deadband) = parseDeadband(deadband)
+		self.heartbeat = heartbeat
+		self.feeds = {}
+		self.seen = 0   # highest queue id looked at, points up to here are kept
+
+	def feed(self,name):
+		if not name in self.feeds:
+			self.feeds[name] = FeedState()
+		return(self.feeds[name])
+
+	def band(self,name):
+		return(self.deadbands.get(name,self.deadband))
+
+	# Update how fast the feed changes with a new point
+	def observe(self,f,band,value,created):
+		if f.prev is not None and created > f.prev[1]:
+			scale = band if band else max(abs(f.prev[0]),1e-6)
+			x = abs(value - f.prev[0])/scale/((created - f.prev[1])/60.0)
+			f.speed = self.ALPHA*x + (1 - self.ALPHA)*f.speed
+		f.prev = (value,created)
+		return
+
+	# rows are queued points (id, feed, value, created), oldest first. Returns
+	# (rows to send, ids of points that need not be sent). Points looked at
+	# before are always kept.
+	def coalesce(self,rows):
+		keep = []
+		drop = []
+		for r in rows:
+			(i,name,value,created) = r
+			if i <= self.seen:
+				keep.append(r)
+				continue
+			self.seen = i
+			f = self.feed(name)
+			band = self.band(name)
+			self.observe(f,band,value,created)
+			if (band is not None and f.ref is not None and
+				abs(value - f.ref[0]) <= band and
+				created - f.ref[1] < self.heartbeat):
+				f.coalesced += 1
+				drop.append(i)
+				continue
+			f.ref = (value,created)
+			keep.append(r)
+		return(keep,drop)
+
+	# The order to send rows in: the newest point of each feed, fastest
+	# changing feed first, then the rest, fastest changing feed first and
+	# oldest first.
+	def order(self,rows):
+		newest = {}
+		for r in rows:
+			newest[r[1]] = r
+		first = sorted(newest.values(),key=lambda r: -self.feed(r[1]).speed)
+		ids = set([r[0] for r in first])
+		rest = sorted([r for r in rows if not r[0] in ids],
+			key=lambda r: (-self.feed(r[1]).speed,r[0]))
+		return(first + rest)
+
+	def sent(self,rows):
+		self.budget.used(len(rows))
+		for (i,name,value,created) in rows:
+			f = self.feed(name)
+			f.sent += 1
+			if f.delivered is None or created > f.delivered:
+				f.delivered = created
+		return
+
+	# One line per feed: how old the newest point the sink has sent is (now is
+	# the wall clock time), points sent and coalesced, and the speed.
+	def report(self,now):
+		lines = []
+		for name in sorted(self.feeds):
+			f = self.feeds[name]
+			age = '-'
+			if f.delivered is not None:
+				age = f"{now - f.delivered:0.0f} s"
+			lines.append(f"{name}: freshness {age}, {f.sent} sent, "+
+				f"{f.coalesced} coalesced, speed {f.speed:0.2f}")
+		return(lines)
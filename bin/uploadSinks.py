@@ -0,0 +1,503 @@
+#!/usr/bin/python3
+# uploadSinks.py
+
+# The places upload.py sends the data to. Each sink is a section in
+# upload.conf and is listed in 'sinks' in the [main] section. 'type' in the
+# section says what kind of sink it is (the section name if it is not given):
+#
+#   adafruit  Adafruit IO REST API
+#   mqtt      an MQTT broker, one message per data point (needs paho-mqtt)
+#   influxdb  InfluxDB 2 HTTP write API, line protocol
+#   http      a JSON list of data points POSTed to a URL
+#   file      a CSV file the data points are appended to
+#
+# Every sink gets all the data points. drainSinks() runs one asyncio task per
+# sink, and each sink sends from its own thread, so a sink that is slow or
+# does not answer does not hold up the others. Each sink has its own batch
+# size, points per minute (rate), timeout, retries and watchdog (see
+# upload.conf), and a scheduler (uploadSchedule.py) that keeps it within its
+# rate limit and leaves out points that hardly changed.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# Initial version, AdafruitClient moved here from upload.py
+#
+# -----------------------------------------------------------------------------
+# Version: 0.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Each sink has a FeedScheduler (uploadSchedule.py): 'rate' is now a
+#    budget of points per minute, lowered to what the service says in its
+#    rate limit headers, and the sending stops when the service throttles.
+#    Points within 'deadband' of the last point kept are not sent (at least
+#    one point every 'heartbeat' seconds is), and the fastest changing feeds
+#    are sent first.
+#
+# -----------------------------------------------------------------------------
+# Version: 0.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The latency of every send can also go to a histogram (metrics.py).
+#
+# -----------------------------------------------------------------------------
+# Version: {Next}
+# Author:
+# Start date:
+# Last modifications:
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1.
+#
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import time
+import asyncio
+import concurrent.futures
+import requests
+from uploadSchedule import FeedScheduler
+
+try:
+	import paho.mqtt.client as mqtt
+except ImportError:
+	mqtt = None
+
+# -----------------------------------------------------------------------------
+def isoTime(t):
+	return(time.strftime('%Y-%m-%dT%H:%M:%SZ',time.gmtime(t)))
+
+# -----------------------------------------------------------------------------
+class AdafruitClient:
+
+	# observe is called with every response (for the rate limit headers)
+	def __init__(self,user,key,url,group,timeout,observe=None):
+		self.user = user
+		self.observe = observe
+		self.url = url.rstrip('/')
+		self.group = group
+		self.timeout = timeout
+		self.session = requests.Session()
+		self.session.headers.update({'X-AIO-Key': key,
+			'Content-Type': 'application/json'})
+
+	def post(self,path,payload):
+		r = self.session.post(f"{self.url}/api/v2/{self.user}/{path}",
+			json=payload,timeout=self.timeout)
+		if self.observe is not None:
+			self.observe(r)
+		r.raise_for_status()
+		return(r)
+
+	# values is a list of (feed, value), all read at time 'created'
+	def sendGroup(self,values,created):
+		payload = {'feeds': [{'key': k, 'value': v} for (k,v) in values],
+			'created_at': isoTime(created)}
+		return(self.post(f"groups/{self.group}/data",payload))
+
+	# points is a list of (value, created) for one feed
+	def sendBatch(self,feed,points):
+		payload = [{'value': v, 'created_at': isoTime(c)} for (v,c) in points]
+		return(self.post(f"feeds/{feed}/data/batch",payload))
+
+	def close(self):
+		self.session.close()
+		return
+
+# -----------------------------------------------------------------------------
+# A sink that sends a batch in more than one request raises this when a
+# request fails after others succeeded: ids are the points that were sent.
+class PartialSend(Exception):
+
+	def __init__(self,ids,error):
+		super().__init__(str(error))
+		self.ids = ids
+
+# -----------------------------------------------------------------------------
+# The options every sink has, and what a sink must provide: open() makes the
+# connection (again), send(rows) sends a list of (id, feed, value, created)
+# or raises an exception, close() closes the connection.
+class Sink:
+
+	RATE = 1000  # default points per upload cycle
+
+	def __init__(self,name,section,home):
+		self.name = name
+		self.section = section
+		self.home = home
+		self.type = section.get('type',name)
+		self.batch = section.getint('batch',fallback=100)
+		self.rate = section.getint('rate',fallback=self.RATE)
+		self.timeout = section.getfloat('timeout',fallback=10.0)
+		self.retries = section.getint('retries',fallback=2)
+		self.backoff = section.getfloat('backoff',fallback=1.0)
+		self.watchdog = section.getfloat('watchdog',fallback=6*self.timeout)
+		self.schedule = FeedScheduler(self.rate,section.get('deadband',''),
+			section.getfloat('heartbeat',fallback=600.0))
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+			thread_name_prefix=f"sink-{name}")
+		self.busySince = 0.0 # monotonic time the current send started, 0 when
+		                     # the sink is not sending
+		self.sent = 0        # Statistics
+		self.failed = 0
+		self.retried = 0
+		self.replaced = 0
+		self.error = ''
+		self.n = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.last = 0.0
+		self.latencies = None # histogram (metrics.py) the latencies also go to
+		self.open()
+
+	def need(self,key):
+		if not key in self.section:
+			raise ValueError(f"[{self.name}] needs '{key}'")
+		return(self.section[key])
+
+	def path(self,key,default):
+		flnm = self.section.get(key,default)
+		if not flnm.startswith('/'):
+			flnm = self.home+flnm
+		return(flnm)
+
+	def open(self):
+		return
+
+	def send(self,rows):
+		raise NotImplementedError
+
+	def close(self):
+		return
+
+	# A response from the service, for the rate limit
+	def observe(self,r):
+		self.schedule.budget.update(r.headers,r.status_code)
+		return
+
+	# Runs in the sink's own thread
+	def call(self,rows):
+		self.busySince = time.monotonic()
+		try:
+			self.send(rows)
+		finally:
+			self.busySince = 0.0
+		return
+
+	# Seconds the current send has been running, 0 if there is none
+	def busy(self):
+		t = self.busySince
+		if t == 0.0:
+			return(0.0)
+		return(time.monotonic() - t)
+
+	# The thread is stuck in a send: leave it (it ends when the send does) and
+	# start again with a new thread and a new connection.
+	def reset(self):
+		self.executor.shutdown(wait=False)
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+			thread_name_prefix=f"sink-{self.name}")
+		self.busySince = 0.0
+		self.replaced += 1
+		self.open()
+		return
+
+	def latency(self,t):
+		self.last = t
+		self.n += 1
+		self.total += t
+		self.max = max(self.max,t)
+		if self.latencies is not None:
+			self.latencies.observe(t)
+		return
+
+	def shutdown(self):
+		self.executor.shutdown(wait=False)
+		try:
+			self.close()
+		except Exception:
+			pass
+		return
+
+	def stats(self):
+		s = (f"{self.sent} points sent, {self.failed} failed, {self.retried} "+
+			f"retries, {self.replaced} replaced")
+		if self.n > 0:
+			s += (f", latency {self.last*1000:0.1f} ms (mean "+
+				f"{self.total/self.n*1000:0.1f} ms, max {self.max*1000:0.1f} ms)")
+		if self.error:
+			s += f", last error: {self.error}"
+		return(s)
+
+# -----------------------------------------------------------------------------
+class AdafruitSink(Sink):
+
+	RATE = 30  # the Adafruit IO free tier allows 30 data points a minute
+
+	def open(self):
+		self.client = AdafruitClient(self.need('user'),self.need('key'),
+			self.section.get('url','https://io.adafruit.com'),
+			self.section.get('group','default'),self.timeout,self.observe)
+		return
+
+	def send(self,rows):
+		feeds = [r[1] for r in rows]
+		if (len(set([r[3] for r in rows])) == 1 and
+			len(set(feeds)) == len(feeds)):
+			# The normal case, one set of readings: one request for all feeds
+			self.client.sendGroup([(r[1],r[2]) for r in rows],rows[0][3])
+		else:
+			# Catching up after an outage: one request per feed, as long as the
+			# service says there is room for it
+			done = []
+			for feed in sorted(set(feeds),key=feeds.index):
+				fr = [r for r in rows if r[1] == feed]
+				budget = self.schedule.budget
+				try:
+					if (len(done) > 0 and budget.remaining is not None and
+						budget.remaining < len(fr)):
+						raise Exception("rate limit reached")
+					self.client.sendBatch(feed,[(r[2],r[3]) for r in fr])
+				except Exception as e:
+					if len(done) == 0:
+						raise
+					raise PartialSend(done,e)
+				done += [r[0] for r in fr]
+		return
+
+	def close(self):
+		self.client.close()
+		return
+
+# -----------------------------------------------------------------------------
+# One message per data point, topic <topic prefix><feed>, payload
+# {"value": ..., "created_at": ...}. The network loop of the client is run
+# by send() in the sink's thread, there is no thread of its own to get stuck.
+class MQTTSink(Sink):
+
+	def open(self):
+		if mqtt is None:
+			raise ValueError(f"[{self.name}] needs the paho-mqtt module")
+		self.host = self.need('host')
+		self.port = self.section.getint('port',fallback=1883)
+		self.prefix = self.section.get('topic prefix','s2yoga/')
+		self.qos = self.section.getint('qos',fallback=1)
+		self.client = None
+		return
+
+	def connect(self):
+		clientId = self.section.get('client id',f"s2yoga-{os.getpid()}")
+		if hasattr(mqtt,'CallbackAPIVersion'): # paho-mqtt 2
+			self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2,
+				client_id=clientId)
+		else:
+			self.client = mqtt.Client(client_id=clientId)
+		if 'user' in self.section:
+			self.client.username_pw_set(self.section['user'],
+				self.section.get('password'))
+		self.client.connect(self.host,self.port,keepalive=180)
+		endT = time.monotonic() + self.timeout
+		while not self.client.is_connected():
+			if time.monotonic() > endT:
+				raise TimeoutError(f"no answer from {self.host}:{self.port}")
+			self.client.loop(0.1)
+		return
+
+	def send(self,rows):
+		if self.client is None or not self.client.is_connected():
+			self.close()
+			self.connect()
+		msgs = [self.client.publish(self.prefix+feed,json.dumps({'value': value,
+			'created_at': isoTime(created)}),qos=self.qos)
+			for (i,feed,value,created) in rows]
+		endT = time.monotonic() + self.timeout
+		while not all([msg.is_published() for msg in msgs]):
+			if time.monotonic() > endT or not self.client.is_connected():
+				raise TimeoutError("messages not acknowledged")
+			self.client.loop(0.1)
+		return
+
+	def close(self):
+		if self.client is not None:
+			self.client.disconnect()
+			self.client = None
+		return
+
+# -----------------------------------------------------------------------------
+# InfluxDB 2 write API: <measurement>,feed=<feed> value=<value> <time>
+class InfluxSink(Sink):
+
+	def open(self):
+		self.url = self.need('url').rstrip('/')+'/api/v2/write'
+		self.params = {'org': self.need('org'),'bucket': self.need('bucket'),
+			'precision': 's'}
+		self.measurement = self.section.get('measurement','s2yoga')
+		self.session = requests.Session()
+		self.session.headers.update({
+			'Content-Type': 'text/plain; charset=utf-8'})
+		if 'token' in self.section:
+			self.session.headers.update({'Authorization':
+				'Token '+self.section['token']})
+		return
+
+	def send(self,rows):
+		lines = [f"{self.measurement},feed={tag(feed)} value={value} "+
+			f"{int(created)}" for (i,feed,value,created) in rows]
+		r = self.session.post(self.url,params=self.params,
+			data='\n'.join(lines).encode(),timeout=self.timeout)
+		self.observe(r)
+		r.raise_for_status()
+		return
+
+	def close(self):
+		self.session.close()
+		return
+
+# -----------------------------------------------------------------------------
+# Tag values in the line protocol: commas, equal signs and spaces are escaped
+def tag(s):
+	return(s.replace(',','\\,').replace('=','\\=').replace(' ','\\ '))
+
+# -----------------------------------------------------------------------------
+# POST [{"feed": ..., "value": ..., "created_at": ...}, ...] to a URL
+class HttpSink(Sink):
+
+	def open(self):
+		self.url = self.need('url')
+		self.session = requests.Session()
+		if 'token' in self.section:
+			self.session.headers.update({'Authorization':
+				'Bearer '+self.section['token']})
+		return
+
+	def send(self,rows):
+		r = self.session.post(self.url,json=[{'feed': feed,'value': value,
+			'created_at': isoTime(created)} for (i,feed,value,created) in rows],
+			timeout=self.timeout)
+		self.observe(r)
+		r.raise_for_status()
+		return
+
+	def close(self):
+		self.session.close()
+		return
+
+# -----------------------------------------------------------------------------
+# Lines of <created_at>,<feed>,<value> appended to a file
+class FileSink(Sink):
+
+	def open(self):
+		self.flnm = self.path('file','data/upload.csv')
+		return
+
+	def send(self,rows):
+		with open(self.flnm,'a') as f:
+			for (i,feed,value,created) in rows:
+				f.write(f"{isoTime(created)},{feed},{value}\n")
+		return
+
+SINKS = {'adafruit': AdafruitSink, 'mqtt': MQTTSink, 'influxdb': InfluxSink,
+	'http': HttpSink, 'file': FileSink}
+
+# -----------------------------------------------------------------------------
+# The sinks listed in names, configured from their sections in conf. Raises
+# ValueError if the configuration is wrong.
+def makeSinks(conf,names,home):
+	sinks = []
+	for name in names:
+		if not conf.has_section(name):
+			raise ValueError(f"there is no [{name}] section for sink '{name}'")
+		t = conf[name].get('type',name)
+		if not t in SINKS:
+			raise ValueError(f"[{name}] has an unknown type '{t}'")
+		sinks.append(SINKS[t](name,conf[name],home))
+	return(sinks)
+
+# Most queued points looked at in one upload cycle
+WINDOW = 5000
+
+# -----------------------------------------------------------------------------
+# Send the points queued for one sink, in batches of at most sink.batch points,
+# as far as the rate limit allows. Points the scheduler coalesces are removed
+# from the queue without sending, the others go in the order the scheduler
+# says. A batch is tried sink.retries more times, waiting sink.backoff,
+# 2 x sink.backoff, ... seconds in between. Points are only removed from the
+# queue once they were sent. No new send is started after 'deadline'
+# (monotonic time) or once 'stopping' is set. Returns the number of points
+# sent.
+async def drainSink(sink,queue,deadline,stopping):
+	loop = asyncio.get_running_loop()
+	sched = sink.schedule
+	(rows,drop) = sched.coalesce(queue.peek(sink.name,WINDOW))
+	if len(drop) > 0:
+		queue.remove(sink.name,drop)
+	rows = sched.order(rows)
+	sent = 0
+	while len(rows) > 0 and not stopping.is_set():
+		n = min(sink.batch,sched.budget.available())
+		if n == 0 or time.monotonic() >= deadline:
+			break
+		batch = rows[:n]
+		n = len(batch)
+		ok = False
+		for attempt in range(sink.retries + 1):
+			if attempt > 0:
+				wait = sink.backoff*2**(attempt - 1)
+				if (time.monotonic() + wait >= deadline or stopping.is_set() or
+					sched.budget.available() == 0):
+					break
+				sink.retried += 1
+				await asyncio.sleep(wait)
+			if sink.busy() > sink.watchdog:
+				sink.reset()
+			timeout = min(sink.timeout,deadline - time.monotonic())
+			if timeout <= 0:
+				break
+			startT = time.perf_counter()
+			try:
+				await asyncio.wait_for(loop.run_in_executor(sink.executor,sink.call,
+					batch),timeout)
+				sink.latency(time.perf_counter() - startT)
+				ok = True
+				break
+			except PartialSend as e:
+				sink.error = str(e)
+				done = [r for r in batch if r[0] in e.ids]
+				queue.remove(sink.name,e.ids)
+				sched.sent(done)
+				sent += len(done)
+				sink.sent += len(done)
+				batch = [r for r in batch if not r[0] in e.ids]
+			except Exception as e:
+				sink.error = str(e) or type(e).__name__
+		rows = rows[n:]
+		if not ok:
+			sink.failed += 1
+			break
+		queue.remove(sink.name,[r[0] for r in batch])
+		sched.sent(batch)
+		sent += len(batch)
+		sink.sent += len(batch)
+	return(sent)
+
+# -----------------------------------------------------------------------------
+# Drain all the sinks at the same time, returns {sink name: points sent}
+async def drainSinks(sinks,queue,deadline,stopping):
+	counts = await asyncio.gather(*[drainSink(sink,queue,deadline,stopping)
+		for sink in sinks])
+	return(dict(zip([sink.name for sink in sinks],counts)))
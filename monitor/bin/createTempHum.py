@@ -14,6 +14,41 @@
 # Last: 2025-??-??
 #
 # -----------------------------------------------------------------------------
+# Version: 1.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Counters and timings (-m / --metrics, see metrics.py): the time to read
+#    the data and to render the image, images made and data points plotted.
+#
+# -----------------------------------------------------------------------------
+# Version: 1.2
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling while the program runs (-p / --profile, see profiling.py):
+#    SIGUSR1 stops it and writes the dumps, and starts it again.
+#
+# -----------------------------------------------------------------------------
+# Version: 1.3
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. The days archiver.py compressed are read as well (see dataFiles.py).
+# 2. The days read last are kept (DayCache, [create] cache days in the
+#    configuration file), so the share is only read again for the day that
+#    is still being written, and only when it changed.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author:
 # Start date:
@@ -36,12 +71,17 @@ import signal
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.dates import DateFormatter
+from metrics import Metrics
+from profiling import Profiler
+import dataFiles
 
 script = os.path.basename(__file__)
-VERSION = "1.0"
+VERSION = "1.3"
 AUTHORS = "Louis Marais"
 
 DEBUG = False
+metrics = Metrics(None)  # see metrics.py
+cache = dataFiles.DayCache()  # the days read last, see dataFiles.py
 
 # -----------------------------------------------------------------------------
 # Subroutines
@@ -199,31 +239,29 @@ def createimage(flnm,pth,ext,strT,dur,wdth,hght):
 	startt,endt = gettimelimits(strT,dur)
 	debug(f"createimage: Plot starts at {strT}, and is {dur} hour(s) long")
 	debug(f"createimage: This is from MJD {startt:0.5f} to MJD {endt:0.5f}")
-	# Find files to read
+	# Read data (also archived days; the days read last come from the cache)
+	readT = time.monotonic()
 	mjds = []
-	flnms = []
+	days = []
 	for i in range(int(startt),int(endt)+1):
-		fl = f"{pth}{i}.{ext}"
-		if os.path.isfile(fl):
+		lines = cache.lines(pth,i,ext)
+		if len(lines) > 0:
 			mjds.append(i)
-			flnms.append(fl)
-			debug(f"createimage: File '{flnms[-1]}' added.")
+			days.append(lines)
+			debug(f"createimage: Day {i} added.")
 		else:
-			debug(f"createimage: Oops! {fl} does not exist!")
-	if len(flnms) == 0:
+			debug(f"createimage: Oops! No data for day {i}!")
+	debug(f"createimage: {cache.describe()}")
+	if len(days) == 0:
 		debug("No files available for creating a graph.")
 		return
-	# Read data
 	x = []
 	t = []
 	h = []
 	p = re.compile(r'(\d{2}):(\d{2}):(\d{2})\s+(\d+\.\d+)\s+(\d+\.\d+)\s+')
-	for i in range(0,len(flnms)):
-		lines = []
-		with open(flnms[i],'r') as f:
-			lines = f.readlines()
-			f.close()
-		#print(flnms[i],len(lines))
+	for i in range(0,len(days)):
+		lines = days[i]
+		#print(mjds[i],len(lines))
 		for l in lines:
 			if l.startswith('#'):
 				continue
@@ -243,6 +281,9 @@ def createimage(flnm,pth,ext,strT,dur,wdth,hght):
 					#print(x[-1],t[-1],h[-1])
 	# Create image
 	debug(f"createimage: Found {len(x)} data points.")
+	metrics.histogram('read time').observe(time.monotonic() - readT)
+	metrics.gauge('data points').set(len(x))
+	renderT = time.monotonic()
 
 	# Test matplotlib
 	#x = [1,2,3,4,5,6,7,8,9,10]
@@ -288,6 +329,8 @@ def createimage(flnm,pth,ext,strT,dur,wdth,hght):
 
 	plt.savefig(flnm)
 	#plt.show()
+	metrics.histogram('render time').observe(time.monotonic() - renderT)
+	metrics.counter('images').inc()
 
 	debug(f"createimage: New image created. Saved to {flnm}")
 	return
@@ -316,6 +359,11 @@ parser.add_argument("-s","--starttime",nargs=1,help="Specify the date and "+
 parser.add_argument("-t","--duration",nargs=1,help="Duration of the graph in "+
 										"hours. Default is 3 hours. This overrides the value in "+
 										"the configuration file.")
+parser.add_argument("-m","--metrics",nargs=1,help="Write counters and "+
+										"timings to this file (see metrics.py).")
+parser.add_argument("-p","--profile",nargs=1,help="Profile the program and "+
+										"write the dumps to this directory when SIGUSR1 is "+
+										"received or the program ends (see profiling.py).")
 parser.add_argument("-r","--runonce",action="store_true",help="Create a "+
 										"single plot and exit. This option is automatically "+
 										"set if the '--starttime' option is invoked.")
@@ -355,6 +403,13 @@ req = ['paths,data files','paths,extension','paths,lock file','paths,image',
 
 cfg = checkConfig(conf, req)
 
+if 'create,cache days' in cfg:
+	try:
+		cache.size = int(conf['create']['cache days'])
+	except:
+		errorExit("INT conversion error in conf['create']['cache days']: "+
+				 f"{conf['create']['cache days']}")
+
 datapath = makePath(conf['paths']['data files'])
 filext = conf['paths']['extension']
 lockfile = makeFilename(conf['paths']['lock file'])
@@ -411,6 +466,17 @@ if not args.runonce:
 	if not CreateProcessLock(lockfile):
 		errorExit('Unable to lock - '+script+' already running?')
 
+if args.metrics:
+	metrics = Metrics(makeFilename(args.metrics[0]),script)
+	debug(f"Metrics file: {metrics.flnm}")
+
+# Profiling is switched off (the dumps are written) and on again with SIGUSR1
+prof = Profiler(makeFilename(args.profile[0]) if args.profile else None,script)
+if prof.enabled:
+	debug(f"Profile dumps: {prof.directory}")
+	signal.signal(signal.SIGUSR1,prof.handler)
+prof.start()
+
 signal.signal(signal.SIGINT,signalHandler)
 signal.signal(signal.SIGTERM,signalHandler)
 signal.signal(signal.SIGHUP,signalHandler) # not usually run with a
@@ -430,11 +496,15 @@ while running:
 		createimage(imagefile,datapath,filext,starttime,plotduration,imgwidth,
 							imgheight)
 		lastimage += createinterval * 60
+	metrics.tick()
 	time.sleep(0.1)
 	if args.runonce:
 		debug("The '--runonce' option is active. Exiting now.")
 		break
 
+metrics.close()
+prof.close()
+
 if not args.runonce:
 	RemoveProcessLock(lockfile)
 
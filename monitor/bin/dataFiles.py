@@ -0,0 +1 @@
+../../bin/dataFiles.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../bin/metrics.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../bin/profiling.py
\ No newline at end of file
@@ -35,6 +35,19 @@
 # Last: 2025-04-26
 #
 # -----------------------------------------------------------------------------
+# Version: 1.1
+# Author: Louis Marais
+# Start date: 2026-10-19
+# Last modifications: 2026-10-19
+#
+# Modifications:
+# ~~~~~~~~~~~~~~
+# 1. Profiling while the program runs (-p / --profile, see profiling.py):
+#    SIGUSR1 stops it and writes the dumps, and starts it again. The signal
+#    is handled the next time the image is checked (every 5 s), when Qt
+#    runs Python code again.
+#
+# -----------------------------------------------------------------------------
 # Version: {Next}
 # Author:
 # Start date:
@@ -72,6 +85,8 @@ import os
 import time
 import argparse
 import configparser
+import signal
+from profiling import Profiler
 
 sep = os.sep
 HOME = os.path.expanduser('~')
@@ -81,10 +96,11 @@ if not HOME.endswith(sep):
 etcpath = f"{HOME}etc{sep}"
 
 script = os.path.basename(__file__)
-VERSION = "1.0"
+VERSION = "1.1"
 AUTHORS = "Louis Marais"
 
 DEBUG = False
+prof = Profiler(None,script)  # see profiling.py, set up in loadSettings
 
 # -----------------------------------------------------------------------------
 # Subroutines
@@ -158,7 +174,7 @@ class Window(QMainWindow):
 
 # -----------------------------------------------------------------------------
 	def loadSettings(self):
-		global DEBUG
+		global DEBUG, prof
 
 		parser = argparse.ArgumentParser(description="Show studio "+
 												"temperature and humidity.")
@@ -167,6 +183,10 @@ class Window(QMainWindow):
 		parser.add_argument("-c","--config",nargs=1,help="Specify alternative "+
 												"configuration file. The default is "+
 												f"{etcpath}showtemphum.conf.")
+		parser.add_argument("-p","--profile",nargs=1,help="Profile the program "+
+												"and write the dumps to this directory when "+
+												"SIGUSR1 is received or the program ends (see "+
+												"profiling.py).")
 		parser.add_argument("-d","--debug",action="store_true",
 												help="Turn debugging on")
 		args = parser.parse_args()
@@ -174,6 +194,15 @@ class Window(QMainWindow):
 		if args.debug:
 			DEBUG = True
 
+		if args.profile:
+			profiledir = args.profile[0]
+			if not profiledir.startswith(sep): #won't work in Windows...
+				profiledir = HOME+profiledir
+			debug(f"Profile dumps: {profiledir}")
+			prof = Profiler(profiledir,script)
+			signal.signal(signal.SIGUSR1,prof.handler)
+			prof.start()
+
 		versionStr = script+" version "+VERSION+" written by "+AUTHORS
 
 		if args.version:
@@ -251,6 +280,7 @@ class Window(QMainWindow):
 	def closeEvent(self,event):
 		global DEBUG
 		debug("Closing {}".format(script))
+		prof.close()
 
 # -----------------------------------------------------------------------------
 	def Exit_clicked(self):